@@ -4,8 +4,10 @@ This component intercepts all state changes and events in Home Assistant and asy
 writes them to a TimescaleDB (PostgreSQL) database. It uses a dedicated writer task
 to ensure that database operations do not block the main Home Assistant event loop.
 """
+import asyncio
 import logging
 import json
+from datetime import timedelta
 
 import voluptuous as vol
 
@@ -20,7 +22,7 @@ from homeassistant.const import (
     EVENT_HOMEASSISTANT_STOP,
 )
 from homeassistant.helpers.entityfilter import generate_filter
-from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
 
 from .const import (
     DOMAIN,
@@ -75,8 +77,80 @@ from .const import (
     DEFAULT_ENABLE_INTEGRATIONS,
     CONF_ENABLE_USERS,
     DEFAULT_ENABLE_USERS,
+    CONF_WRITE_METHOD,
+    DEFAULT_WRITE_METHOD,
+    WRITE_METHOD_INSERT,
+    WRITE_METHOD_COPY,
+    CONF_SPILL_TO_DISK,
+    CONF_SPILL_MAX_SIZE,
+    CONF_SPILL_COMPRESSION,
+    DEFAULT_SPILL_TO_DISK,
+    DEFAULT_SPILL_MAX_SIZE,
+    DEFAULT_SPILL_COMPRESSION,
+    CONF_MAX_INFLIGHT_BATCHES,
+    DEFAULT_MAX_INFLIGHT_BATCHES,
+    CONF_ADAPTIVE_BATCHING,
+    CONF_MIN_BATCH_SIZE,
+    CONF_MAX_BATCH_SIZE,
+    CONF_MIN_FLUSH_INTERVAL,
+    CONF_MAX_FLUSH_INTERVAL,
+    CONF_TARGET_LAG,
+    DEFAULT_ADAPTIVE_BATCHING,
+    DEFAULT_MIN_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MIN_FLUSH_INTERVAL,
+    DEFAULT_MAX_FLUSH_INTERVAL,
+    DEFAULT_TARGET_LAG,
+    CONF_MAX_RETRY_BACKOFF,
+    DEFAULT_MAX_RETRY_BACKOFF,
+    CONF_OVERFLOW_POLICY,
+    CONF_QUEUE_QUOTA_STATES,
+    CONF_QUEUE_QUOTA_EVENTS,
+    CONF_PRIORITIES,
+    CONF_SAMPLE_RATE,
+    DEFAULT_OVERFLOW_POLICY,
+    DEFAULT_SAMPLE_RATE,
+    CONF_WORKER_PROCESS,
+    DEFAULT_WORKER_PROCESS,
+    CONF_SHARED_ATTRIBUTES,
+    CONF_ATTRIBUTES_CACHE_SIZE,
+    DEFAULT_SHARED_ATTRIBUTES,
+    DEFAULT_ATTRIBUTES_CACHE_SIZE,
+    CONF_METADATA_IDS,
+    DEFAULT_METADATA_IDS,
+    CONF_COMPACT_EVENTS,
+    DEFAULT_COMPACT_EVENTS,
+    CONF_NUMERIC_TABLE,
+    CONF_NUMERIC_COMPRESS_AFTER,
+    DEFAULT_NUMERIC_TABLE,
+    CONF_STATE_ENUMS,
+    CONF_STATE_ENUM_DOMAINS,
+    DEFAULT_STATE_ENUMS,
+    CONF_STATE_SPANS,
+    CONF_SPAN_DOMAINS,
+    DEFAULT_STATE_SPANS,
+    CONF_DEADBAND,
+    CONF_THROTTLE,
+    CONF_SKIP_DUPLICATES,
+    CONF_DUPLICATE_HEARTBEAT,
+    DEFAULT_SKIP_DUPLICATES,
+    CONF_SUPPRESS_RESTART_STATES,
+    DEFAULT_SUPPRESS_RESTART_STATES,
+    CONF_BACKGROUND_STARTUP,
+    DEFAULT_BACKGROUND_STARTUP,
+    CONF_MIGRATIONS,
+    CONF_MIGRATION_PAUSE,
 )
 from .writer import ScribeWriter
+from .worker import ScribeWorkerProxy
+from .overflow import OVERFLOW_POLICIES
+from .encoding import encode_json
+from .enums import DEFAULT_ENUM_DOMAINS
+from .spans import DEFAULT_SPAN_DOMAINS
+from .ingest import DEFAULT_DUPLICATE_HEARTBEAT, RESTART_WINDOW, IngestPlanCache
+from .deadband import DEADBAND_MODES, DEFAULT_MAX_GAP
+from .throttle import DEFAULT_WINDOW, RELEASE_INTERVAL
+from .migration import DEFAULT_MIGRATION_PAUSE, MIGRATION_NAMES
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -117,6 +191,53 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional(CONF_ENABLE_ENTITIES, default=DEFAULT_ENABLE_ENTITIES): cv.boolean,
                 vol.Optional(CONF_ENABLE_INTEGRATIONS, default=DEFAULT_ENABLE_INTEGRATIONS): cv.boolean,
                 vol.Optional(CONF_ENABLE_USERS, default=DEFAULT_ENABLE_USERS): cv.boolean,
+                vol.Optional(CONF_WRITE_METHOD, default=DEFAULT_WRITE_METHOD): vol.In([WRITE_METHOD_INSERT, WRITE_METHOD_COPY]),
+                vol.Optional(CONF_SPILL_TO_DISK, default=DEFAULT_SPILL_TO_DISK): cv.boolean,
+                vol.Optional(CONF_SPILL_MAX_SIZE, default=DEFAULT_SPILL_MAX_SIZE): cv.positive_int,
+                vol.Optional(CONF_SPILL_COMPRESSION, default=DEFAULT_SPILL_COMPRESSION): vol.In(["none", "zlib"]),
+                vol.Optional(CONF_MAX_INFLIGHT_BATCHES, default=DEFAULT_MAX_INFLIGHT_BATCHES): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+                vol.Optional(CONF_ADAPTIVE_BATCHING, default=DEFAULT_ADAPTIVE_BATCHING): cv.boolean,
+                vol.Optional(CONF_MIN_BATCH_SIZE, default=DEFAULT_MIN_BATCH_SIZE): cv.positive_int,
+                vol.Optional(CONF_MAX_BATCH_SIZE, default=DEFAULT_MAX_BATCH_SIZE): cv.positive_int,
+                vol.Optional(CONF_MIN_FLUSH_INTERVAL, default=DEFAULT_MIN_FLUSH_INTERVAL): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+                vol.Optional(CONF_MAX_FLUSH_INTERVAL, default=DEFAULT_MAX_FLUSH_INTERVAL): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+                vol.Optional(CONF_TARGET_LAG, default=DEFAULT_TARGET_LAG): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+                vol.Optional(CONF_MAX_RETRY_BACKOFF, default=DEFAULT_MAX_RETRY_BACKOFF): vol.All(vol.Coerce(float), vol.Range(min=1)),
+                vol.Optional(CONF_OVERFLOW_POLICY, default=DEFAULT_OVERFLOW_POLICY): vol.In(OVERFLOW_POLICIES),
+                vol.Optional(CONF_QUEUE_QUOTA_STATES): cv.positive_int,
+                vol.Optional(CONF_QUEUE_QUOTA_EVENTS): cv.positive_int,
+                vol.Optional(CONF_PRIORITIES, default={}): {cv.string: vol.Coerce(int)},
+                vol.Optional(CONF_SAMPLE_RATE, default=DEFAULT_SAMPLE_RATE): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                vol.Optional(CONF_WORKER_PROCESS, default=DEFAULT_WORKER_PROCESS): cv.boolean,
+                vol.Optional(CONF_SHARED_ATTRIBUTES, default=DEFAULT_SHARED_ATTRIBUTES): cv.boolean,
+                vol.Optional(CONF_ATTRIBUTES_CACHE_SIZE, default=DEFAULT_ATTRIBUTES_CACHE_SIZE): cv.positive_int,
+                vol.Optional(CONF_METADATA_IDS, default=DEFAULT_METADATA_IDS): cv.boolean,
+                vol.Optional(CONF_COMPACT_EVENTS, default=DEFAULT_COMPACT_EVENTS): cv.boolean,
+                vol.Optional(CONF_NUMERIC_TABLE, default=DEFAULT_NUMERIC_TABLE): cv.boolean,
+                vol.Optional(CONF_NUMERIC_COMPRESS_AFTER): cv.string,
+                vol.Optional(CONF_STATE_ENUMS, default=DEFAULT_STATE_ENUMS): cv.boolean,
+                vol.Optional(CONF_STATE_ENUM_DOMAINS, default=DEFAULT_ENUM_DOMAINS): vol.All(cv.ensure_list, [cv.string]),
+                vol.Optional(CONF_STATE_SPANS, default=DEFAULT_STATE_SPANS): cv.boolean,
+                vol.Optional(CONF_SPAN_DOMAINS, default=DEFAULT_SPAN_DOMAINS): vol.All(cv.ensure_list, [cv.string]),
+                vol.Optional(CONF_DEADBAND, default={}): {
+                    cv.string: vol.Schema({
+                        vol.Required("mode"): vol.In(DEADBAND_MODES),
+                        vol.Required("threshold"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Optional("max_gap", default=DEFAULT_MAX_GAP): cv.positive_int,
+                    })
+                },
+                vol.Optional(CONF_SKIP_DUPLICATES, default=DEFAULT_SKIP_DUPLICATES): cv.boolean,
+                vol.Optional(CONF_DUPLICATE_HEARTBEAT, default=DEFAULT_DUPLICATE_HEARTBEAT): cv.positive_int,
+                vol.Optional(CONF_SUPPRESS_RESTART_STATES, default=DEFAULT_SUPPRESS_RESTART_STATES): cv.boolean,
+                vol.Optional(CONF_BACKGROUND_STARTUP, default=DEFAULT_BACKGROUND_STARTUP): cv.boolean,
+                vol.Optional(CONF_MIGRATIONS, default=[]): vol.All(cv.ensure_list, [vol.In(MIGRATION_NAMES)]),
+                vol.Optional(CONF_MIGRATION_PAUSE, default=DEFAULT_MIGRATION_PAUSE): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(CONF_THROTTLE, default={}): {
+                    cv.string: vol.Schema({
+                        vol.Required("max_rows"): cv.positive_int,
+                        vol.Optional("window", default=DEFAULT_WINDOW): cv.positive_int,
+                    })
+                },
             }
         )
     },
@@ -213,6 +334,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         include_entity_globs,
         exclude_entity_globs,
     )
+    ingest_plans = IngestPlanCache(
+        entity_filter,
+        exclude_attributes,
+        yaml_config.get(CONF_DEADBAND, {}),
+        yaml_config.get(CONF_THROTTLE, {}),
+        skip_duplicates=yaml_config.get(CONF_SKIP_DUPLICATES, DEFAULT_SKIP_DUPLICATES),
+        duplicate_heartbeat=yaml_config.get(CONF_DUPLICATE_HEARTBEAT, DEFAULT_DUPLICATE_HEARTBEAT),
+        suppress_restart_states=yaml_config.get(CONF_SUPPRESS_RESTART_STATES, DEFAULT_SUPPRESS_RESTART_STATES),
+    )
 
     # Determine record_states and record_events for handle_event
     # Prioritizes Options Flow > Config Entry > Default
@@ -227,9 +357,16 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     ssl_cert_file = config.get(CONF_SSL_CERT_FILE) or yaml_config.get(CONF_SSL_CERT_FILE)
     ssl_key_file = config.get(CONF_SSL_KEY_FILE) or yaml_config.get(CONF_SSL_KEY_FILE)
 
+    # Background startup: listeners are registered right away and rows are queued
+    # while the schema, the metadata sync and the first stats refresh run
+    background_startup = yaml_config.get(CONF_BACKGROUND_STARTUP, DEFAULT_BACKGROUND_STARTUP)
+    startup_complete = asyncio.Event()  # Only used with background startup
+
     # Initialize Writer
-    # The ScribeWriter runs in a separate thread to handle DB I/O
-    writer = ScribeWriter(
+    # The ScribeWriter runs as an asyncio task, or in a child process behind
+    # ScribeWorkerProxy (same interface) when worker_process is enabled
+    writer_class = ScribeWorkerProxy if yaml_config.get(CONF_WORKER_PROCESS, DEFAULT_WORKER_PROCESS) else ScribeWriter
+    writer = writer_class(
         hass=hass,
         db_url=db_url,
         chunk_interval=chunk_interval,
@@ -251,119 +388,44 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         enable_table_entities=yaml_config.get(CONF_ENABLE_ENTITIES, DEFAULT_ENABLE_ENTITIES),
         enable_table_integrations=yaml_config.get(CONF_ENABLE_INTEGRATIONS, DEFAULT_ENABLE_INTEGRATIONS),
         enable_table_users=yaml_config.get(CONF_ENABLE_USERS, DEFAULT_ENABLE_USERS),
+        write_method=yaml_config.get(CONF_WRITE_METHOD, DEFAULT_WRITE_METHOD),
+        spill_to_disk=yaml_config.get(CONF_SPILL_TO_DISK, DEFAULT_SPILL_TO_DISK),
+        spill_max_bytes=yaml_config.get(CONF_SPILL_MAX_SIZE, DEFAULT_SPILL_MAX_SIZE) * 1024 * 1024,
+        spill_compression=yaml_config.get(CONF_SPILL_COMPRESSION, DEFAULT_SPILL_COMPRESSION),
+        max_inflight_batches=yaml_config.get(CONF_MAX_INFLIGHT_BATCHES, DEFAULT_MAX_INFLIGHT_BATCHES),
+        adaptive_batching=yaml_config.get(CONF_ADAPTIVE_BATCHING, DEFAULT_ADAPTIVE_BATCHING),
+        min_batch_size=yaml_config.get(CONF_MIN_BATCH_SIZE, DEFAULT_MIN_BATCH_SIZE),
+        max_batch_size=yaml_config.get(CONF_MAX_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE),
+        min_flush_interval=yaml_config.get(CONF_MIN_FLUSH_INTERVAL, DEFAULT_MIN_FLUSH_INTERVAL),
+        max_flush_interval=yaml_config.get(CONF_MAX_FLUSH_INTERVAL, DEFAULT_MAX_FLUSH_INTERVAL),
+        target_lag=yaml_config.get(CONF_TARGET_LAG, DEFAULT_TARGET_LAG),
+        max_retry_backoff=yaml_config.get(CONF_MAX_RETRY_BACKOFF, DEFAULT_MAX_RETRY_BACKOFF),
+        overflow_policy=yaml_config.get(CONF_OVERFLOW_POLICY, DEFAULT_OVERFLOW_POLICY),
+        queue_quota_states=yaml_config.get(CONF_QUEUE_QUOTA_STATES),
+        queue_quota_events=yaml_config.get(CONF_QUEUE_QUOTA_EVENTS),
+        priorities=yaml_config.get(CONF_PRIORITIES, {}),
+        sample_rate=yaml_config.get(CONF_SAMPLE_RATE, DEFAULT_SAMPLE_RATE),
+        shared_attributes=yaml_config.get(CONF_SHARED_ATTRIBUTES, DEFAULT_SHARED_ATTRIBUTES),
+        attributes_cache_size=yaml_config.get(CONF_ATTRIBUTES_CACHE_SIZE, DEFAULT_ATTRIBUTES_CACHE_SIZE),
+        metadata_ids=yaml_config.get(CONF_METADATA_IDS, DEFAULT_METADATA_IDS),
+        compact_events=yaml_config.get(CONF_COMPACT_EVENTS, DEFAULT_COMPACT_EVENTS),
+        numeric_table=yaml_config.get(CONF_NUMERIC_TABLE, DEFAULT_NUMERIC_TABLE),
+        numeric_compress_after=yaml_config.get(CONF_NUMERIC_COMPRESS_AFTER),
+        state_enums=yaml_config.get(CONF_STATE_ENUMS, DEFAULT_STATE_ENUMS),
+        state_enum_domains=yaml_config.get(CONF_STATE_ENUM_DOMAINS, DEFAULT_ENUM_DOMAINS),
+        state_spans=yaml_config.get(CONF_STATE_SPANS, DEFAULT_STATE_SPANS),
+        span_domains=yaml_config.get(CONF_SPAN_DOMAINS, DEFAULT_SPAN_DOMAINS),
+        background_init=background_startup,
+        migrations=yaml_config.get(CONF_MIGRATIONS, []),
+        migration_pause=yaml_config.get(CONF_MIGRATION_PAUSE, DEFAULT_MIGRATION_PAUSE),
     )
     
     # Start the writer task (async)
     await writer.start()
 
-    # Sync Users
-    if writer.enable_table_users:
-        try:
-            users_list = await hass.auth.async_get_users()
-            _LOGGER.debug(f"Syncing users. Total users in hass.auth: {len(users_list)}")
-            users = []
-            for user in users_list:
-                users.append({
-                    "user_id": user.id,
-                    "name": user.name,
-                    "is_owner": user.is_owner,
-                    "is_active": user.is_active,
-                    "system_generated": user.system_generated,
-                    "group_ids": json.dumps([g.id for g in user.groups], default=str)
-                })
-            
-            if users:
-                _LOGGER.debug(f"Calling writer.write_users with {len(users)} users")
-                await writer.write_users(users)
-            else:
-                _LOGGER.warning("No users found to sync!")
-                
-        except Exception as e:
-            _LOGGER.error(f"Error syncing users: {e}", exc_info=True)
-
-    # Sync Entities
-    if writer.enable_table_entities:
-        try:
-            registry = er.async_get(hass)
-            entities = []
-            for entity in registry.entities.values():
-                entities.append({
-                    "entity_id": entity.entity_id,
-                    "unique_id": entity.unique_id,
-                    "platform": entity.platform,
-                    "domain": entity.domain,
-                    "name": entity.name or entity.original_name,
-                    "device_id": entity.device_id,
-                    "area_id": entity.area_id,
-                    "capabilities": json.dumps(entity.capabilities, default=str) if entity.capabilities else None
-                })
-            
-            if entities:
-                _LOGGER.debug(f"Syncing {len(entities)} entities to database")
-                await writer.write_entities(entities)
-        except Exception as e:
-            _LOGGER.error(f"Error syncing entities: {e}", exc_info=True)
-
-    # Sync Areas
-    if writer.enable_table_areas:
-        try:
-            area_reg = ar.async_get(hass)
-            areas = []
-            for area in area_reg.areas.values():
-                areas.append({
-                    "area_id": area.id,
-                    "name": area.name,
-                    "picture": area.picture
-                })
-            if areas:
-                _LOGGER.debug(f"Syncing {len(areas)} areas to database")
-                await writer.write_areas(areas)
-        except Exception as e:
-            _LOGGER.error(f"Error syncing areas: {e}", exc_info=True)
-
-    # Sync Devices
-    if writer.enable_table_devices:
-        try:
-            device_reg = dr.async_get(hass)
-            devices = []
-            for device in device_reg.devices.values():
-                # Get primary config entry
-                primary_entry = next(iter(device.config_entries), None) if device.config_entries else None
-                
-                devices.append({
-                    "device_id": device.id,
-                    "name": device.name,
-                    "name_by_user": device.name_by_user,
-                    "model": device.model,
-                    "manufacturer": device.manufacturer,
-                    "sw_version": device.sw_version,
-                    "area_id": device.area_id,
-                    "primary_config_entry": primary_entry
-                })
-            if devices:
-                _LOGGER.debug(f"Syncing {len(devices)} devices to database")
-                await writer.write_devices(devices)
-        except Exception as e:
-            _LOGGER.error(f"Error syncing devices: {e}", exc_info=True)
+    if not background_startup:
+        await _async_sync_metadata(hass, writer)
 
-    # Sync Integrations (Config Entries)
-    if writer.enable_table_integrations:
-        try:
-            integrations = []
-            for config_entry in hass.config_entries.async_entries():
-                integrations.append({
-                    "entry_id": config_entry.entry_id,
-                    "domain": config_entry.domain,
-                    "title": config_entry.title,
-                    "state": config_entry.state.value if hasattr(config_entry.state, "value") else str(config_entry.state),
-                    "source": config_entry.source
-                })
-            if integrations:
-                _LOGGER.debug(f"Syncing {len(integrations)} integrations to database")
-                await writer.write_integrations(integrations)
-        except Exception as e:
-            _LOGGER.error(f"Error syncing integrations: {e}", exc_info=True)
-    
     # Setup Data Update Coordinators for statistics
     from .coordinator import ScribeDataUpdateCoordinator
     
@@ -382,7 +444,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             update_interval_minutes=chunk_interval,
             stats_type="chunk"
         )
-        await chunk_coordinator.async_config_entry_first_refresh()
+        if not background_startup:
+            await chunk_coordinator.async_config_entry_first_refresh()
     
     if enable_stats_size:
         size_interval = options.get(CONF_STATS_SIZE_INTERVAL, config.get(CONF_STATS_SIZE_INTERVAL, DEFAULT_STATS_SIZE_INTERVAL))
@@ -392,18 +455,32 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             update_interval_minutes=size_interval,
             stats_type="size"
         )
-        await size_coordinator.async_config_entry_first_refresh()
+        if not background_startup:
+            await size_coordinator.async_config_entry_first_refresh()
+
+    if background_startup:
+        async def background_startup_task():
+            """Wait for the schema, then sync metadata and refresh the stats."""
+            await writer.wait_ready()
+            await _async_sync_metadata(hass, writer)
+            for coordinator in (chunk_coordinator, size_coordinator):
+                if coordinator:
+                    await coordinator.async_refresh()
+            startup_complete.set()
+            _LOGGER.info("Scribe background startup completed")
+
+        startup_task = hass.async_create_background_task(background_startup_task(), "scribe_background_startup")
+        entry.async_on_unload(startup_task.cancel)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "writer": writer,
         "chunk_coordinator": chunk_coordinator,
         "size_coordinator": size_coordinator,
+        "ingest_plans": ingest_plans,
+        "startup_complete": startup_complete if background_startup else None,
     }
 
-    # Forward setup to platforms (Sensor, Binary Sensor)
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "binary_sensor"])
-
     # Event Listener - must be a sync callback, not async!
     @callback
     def handle_event(event: Event):
@@ -418,30 +495,38 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if new_state is None:
             return
 
-        # Apply Include/Exclude Filter
-        if not entity_filter(entity_id):
-            _LOGGER.debug(f"Entity {entity_id} filtered out")
+        # Include/Exclude filter and attribute rules, resolved once per entity
+        plan = ingest_plans.get(entity_id, new_state.attributes)
+        if not plan.include:
             return
 
-        try:
-            state_val = float(new_state.state)
-            state_str = None
-        except (ValueError, TypeError):
-            state_val = None
-            state_str = new_state.state
-
-        # Filter Attributes
-        filtered_attrs = {k: v for k, v in new_state.attributes.items() if k not in exclude_attributes}
+        state_str, state_val = plan.parse_state(new_state.state)
+        filtered_attrs = plan.filter_attributes(new_state.attributes)
 
         try:
-            writer.enqueue({
+            row = {
                 "type": "state",
                 "time": new_state.last_updated,
                 "entity_id": entity_id,
                 "state": state_str,
                 "value": state_val,
-                "attributes": json.dumps(filtered_attrs, default=str),
-            })
+                "attributes": encode_json(filtered_attrs, sort_keys=True),
+            }
+            if ingest_plans.skip_duplicates and ingest_plans.is_duplicate(plan, row):
+                return
+            if ingest_plans.restarting and ingest_plans.is_restart_duplicate(row):
+                return
+            if plan.deadband is None and plan.throttle is None:
+                rows = (row,)
+            else:
+                rows = (row,) if plan.deadband is None else ingest_plans.apply_deadband(plan, row)
+                if plan.throttle is not None:
+                    rows = ingest_plans.apply_throttle(plan, rows)
+            for row in rows:
+                writer.enqueue(row)
+                if ingest_plans.skip_duplicates:
+                    # Only rows that are written are the reference for the next duplicate
+                    ingest_plans.record_written(plan, row)
         except Exception as e:
             _LOGGER.error(f"Error enqueueing state for {entity_id}: {e}")
 
@@ -473,7 +558,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                     "type": "event",
                     "time": event.time_fired,
                     "event_type": event.event_type,
-                    "event_data": json.dumps(event.data, cls=JSONEncoder),
+                    "event_data": encode_json(event.data),
                     "origin": str(event.origin),
                     "context_id": event.context.id,
                     "context_user_id": event.context.user_id,
@@ -490,6 +575,51 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             hass.bus.async_listen(MATCH_ALL, handle_other_events)
         )
 
+    if record_states and ingest_plans.suppress_restart_states:
+        async def load_restart_states():
+            """Load the last stored state of every known entity, in the background."""
+            if background_startup:
+                await writer.wait_ready()
+            entity_ids = set(er.async_get(hass).entities) | set(hass.states.async_entity_ids())
+            entity_ids = sorted(entity_id for entity_id in entity_ids if entity_filter(entity_id))
+            try:
+                rows = await writer.last_states(entity_ids)
+            except Exception as e:
+                _LOGGER.warning(f"Could not load last stored states, restart rows will be written: {e}", exc_info=True)
+                return
+            ingest_plans.load_restart_states(rows)
+            _LOGGER.debug(f"Loaded {len(rows)} stored states to skip restart duplicates")
+
+        @callback
+        def clear_restart_states(now):
+            ingest_plans.clear_restart_states()
+
+        restart_states_task = hass.async_create_background_task(load_restart_states(), "scribe_load_restart_states")
+        entry.async_on_unload(restart_states_task.cancel)
+        entry.async_on_unload(async_call_later(hass, RESTART_WINDOW, clear_restart_states))
+
+    if record_states and ingest_plans.throttle_rules:
+        @callback
+        def release_throttled(now):
+            """Write the last suppressed row of throttled entities once they have budget again."""
+            for row in ingest_plans.release_throttled():
+                writer.enqueue(row)
+
+        entry.async_on_unload(
+            async_track_time_interval(hass, release_throttled, timedelta(seconds=RELEASE_INTERVAL))
+        )
+
+    if record_states:
+        @callback
+        def handle_entity_registry_ingest(event: Event):
+            """Drop cached ingest plans of changed or renamed entities."""
+            for row in ingest_plans.invalidate(event.data.get("entity_id"), event.data.get("old_entity_id")):
+                writer.enqueue(row)
+
+        entry.async_on_unload(
+            hass.bus.async_listen("entity_registry_updated", handle_entity_registry_ingest)
+        )
+
     # Real-time Metadata Sync Listeners
     
     # Entity Registry Updates
@@ -499,6 +629,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             action = event.data.get("action")
             entity_id = event.data.get("entity_id")
             
+            if action == "remove" or event.data.get("old_entity_id"):
+                # Removed or renamed: the row of the old entity_id is kept, marked removed
+                await writer.mark_registry_removed("entities", [event.data.get("old_entity_id") or entity_id])
+            
             if action in ["create", "update"]:
                 _LOGGER.debug(f"Entity registry update: {action} {entity_id}")
                 try:
@@ -530,6 +664,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             action = event.data.get("action")
             device_id = event.data.get("device_id")
             
+            if action == "remove":
+                await writer.mark_registry_removed("devices", [device_id])
+            
             if action in ["create", "update"]:
                 _LOGGER.debug(f"Device registry update: {action} {device_id}")
                 try:
@@ -564,6 +701,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             action = event.data.get("action")
             area_id = event.data.get("area_id")
             
+            if action == "remove":
+                await writer.mark_registry_removed("areas", [area_id])
+            
             if action in ["create", "update"]:
                 _LOGGER.debug(f"Area registry update: {action} {area_id}")
                 try:
@@ -592,6 +732,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             action = event.event_type # user_added, user_updated, user_removed
             
             _LOGGER.debug(f"User registry update: {action} {user_id}")
+            if action == "user_removed":
+                await writer.mark_registry_removed("users", [user_id])
+                return
             try:
                 user = await hass.auth.async_get_user(user_id)
                 if user:
@@ -617,9 +760,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             hass.bus.async_listen("user_removed", handle_user_update)
         )
     
-    # Register shutdown handler
+    # Forward setup to platforms (Sensor, Binary Sensor), once the listeners are in place
+    # so events fired during platform setup are recorded
+    await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "binary_sensor"])
+
+    # Register shutdown handler (Home Assistant does not unload entries when it stops)
     async def async_stop_scribe(event):
-        await writer.stop()
+        await _async_stop_writer(writer, ingest_plans)
 
     entry.async_on_unload(
         hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, async_stop_scribe)
@@ -663,6 +810,131 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     return True
 
+async def _async_sync_metadata(hass: HomeAssistant, writer) -> None:
+    """Write the users, entities, areas, devices and integrations to their tables.
+
+    Each call is a full sync: only changed rows are written, and rows missing
+    from a registry are marked removed.
+    """
+    # Sync Users
+    if writer.enable_table_users:
+        try:
+            users_list = await hass.auth.async_get_users()
+            _LOGGER.debug(f"Syncing users. Total users in hass.auth: {len(users_list)}")
+            users = []
+            for user in users_list:
+                users.append({
+                    "user_id": user.id,
+                    "name": user.name,
+                    "is_owner": user.is_owner,
+                    "is_active": user.is_active,
+                    "system_generated": user.system_generated,
+                    "group_ids": json.dumps([g.id for g in user.groups], default=str)
+                })
+            
+            if users:
+                _LOGGER.debug(f"Calling writer.write_users with {len(users)} users")
+                await writer.write_users(users, full=True)
+            else:
+                _LOGGER.warning("No users found to sync!")
+                
+        except Exception as e:
+            _LOGGER.error(f"Error syncing users: {e}", exc_info=True)
+
+    # Sync Entities
+    if writer.enable_table_entities:
+        try:
+            registry = er.async_get(hass)
+            entities = []
+            for entity in registry.entities.values():
+                entities.append({
+                    "entity_id": entity.entity_id,
+                    "unique_id": entity.unique_id,
+                    "platform": entity.platform,
+                    "domain": entity.domain,
+                    "name": entity.name or entity.original_name,
+                    "device_id": entity.device_id,
+                    "area_id": entity.area_id,
+                    "capabilities": json.dumps(entity.capabilities, default=str) if entity.capabilities else None
+                })
+            
+            if entities:
+                _LOGGER.debug(f"Syncing {len(entities)} entities to database")
+                await writer.write_entities(entities, full=True)
+        except Exception as e:
+            _LOGGER.error(f"Error syncing entities: {e}", exc_info=True)
+
+    # Sync Areas
+    if writer.enable_table_areas:
+        try:
+            area_reg = ar.async_get(hass)
+            areas = []
+            for area in area_reg.areas.values():
+                areas.append({
+                    "area_id": area.id,
+                    "name": area.name,
+                    "picture": area.picture
+                })
+            if areas:
+                _LOGGER.debug(f"Syncing {len(areas)} areas to database")
+                await writer.write_areas(areas, full=True)
+        except Exception as e:
+            _LOGGER.error(f"Error syncing areas: {e}", exc_info=True)
+
+    # Sync Devices
+    if writer.enable_table_devices:
+        try:
+            device_reg = dr.async_get(hass)
+            devices = []
+            for device in device_reg.devices.values():
+                # Get primary config entry
+                primary_entry = next(iter(device.config_entries), None) if device.config_entries else None
+                
+                devices.append({
+                    "device_id": device.id,
+                    "name": device.name,
+                    "name_by_user": device.name_by_user,
+                    "model": device.model,
+                    "manufacturer": device.manufacturer,
+                    "sw_version": device.sw_version,
+                    "area_id": device.area_id,
+                    "primary_config_entry": primary_entry
+                })
+            if devices:
+                _LOGGER.debug(f"Syncing {len(devices)} devices to database")
+                await writer.write_devices(devices, full=True)
+        except Exception as e:
+            _LOGGER.error(f"Error syncing devices: {e}", exc_info=True)
+
+    # Sync Integrations (Config Entries)
+    if writer.enable_table_integrations:
+        try:
+            integrations = []
+            for config_entry in hass.config_entries.async_entries():
+                integrations.append({
+                    "entry_id": config_entry.entry_id,
+                    "domain": config_entry.domain,
+                    "title": config_entry.title,
+                    "state": config_entry.state.value if hasattr(config_entry.state, "value") else str(config_entry.state),
+                    "source": config_entry.source
+                })
+            if integrations:
+                _LOGGER.debug(f"Syncing {len(integrations)} integrations to database")
+                await writer.write_integrations(integrations, full=True)
+        except Exception as e:
+            _LOGGER.error(f"Error syncing integrations: {e}", exc_info=True)
+
+async def _async_stop_writer(writer, ingest_plans: IngestPlanCache) -> None:
+    """Queue the rows held back by deadband filters and throttling, then stop the writer.
+    
+    The pending row of a throttled entity is its latest value, so it is written
+    regardless of tokens. Used on Home Assistant stop and on unload; stop()
+    flushes the queue.
+    """
+    for row in ingest_plans.pop_held():
+        writer.enqueue(row)
+    await writer.stop()
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry.
     
@@ -681,8 +953,6 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok:
         _LOGGER.debug("Unloading Scribe entry")
         data = hass.data[DOMAIN].pop(entry.entry_id)
-        writer = data["writer"]
-        # Ensure writer flushes remaining data before stopping
-        await writer.stop()
+        await _async_stop_writer(data["writer"], data["ingest_plans"])
         _LOGGER.debug("Scribe entry unloaded successfully")
     return unload_ok
\ No newline at end of file
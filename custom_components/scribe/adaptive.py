@@ -0,0 +1,115 @@
+"""Adaptive batch size and flush interval controller for Scribe.
+
+The writer reports every committed batch (rows, commit latency, ingest lag) and
+the queue state on every loop tick. The controller keeps smoothed estimates of
+those signals and retunes batch_size and flush_interval within configured bounds
+so that the end-to-end ingest lag (event time to commit) stays under a target:
+
+* Lag over target: flush twice as often, and grow batches while commits are cheap.
+* Lag well under target: flush less often (fewer, larger transactions when idle).
+* Batch size follows the arrival rate (rows expected per flush interval), but is
+  halved when a single commit takes more than half of the lag budget.
+"""
+from __future__ import annotations
+
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Weight of the newest sample in the moving averages
+SMOOTHING = 0.3
+
+
+def _ewma(current: float | None, sample: float) -> float:
+    """Exponentially weighted moving average."""
+    if current is None:
+        return sample
+    return current + SMOOTHING * (sample - current)
+
+
+class AdaptiveController:
+    """Tune batch size and flush interval to keep ingest lag under a target."""
+
+    def __init__(
+        self,
+        min_batch_size: int,
+        max_batch_size: int,
+        min_flush_interval: float,
+        max_flush_interval: float,
+        target_lag: float,
+        batch_size: int,
+        flush_interval: float,
+    ):
+        """Initialize the controller with its bounds and starting values."""
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max(max_batch_size, min_batch_size)
+        self.min_flush_interval = min_flush_interval
+        self.max_flush_interval = max(max_flush_interval, min_flush_interval)
+        self.target_lag = target_lag
+
+        self.batch_size = self._clamp_batch(batch_size)
+        self.flush_interval = self._clamp_interval(flush_interval)
+
+        # Smoothed signals
+        self.lag: float | None = None
+        self.commit_latency: float | None = None
+        self.arrival_rate: float | None = None
+        self.queue_growth: float | None = None
+
+        self._last_tick: float | None = None
+        self._last_enqueued = 0
+        self._last_queue_size = 0
+
+    def record_commit(self, rows: int, duration: float, lag: float | None) -> None:
+        """Record a committed batch: its size, commit latency and ingest lag."""
+        if not rows:
+            return
+        self.commit_latency = _ewma(self.commit_latency, duration)
+        if lag is not None:
+            self.lag = _ewma(self.lag, max(lag, 0.0))
+
+    def update(self, enqueued_total: int, queue_size: int, now: float | None = None) -> None:
+        """Sample the queue and retune batch size and flush interval."""
+        now = time.monotonic() if now is None else now
+        if self._last_tick is not None and now > self._last_tick:
+            elapsed = now - self._last_tick
+            self.arrival_rate = _ewma(self.arrival_rate, (enqueued_total - self._last_enqueued) / elapsed)
+            self.queue_growth = _ewma(self.queue_growth, (queue_size - self._last_queue_size) / elapsed)
+        self._last_tick = now
+        self._last_enqueued = enqueued_total
+        self._last_queue_size = queue_size
+
+        if self.lag is None or self.arrival_rate is None:
+            return
+
+        batch_size, flush_interval = self.batch_size, self.flush_interval
+        over_target = self.lag > self.target_lag or ((self.queue_growth or 0) > 0 and queue_size > batch_size)
+
+        if over_target:
+            flush_interval /= 2
+        elif self.lag < self.target_lag / 2:
+            flush_interval *= 1.25
+        flush_interval = self._clamp_interval(flush_interval)
+
+        wanted = self.arrival_rate * flush_interval
+        latency = self.commit_latency or 0.0
+        if over_target and latency < self.target_lag / 4:
+            wanted = max(wanted, batch_size * 2)
+        if latency > self.target_lag / 2:
+            wanted = min(wanted, batch_size / 2)
+        batch_size = self._clamp_batch(wanted)
+
+        if (batch_size, flush_interval) != (self.batch_size, self.flush_interval):
+            _LOGGER.debug(
+                f"Adaptive: batch_size {self.batch_size} -> {batch_size}, "
+                f"flush_interval {self.flush_interval:.2f}s -> {flush_interval:.2f}s "
+                f"(lag={self.lag:.2f}s, latency={latency:.3f}s, rate={self.arrival_rate:.1f} rows/s)"
+            )
+        self.batch_size, self.flush_interval = batch_size, flush_interval
+
+    def _clamp_batch(self, value: float) -> int:
+        return int(min(max(value, self.min_batch_size), self.max_batch_size))
+
+    def _clamp_interval(self, value: float) -> float:
+        return min(max(value, self.min_flush_interval), self.max_flush_interval)
@@ -0,0 +1,71 @@
+"""Shared (content-addressed) state attributes for Scribe.
+
+With shared_attributes enabled, every distinct attributes document is stored
+once in the state_attributes table and states rows only carry its
+attributes_id. The id is a 64-bit hash of the encoded JSON, so the writer can
+compute it without a round trip to the database; the blob is inserted with
+ON CONFLICT DO NOTHING the first time it is seen. Attributes are encoded with
+sorted keys, so the same document always gets the same id.
+
+AttributesCache remembers which documents are already stored (LRU), so in the
+steady state a batch does not touch state_attributes at all.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+def attributes_id(shared_attrs: str) -> int:
+    """Return the id of an encoded attributes document (signed 64-bit for BIGINT)."""
+    digest = hashlib.blake2b(shared_attrs.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class AttributesCache:
+    """LRU of attributes documents known to be stored in state_attributes."""
+
+    def __init__(self, size: int = DEFAULT_CACHE_SIZE):
+        """Initialize an empty cache."""
+        self.size = size
+        self._known: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def resolve(self, blobs: list[str | None]) -> tuple[list[int | None], dict[int, str]]:
+        """Map encoded attributes to ids.
+
+        Returns the id of every blob (None stays None) and the blobs that are
+        not known to be stored yet, keyed by id.
+        """
+        known = self._known
+        ids: list[int | None] = []
+        new: dict[int, str] = {}
+        for blob in blobs:
+            if blob is None:
+                ids.append(None)
+                continue
+            blob_id = known.get(blob)
+            if blob_id is None:
+                blob_id = attributes_id(blob)
+                new[blob_id] = blob
+                self.misses += 1
+            else:
+                known.move_to_end(blob)
+                self.hits += 1
+            ids.append(blob_id)
+        return ids, new
+
+    def add(self, stored: dict[int, str]) -> None:
+        """Remember blobs once they are committed to state_attributes."""
+        known = self._known
+        for blob_id, blob in stored.items():
+            known[blob] = blob_id
+            known.move_to_end(blob)
+        while len(known) > self.size:
+            known.popitem(last=False)
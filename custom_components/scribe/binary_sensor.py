@@ -2,7 +2,8 @@
 
 This module provides a binary sensor to indicate the connectivity status of the
 database writer. It helps users quickly identify if Scribe is successfully
-connected to the TimescaleDB instance.
+connected to the TimescaleDB instance. With background startup, a second binary
+sensor shows when the schema setup, metadata sync and first stats refresh are done.
 """
 from __future__ import annotations
 
@@ -23,11 +24,15 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Scribe binary sensors."""
-    writer = hass.data[DOMAIN][entry.entry_id]["writer"]
+    data = hass.data[DOMAIN][entry.entry_id]
+    writer = data["writer"]
+    startup_complete = data.get("startup_complete")
     
     entities = [
         ScribeConnectionBinarySensor(writer, entry),
     ]
+    if startup_complete is not None:
+        entities.append(ScribeReadyBinarySensor(writer, entry, startup_complete))
     
     async_add_entities(entities, True)
 
@@ -63,7 +68,49 @@ class ScribeConnectionBinarySensor(BinarySensorEntity):
 
     @property
     def extra_state_attributes(self):
-        """Return error message if any."""
+        """Return error message and circuit breaker state."""
+        breaker = self._writer._breaker
         return {
-            "last_error": self._writer._last_error
+            "last_error": self._writer._last_error,
+            "circuit_state": breaker.state,
+            "consecutive_failures": breaker.consecutive_failures,
+            "next_retry_in": round(breaker.retry_in(), 1),
+        }
+
+class ScribeReadyBinarySensor(BinarySensorEntity):
+    """Binary sensor for the end of the background startup.
+
+    On once the schema is set up, the metadata tables are synced and the
+    stats sensors had their first refresh. Until then rows are only queued.
+    """
+
+    _attr_has_entity_name = True
+
+    def __init__(self, writer, entry, startup_complete):
+        """Initialize the sensor."""
+        self._writer = writer
+        self._startup_complete = startup_complete
+        self._attr_unique_id = f"{entry.entry_id}_ready"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry.entry_id)},
+            "name": "Scribe",
+            "manufacturer": "Jonathan Gatard",
+        }
+        self.entity_description = BinarySensorEntityDescription(
+            key="ready",
+            name="Ready",
+            icon="mdi:database-check",
+        )
+
+    @property
+    def is_on(self) -> bool:
+        """Return True once the background startup has finished."""
+        return self._startup_complete.is_set()
+
+    @property
+    def extra_state_attributes(self):
+        """Return whether the schema is set up and how many rows are waiting for it."""
+        return {
+            "database_initialized": self._writer.ready,
+            "queued_rows": self._writer.queue_size,
         }
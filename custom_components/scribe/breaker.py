@@ -0,0 +1,114 @@
+"""Connection circuit breaker for the Scribe writer.
+
+Tracks whether the database is usable and spaces out reconnection attempts:
+
+* closed: writes go through. After `failure_threshold` consecutive failed
+  batches the breaker opens.
+* open: no writes are attempted until the backoff delay has elapsed. The delay
+  doubles on every consecutive opening (with jitter) up to `max_backoff`.
+* half-open: a single probe batch is let through. Success closes the breaker,
+  failure opens it again with a longer delay.
+
+It also rate-limits error logging so an outage produces one traceback and then
+periodic summaries instead of one traceback per attempt.
+"""
+from __future__ import annotations
+
+import random
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BASE_BACKOFF = 1.0  # seconds
+DEFAULT_MAX_BACKOFF = 300.0  # seconds
+LOG_INTERVAL = 60.0  # seconds between repeated error logs
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state machine with exponential backoff."""
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        base_backoff: float = DEFAULT_BASE_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+    ):
+        """Initialize the breaker in the closed state."""
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max(max_backoff, base_backoff)
+
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.openings = 0  # consecutive openings, drives the backoff exponent
+        self.retry_at = 0.0
+        self._probing = False
+
+        self._last_log = None
+        self.suppressed_errors = 0
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == STATE_CLOSED
+
+    def allow_request(self, now: float | None = None) -> bool:
+        """Return True if a batch may be written now.
+
+        An open breaker whose delay has elapsed moves to half-open and lets
+        exactly one probe through.
+        """
+        if self.state == STATE_CLOSED:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.state == STATE_OPEN and now >= self.retry_at:
+            self.state = STATE_HALF_OPEN
+            self._probing = False
+        if self.state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> bool:
+        """Record a committed batch. Returns True if this closed the breaker."""
+        recovered = self.state != STATE_CLOSED
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.openings = 0
+        self._probing = False
+        self._last_log = None
+        self.suppressed_errors = 0
+        return recovered
+
+    def record_failure(self, now: float | None = None) -> None:
+        """Record a failed batch and open the breaker if needed."""
+        now = time.monotonic() if now is None else now
+        self.consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = STATE_OPEN
+            self._probing = False
+            self.openings += 1
+            self.retry_at = now + self.backoff()
+
+    def backoff(self) -> float:
+        """Return the delay before the next probe, with jitter (50-100% of the step)."""
+        step = min(self.base_backoff * 2 ** max(self.openings - 1, 0), self.max_backoff)
+        return step * random.uniform(0.5, 1.0)
+
+    def retry_in(self, now: float | None = None) -> float:
+        """Return the seconds left until the next probe (0 if not open)."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(self.retry_at - now, 0.0)
+
+    def should_log(self, now: float | None = None) -> bool:
+        """Return True if an error should be logged now, else count it as suppressed."""
+        now = time.monotonic() if now is None else now
+        if self._last_log is None or now - self._last_log >= LOG_INTERVAL:
+            self._last_log = now
+            return True
+        self.suppressed_errors += 1
+        return False
@@ -0,0 +1,124 @@
+"""Column-oriented staging buffers for Scribe.
+
+Rows waiting to be written are kept per table as parallel column lists instead of
+one dict per row. This keeps the memory footprint of a full queue small (one list
+slot per value instead of a dict per row) and lets a flush hand off whole column
+blocks to the write path without walking and splitting the queue.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+
+class ColumnBlock:
+    """A batch of rows taken from a ColumnBuffer, stored column by column."""
+
+    __slots__ = ("columns", "data")
+
+    def __init__(self, columns: tuple[str, ...], data: list[list]):
+        """Initialize the block."""
+        self.columns = columns
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data[0])
+
+    def rows(self) -> Iterator[tuple]:
+        """Return the rows as tuples in column order (used by COPY)."""
+        return zip(*self.data)
+
+    def records(self) -> list[dict[str, Any]]:
+        """Return the rows as dicts keyed by column (used by executemany)."""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in zip(*self.data)]
+
+    def column(self, name: str) -> list:
+        """Return the values of a single column."""
+        return self.data[self.columns.index(name)]
+
+    @classmethod
+    def merge(cls, columns: tuple[str, ...], blocks: list[ColumnBlock]) -> ColumnBlock:
+        """Concatenate several blocks of the same table into one."""
+        data: list[list] = [[] for _ in columns]
+        for block in blocks:
+            for merged, column in zip(data, block.data):
+                merged.extend(column)
+        return cls(columns, data)
+
+
+class ColumnBuffer:
+    """Staging buffer holding one table's pending rows as parallel column lists.
+
+    Evicting or taking the oldest rows only moves a head offset; the underlying
+    lists are compacted once more than half of them is dead, so eviction stays
+    O(1) amortized like the deque it replaces, and draining a backlog in
+    batch_size slices is linear in the rows taken.
+    """
+
+    __slots__ = ("_data", "_head", "columns")
+
+    def __init__(self, columns: tuple[str, ...]):
+        """Initialize an empty buffer for the given columns."""
+        self.columns = tuple(columns)
+        self._data: list[list] = [[] for _ in self.columns]
+        self._head = 0
+
+    def __len__(self) -> int:
+        return len(self._data[0]) - self._head
+
+    def append(self, values: tuple) -> None:
+        """Append one row given as a tuple in column order."""
+        for column, value in zip(self._data, values):
+            column.append(value)
+
+    def append_row(self, row: Mapping[str, Any]) -> None:
+        """Append one row given as a mapping of column name to value."""
+        for column, name in zip(self._data, self.columns):
+            column.append(row.get(name))
+
+    def popleft(self, count: int = 1) -> int:
+        """Evict up to `count` of the oldest rows. Returns the number evicted."""
+        count = min(count, len(self))
+        if count <= 0:
+            return 0
+        self._head += count
+        if self._head > len(self._data[0]) // 2:
+            self._compact()
+        return count
+
+    def take(self, limit: int | None = None) -> ColumnBlock:
+        """Remove and return the oldest `limit` rows (default: all) as a ColumnBlock."""
+        head = self._head
+        if limit is None or limit >= len(self):
+            data = [column[head:] for column in self._data] if head else self._data
+            self._data = [[] for _ in self.columns]
+            self._head = 0
+            return ColumnBlock(self.columns, data)
+        block = ColumnBlock(self.columns, [column[head:head + limit] for column in self._data])
+        self.popleft(limit)
+        return block
+
+    def column(self, name: str) -> list:
+        """Return the pending values of a single column (read-only view)."""
+        self._compact()
+        return self._data[self.columns.index(name)]
+
+    def extract(self, indices: list[int]) -> ColumnBlock:
+        """Remove the rows at the given (sorted) positions and return them as a block."""
+        self._compact()
+        drop = set(indices)
+        removed = [[column[i] for i in indices] for column in self._data]
+        self._data = [[v for i, v in enumerate(column) if i not in drop] for column in self._data]
+        return ColumnBlock(self.columns, removed)
+
+    def prepend(self, block: ColumnBlock) -> None:
+        """Put a block back in front of the pending rows (e.g. after a failed write)."""
+        self._compact()
+        self._data = [old + new for old, new in zip(block.data, self._data)]
+
+    def _compact(self) -> None:
+        if self._head:
+            for column in self._data:
+                del column[:self._head]
+            self._head = 0
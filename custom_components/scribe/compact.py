@@ -0,0 +1,74 @@
+"""Value encodings of the compact events schema.
+
+With compact_events enabled, events rows store:
+
+* context ids (ULIDs) and parent ids as 16-byte BYTEA instead of 26-char text,
+* the context user id (a UUID hex string) as 16-byte BYTEA,
+* the origin as a SMALLINT index into ORIGINS.
+
+Values that do not round-trip through the binary form (custom context ids,
+unexpected origins) are kept in the original text column so nothing is lost.
+The scribe_ulid_text() SQL function turns binary ULIDs back into text for
+events_view.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from homeassistant.util.ulid import bytes_to_ulid, ulid_to_bytes
+
+# Index stored in origin_idx, in the order of homeassistant.core.EventOrigin
+ORIGINS = ("LOCAL", "REMOTE")
+ORIGIN_IDX = {origin: idx for idx, origin in enumerate(ORIGINS)}
+
+ULID_TEXT_FUNCTION = """
+    CREATE OR REPLACE FUNCTION scribe_ulid_text(value BYTEA) RETURNS TEXT AS $$
+    DECLARE
+        alphabet CONSTANT TEXT := '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+        bits BIT(130);
+        result TEXT := '';
+    BEGIN
+        IF value IS NULL OR length(value) <> 16 THEN
+            RETURN NULL;
+        END IF;
+        bits := B'00' || ('x' || encode(value, 'hex'))::BIT(128);
+        FOR i IN 0..25 LOOP
+            result := result || substr(alphabet, substring(bits FROM i * 5 + 1 FOR 5)::INTEGER + 1, 1);
+        END LOOP;
+        RETURN result;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE STRICT;
+"""
+
+
+def ulid_to_bin(value: str) -> bytes | None:
+    """Return the 16-byte form of a canonical ULID, or None."""
+    if len(value) != 26:
+        return None
+    try:
+        binary = ulid_to_bytes(value)
+    except ValueError:
+        return None
+    return binary if bytes_to_ulid(binary) == value else None
+
+
+def uuid_hex_to_bin(value: str) -> bytes | None:
+    """Return the 16-byte form of a lowercase UUID hex string, or None."""
+    if len(value) != 32:
+        return None
+    try:
+        binary = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return binary if binary.hex() == value else None
+
+
+def split_column(values: list[str | None], encode: Callable[[str], bytes | None]) -> tuple[list, list]:
+    """Encode a text column: returns (binary values, text kept where encoding failed)."""
+    binaries = []
+    leftovers = []
+    for value in values:
+        binary = encode(value) if value else None
+        binaries.append(binary)
+        leftovers.append(value if binary is None else None)
+    return binaries, leftovers
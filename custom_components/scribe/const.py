@@ -71,4 +71,105 @@ CONF_ENABLE_INTEGRATIONS = "enable_table_integrations"
 DEFAULT_ENABLE_INTEGRATIONS = True
 
 CONF_ENABLE_USERS = "enable_table_users"
-DEFAULT_ENABLE_USERS = True
\ No newline at end of file
+DEFAULT_ENABLE_USERS = True
+
+# Write method used by the writer for states/events batches
+CONF_WRITE_METHOD = "write_method"
+WRITE_METHOD_INSERT = "insert"
+WRITE_METHOD_COPY = "copy"
+DEFAULT_WRITE_METHOD = WRITE_METHOD_INSERT
+
+# Disk spill for buffer_on_failure
+CONF_SPILL_TO_DISK = "spill_to_disk"
+CONF_SPILL_MAX_SIZE = "spill_max_size"
+CONF_SPILL_COMPRESSION = "spill_compression"
+DEFAULT_SPILL_TO_DISK = False
+DEFAULT_SPILL_MAX_SIZE = 512  # MB
+DEFAULT_SPILL_COMPRESSION = "zlib"
+
+# Flush scheduler
+CONF_MAX_INFLIGHT_BATCHES = "max_inflight_batches"
+DEFAULT_MAX_INFLIGHT_BATCHES = 3
+
+# Adaptive batching
+CONF_ADAPTIVE_BATCHING = "adaptive_batching"
+CONF_MIN_BATCH_SIZE = "min_batch_size"
+CONF_MAX_BATCH_SIZE = "max_batch_size"
+CONF_MIN_FLUSH_INTERVAL = "min_flush_interval"
+CONF_MAX_FLUSH_INTERVAL = "max_flush_interval"
+CONF_TARGET_LAG = "target_lag"
+DEFAULT_ADAPTIVE_BATCHING = False
+DEFAULT_MIN_BATCH_SIZE = 100
+DEFAULT_MAX_BATCH_SIZE = 5000
+DEFAULT_MIN_FLUSH_INTERVAL = 1  # seconds
+DEFAULT_MAX_FLUSH_INTERVAL = 30  # seconds
+DEFAULT_TARGET_LAG = 10  # seconds
+
+# Circuit breaker
+CONF_MAX_RETRY_BACKOFF = "max_retry_backoff"
+DEFAULT_MAX_RETRY_BACKOFF = 300  # seconds
+
+# Queue overflow policy
+CONF_OVERFLOW_POLICY = "overflow_policy"
+CONF_QUEUE_QUOTA_STATES = "queue_quota_states"
+CONF_QUEUE_QUOTA_EVENTS = "queue_quota_events"
+CONF_PRIORITIES = "priorities"
+CONF_SAMPLE_RATE = "sample_rate"
+DEFAULT_OVERFLOW_POLICY = "drop_oldest"
+DEFAULT_SAMPLE_RATE = 0.1
+
+# Run the writer in a child process
+CONF_WORKER_PROCESS = "worker_process"
+DEFAULT_WORKER_PROCESS = False
+
+# Shared (deduplicated) state attributes
+CONF_SHARED_ATTRIBUTES = "shared_attributes"
+CONF_ATTRIBUTES_CACHE_SIZE = "attributes_cache_size"
+DEFAULT_SHARED_ATTRIBUTES = False
+DEFAULT_ATTRIBUTES_CACHE_SIZE = 4096
+
+# Entity id dictionary encoding of the states table
+CONF_METADATA_IDS = "metadata_ids"
+DEFAULT_METADATA_IDS = False
+
+# Compact events schema (event_type ids, binary contexts, origin index)
+CONF_COMPACT_EVENTS = "compact_events"
+DEFAULT_COMPACT_EVENTS = False
+
+# Narrow table for numeric states
+CONF_NUMERIC_TABLE = "numeric_table"
+CONF_NUMERIC_COMPRESS_AFTER = "numeric_compress_after"
+DEFAULT_NUMERIC_TABLE = False
+
+# Typed state encoding
+CONF_STATE_ENUMS = "state_enums"
+CONF_STATE_ENUM_DOMAINS = "state_enum_domains"
+DEFAULT_STATE_ENUMS = False
+
+# Span storage
+CONF_STATE_SPANS = "state_spans"
+CONF_SPAN_DOMAINS = "span_domains"
+DEFAULT_STATE_SPANS = False
+
+# Deadband compression of numeric states at ingest
+CONF_DEADBAND = "deadband"
+
+# Per-entity rate limit of state rows
+CONF_THROTTLE = "throttle"
+
+# Skip state rows identical to the previous one
+CONF_SKIP_DUPLICATES = "skip_duplicates"
+CONF_DUPLICATE_HEARTBEAT = "duplicate_heartbeat"
+DEFAULT_SKIP_DUPLICATES = False
+
+# Skip the startup state storm using the last stored states
+CONF_SUPPRESS_RESTART_STATES = "suppress_restart_states"
+DEFAULT_SUPPRESS_RESTART_STATES = False
+
+# Non-blocking startup
+CONF_BACKGROUND_STARTUP = "background_startup"
+DEFAULT_BACKGROUND_STARTUP = False
+
+# Chunk-by-chunk data migrations of the history
+CONF_MIGRATIONS = "migrations"
+CONF_MIGRATION_PAUSE = "migration_pause"
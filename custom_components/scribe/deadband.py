@@ -0,0 +1,120 @@
+"""Lossy compression of numeric states at ingest (deadband / swinging door).
+
+Rules are configured per entity_id, per device class ("device_class:power")
+or per domain, the most specific one wins. Each entity with a rule gets its
+own filter, which decides for every numeric value whether it is written:
+
+* absolute: write when the value moved more than `threshold` from the last
+  written value.
+* percent: the same with `threshold` percent of the last written value.
+* swinging_door: keep a corridor of +/- `threshold` around the line from the
+  last written point. When a new point no longer fits, the point before it
+  (the end of the line) is written. Straight ramps and flat runs cost two
+  rows, whatever their length.
+
+A point is always written when `max_gap` seconds passed since the last
+written point, so a flat sensor still shows up regularly.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any
+
+DEADBAND_ABSOLUTE = "absolute"
+DEADBAND_PERCENT = "percent"
+DEADBAND_SWINGING_DOOR = "swinging_door"
+DEADBAND_MODES = [DEADBAND_ABSOLUTE, DEADBAND_PERCENT, DEADBAND_SWINGING_DOOR]
+
+DEFAULT_MAX_GAP = 900
+
+DEVICE_CLASS_PREFIX = "device_class:"
+
+
+def find_rule(rules: Mapping[str, Mapping[str, Any]], entity_id: str, device_class: str | None) -> Mapping[str, Any] | None:
+    """Return the rule of an entity: exact entity_id first, then its device class, then its domain."""
+    rule = rules.get(entity_id)
+    if rule is None and device_class:
+        rule = rules.get(f"{DEVICE_CLASS_PREFIX}{device_class}")
+    if rule is None:
+        rule = rules.get(entity_id.split(".", 1)[0])
+    return rule
+
+
+class DeadbandFilter:
+    """Per-entity filter of numeric values."""
+
+    __slots__ = ("_held", "_lower", "_time", "_upper", "_value", "max_gap", "mode", "threshold")
+
+    def __init__(self, mode: str, threshold: float, max_gap: float = DEFAULT_MAX_GAP):
+        """Initialize a filter with no written point yet."""
+        self.mode = mode
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the last written point (after a non-numeric state)."""
+        self._time: datetime | None = None
+        self._value = 0.0
+        self._held: tuple[datetime, float, Any] | None = None
+        self._upper = 0.0
+        self._lower = 0.0
+
+    def pop_held(self) -> Any:
+        """Return the row held back by the swinging door (end of the current line), if any."""
+        held = self._held
+        self._held = None
+        return held[2] if held is not None else None
+
+    def offer(self, time: datetime, value: float, row: Any) -> tuple:
+        """Offer a point; returns the rows to write now (none, one or two)."""
+        if self._time is None:
+            self._archive(time, value)
+            return (row,)
+
+        elapsed = (time - self._time).total_seconds()
+        if self.mode != DEADBAND_SWINGING_DOOR:
+            if self.mode == DEADBAND_PERCENT:
+                band = abs(self._value) * self.threshold / 100
+            else:
+                band = self.threshold
+            if abs(value - self._value) > band or elapsed >= self.max_gap:
+                self._archive(time, value)
+                return (row,)
+            return ()
+
+        if elapsed <= 0:
+            # Same timestamp as the written point: nothing to draw a line with
+            return ()
+
+        written = ()
+        upper = (value + self.threshold - self._value) / elapsed
+        lower = (value - self.threshold - self._value) / elapsed
+        if self._held is None:
+            self._upper, self._lower = upper, lower
+        else:
+            self._upper = min(self._upper, upper)
+            self._lower = max(self._lower, lower)
+            if self._lower > self._upper:
+                # The door closed: the previous point ends the line and starts a new one
+                held_time, held_value, held_row = self._held
+                written = (held_row,)
+                self._archive(held_time, held_value)
+                elapsed = (time - held_time).total_seconds()
+                if elapsed <= 0:
+                    self._archive(time, value)
+                    return (held_row, row)
+                self._upper = (value + self.threshold - held_value) / elapsed
+                self._lower = (value - self.threshold - held_value) / elapsed
+
+        if elapsed >= self.max_gap:
+            self._archive(time, value)
+            return (*written, row)
+        self._held = (time, value, row)
+        return written
+
+    def _archive(self, time: datetime, value: float) -> None:
+        self._time = time
+        self._value = value
+        self._held = None
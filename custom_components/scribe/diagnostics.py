@@ -7,7 +7,7 @@ from homeassistant.components.diagnostics import async_redact_data
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
-from .const import CONF_DB_URL, CONF_DB_PASSWORD, CONF_DB_USER
+from .const import DOMAIN, CONF_DB_URL, CONF_DB_PASSWORD, CONF_DB_USER
 
 TO_REDACT = {CONF_DB_URL, CONF_DB_PASSWORD, CONF_DB_USER}
 
@@ -15,7 +15,20 @@ async def async_get_config_entry_diagnostics(
     hass: HomeAssistant, entry: ConfigEntry
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
-    return {
+    diagnostics = {
         "entry": async_redact_data(entry.as_dict(), TO_REDACT),
         "options": async_redact_data(entry.options, TO_REDACT),
     }
+    
+    # Rows suppressed by throttle rules, per entity
+    ingest_plans = hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("ingest_plans")
+    if ingest_plans is not None and ingest_plans.throttle_rules:
+        diagnostics["throttle_suppressed"] = ingest_plans.throttle_suppressed()
+    
+    # State rows skipped as identical to the previous row of their entity
+    if ingest_plans is not None and ingest_plans.skip_duplicates:
+        diagnostics["duplicates_skipped"] = ingest_plans.duplicates_skipped
+    if ingest_plans is not None and ingest_plans.suppress_restart_states:
+        diagnostics["restart_suppressed"] = ingest_plans.restart_suppressed
+    
+    return diagnostics
@@ -0,0 +1,41 @@
+"""JSON encoding for the Scribe ingest path.
+
+State attributes and event data are encoded on the event loop for every state
+change and every event, so this uses orjson (a Home Assistant core dependency)
+instead of the stdlib encoder. Types orjson does not know are handed to Home
+Assistant's default encoder (sets, objects with as_dict, ...) and finally to
+str(), which matches the previous json.dumps(..., default=str) behaviour.
+Payloads orjson rejects outright (e.g. integers wider than 64 bits) fall back
+to the stdlib encoder.
+
+State attributes are encoded with sorted keys, so the same attributes in a
+different key order give the same string (shared attributes ids, duplicate
+detection).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import orjson
+from homeassistant.helpers.json import json_encoder_default
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Encode types orjson does not support natively."""
+    try:
+        return json_encoder_default(obj)
+    except TypeError:
+        return str(obj)
+
+
+def encode_json(data: Any, sort_keys: bool = False) -> str:
+    """Encode attributes or event data to a JSON string for a JSONB column."""
+    option = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else ORJSON_OPTIONS
+    try:
+        # asyncpg's jsonb codec and the INSERT path both bind text, so decode here
+        return orjson.dumps(data, option=option, default=_default).decode()
+    except (TypeError, ValueError):
+        return json.dumps(data, default=str, sort_keys=sort_keys)
@@ -0,0 +1,113 @@
+"""Typed (enumerated) state encoding for Scribe.
+
+With state_enums enabled, states of binary and enumerated domains are stored as
+a SMALLINT state_idx instead of the state text, using per-domain mappings kept
+in the state_enums table:
+
+* Binary domains have fixed mappings where the "active" state is 1 (on, home,
+  open, locked, ...), so avg(state_idx) is the share of time spent active.
+* unknown / unavailable are -1 / -2 in every domain.
+* Other configured domains (climate, select, ...) get an index allocated the
+  first time a state is seen, up to MAX_STATES_PER_DOMAIN states.
+
+States that have no index (other domains, or a full domain) keep their text.
+"""
+from __future__ import annotations
+
+SPECIAL_STATES = {"unknown": -1, "unavailable": -2}
+
+_ON_OFF = {"off": 0, "on": 1}
+_HOME = {"not_home": 0, "home": 1}
+
+BUILTIN_STATES = {
+    "automation": _ON_OFF,
+    "binary_sensor": _ON_OFF,
+    "fan": _ON_OFF,
+    "humidifier": _ON_OFF,
+    "input_boolean": _ON_OFF,
+    "light": _ON_OFF,
+    "remote": _ON_OFF,
+    "script": _ON_OFF,
+    "siren": _ON_OFF,
+    "switch": _ON_OFF,
+    "device_tracker": _HOME,
+    "person": _HOME,
+    "cover": {"closed": 0, "open": 1, "closing": 2, "opening": 3},
+    "lock": {"unlocked": 0, "locked": 1, "unlocking": 2, "locking": 3, "jammed": 4, "open": 5, "opening": 6},
+    "sun": {"below_horizon": 0, "above_horizon": 1},
+}
+
+# Domains whose states are enumerated on the fly
+DEFAULT_ENUM_DOMAINS = [
+    "alarm_control_panel",
+    "climate",
+    "input_select",
+    "media_player",
+    "select",
+    "vacuum",
+    "water_heater",
+    "weather",
+]
+
+MAX_STATES_PER_DOMAIN = 256
+
+
+class StateEnums:
+    """In-memory per-domain state mappings."""
+
+    def __init__(self, domains: list[str] | None = None):
+        """Initialize with the built-in mappings; `domains` are enumerated on the fly."""
+        self.dynamic_domains = set(DEFAULT_ENUM_DOMAINS if domains is None else domains) - set(BUILTIN_STATES)
+        self.mappings: dict[str, dict[str, int]] = {
+            domain: {**SPECIAL_STATES, **states} for domain, states in BUILTIN_STATES.items()
+        }
+        for domain in self.dynamic_domains:
+            self.mappings[domain] = dict(SPECIAL_STATES)
+
+    def seed_rows(self) -> list[dict]:
+        """Return the mappings as rows for the state_enums table."""
+        return [
+            {"domain": domain, "state": state, "state_idx": idx}
+            for domain, states in self.mappings.items()
+            for state, idx in states.items()
+        ]
+
+    def load(self, rows) -> None:
+        """Update the in-memory mappings with (domain, state, state_idx) rows from the database."""
+        for domain, state, idx in rows:
+            self.mappings.setdefault(domain, {})[state] = idx
+
+    def encode(self, entity_ids: list[str], states: list[str | None]) -> tuple[list, list, set[tuple[str, str]]]:
+        """Encode a states column.
+
+        Returns the state_idx values, the state text kept for rows without an
+        index, and the (domain, state) pairs of dynamic domains that need one.
+        """
+        mappings = self.mappings
+        indices = []
+        leftovers = []
+        missing = set()
+        for entity_id, state in zip(entity_ids, states):
+            domain = entity_id.split(".", 1)[0]
+            mapping = mappings.get(domain)
+            idx = None if mapping is None or state is None else mapping.get(state)
+            if idx is None and mapping is not None and state is not None and domain in self.dynamic_domains:
+                missing.add((domain, state))
+            indices.append(idx)
+            leftovers.append(state if idx is None else None)
+        return indices, leftovers, missing
+
+    def allocate(self, missing: set[tuple[str, str]]) -> list[dict]:
+        """Pick indices for new states of dynamic domains (not applied until loaded back)."""
+        rows = []
+        next_idx = {}
+        for domain, state in sorted(missing):
+            if state in self.mappings[domain]:
+                continue
+            if domain not in next_idx:
+                next_idx[domain] = max([0, *self.mappings[domain].values()]) + 1
+            if next_idx[domain] >= MAX_STATES_PER_DOMAIN:
+                continue
+            rows.append({"domain": domain, "state": state, "state_idx": next_idx[domain]})
+            next_idx[domain] += 1
+        return rows
@@ -0,0 +1,272 @@
+"""Per-entity ingest plans for Scribe.
+
+handle_event runs for every state_changed event. The include/exclude filter
+(domain sets and glob patterns) and the attribute rules only depend on the
+entity, so they are resolved once per entity_id into an IngestPlan and cached.
+Afterwards an event costs one dict lookup plus the work the plan leaves:
+
+* Entities whose last state was not numeric skip float() for states that
+  cannot be numbers (first character is a letter other than i/n, as in "on",
+  "off", "unavailable"), so the exception path is not taken on every event.
+* Attributes are passed through without copying when none of the excluded
+  keys is present.
+* Entities with a deadband rule carry their DeadbandFilter, which decides
+  which numeric values are written.
+* Entities matching a throttle rule carry their TokenBucket. Buckets outlive
+  the plans, so a registry update does not reset a rate limit.
+* With skip_duplicates, the plan keeps a hash of the last written (state,
+  value, filtered attributes) and rows identical to it are skipped, e.g. when
+  only an excluded attribute changed. Rows held by the deadband or suppressed
+  by the throttle do not count as written. A row is still written every
+  `duplicate_heartbeat` seconds.
+* With suppress_restart_states, the last stored state of every entity is
+  loaded at startup. The first row of an entity after a restart is skipped
+  if it matches it, so the startup state storm does not rewrite the table.
+
+The cache is rebuilt when the entry is reloaded (options change) and entries
+are dropped on entity registry updates.
+"""
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from .deadband import DEFAULT_MAX_GAP, DeadbandFilter, find_rule
+from .throttle import DEFAULT_WINDOW, TokenBucket, compile_rules
+from .throttle import find_rule as find_throttle_rule
+
+DEFAULT_DUPLICATE_HEARTBEAT = 3600
+
+# Seconds after setup during which the stored states are matched against first rows
+RESTART_WINDOW = 600
+
+# First characters float() may accept besides digits, signs, dots and spaces ("inf", "nan")
+_FLOAT_LETTERS = frozenset("iInN")
+
+
+class IngestPlan:
+    """What to do with the state changes of one entity."""
+
+    __slots__ = ("deadband", "exclude_attributes", "fingerprint", "fingerprint_time", "include", "numeric", "throttle")
+
+    def __init__(
+        self,
+        include: bool,
+        exclude_attributes: frozenset[str],
+        deadband: DeadbandFilter | None = None,
+        throttle: TokenBucket | None = None,
+    ):
+        """Initialize a plan; numeric is learned from the states seen."""
+        self.include = include
+        self.numeric = True
+        self.exclude_attributes = exclude_attributes
+        self.deadband = deadband
+        self.throttle = throttle
+        self.fingerprint: int | None = None
+        self.fingerprint_time = None
+
+    def parse_state(self, state: Any) -> tuple[str | None, float | None]:
+        """Return (state, value): the float value of numeric states, else the text."""
+        if not self.numeric and state and state[0].isascii() and state[0].isalpha() and state[0] not in _FLOAT_LETTERS:
+            return state, None
+        try:
+            value = float(state)
+        except (ValueError, TypeError):
+            self.numeric = False
+            return state, None
+        self.numeric = True
+        return None, value
+
+    def filter_attributes(self, attributes: Mapping[str, Any]) -> Mapping[str, Any]:
+        """Return the attributes without the excluded keys."""
+        exclude = self.exclude_attributes
+        if not exclude or exclude.isdisjoint(attributes):
+            return attributes
+        return {k: v for k, v in attributes.items() if k not in exclude}
+
+
+class IngestPlanCache:
+    """IngestPlan per entity_id, built the first time an entity is seen."""
+
+    def __init__(
+        self,
+        entity_filter: Callable[[str], bool],
+        exclude_attributes: set[str],
+        deadband_rules: Mapping[str, Mapping[str, Any]] | None = None,
+        throttle_rules: Mapping[str, Mapping[str, Any]] | None = None,
+        skip_duplicates: bool = False,
+        duplicate_heartbeat: float = DEFAULT_DUPLICATE_HEARTBEAT,
+        suppress_restart_states: bool = False,
+    ):
+        """Initialize an empty cache."""
+        self._entity_filter = entity_filter
+        self._exclude_attributes = frozenset(exclude_attributes)
+        self.deadband_rules = dict(deadband_rules or {})
+        self.throttle_rules = compile_rules(throttle_rules or {})
+        self._plans: dict[str, IngestPlan] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self.skip_duplicates = skip_duplicates
+        self.duplicate_heartbeat = duplicate_heartbeat
+        self.duplicates_skipped = 0
+        
+        # Last stored (state, value, attributes) per entity, until its first row after a restart
+        self.suppress_restart_states = suppress_restart_states
+        self._restart_states: dict[str, tuple] = {}
+        self.restart_suppressed = 0
+        
+        # Numeric values offered to deadband filters, and rows they let through
+        self.deadband_offered = 0
+        self.deadband_written = 0
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    @property
+    def deadband_ratio(self) -> float | None:
+        """Share of the numeric values of deadband entities that were not written (0-1)."""
+        if not self.deadband_offered:
+            return None
+        return max(0.0, 1 - self.deadband_written / self.deadband_offered)
+
+    def get(self, entity_id: str, attributes: Mapping[str, Any] | None = None) -> IngestPlan:
+        """Return the plan of an entity (attributes give the device class of a new entity)."""
+        plan = self._plans.get(entity_id)
+        if plan is None:
+            include = bool(self._entity_filter(entity_id))
+            deadband = None
+            if include and self.deadband_rules:
+                device_class = attributes.get("device_class") if attributes else None
+                rule = find_rule(self.deadband_rules, entity_id, device_class)
+                if rule is not None:
+                    deadband = DeadbandFilter(rule["mode"], rule["threshold"], rule.get("max_gap", DEFAULT_MAX_GAP))
+            throttle = self._buckets.get(entity_id)
+            if include and throttle is None and self.throttle_rules:
+                rule = find_throttle_rule(self.throttle_rules, entity_id)
+                if rule is not None:
+                    throttle = self._buckets[entity_id] = TokenBucket(
+                        rule["max_rows"], rule.get("window", DEFAULT_WINDOW), time.monotonic()
+                    )
+            plan = self._plans[entity_id] = IngestPlan(include, self._exclude_attributes, deadband, throttle)
+        return plan
+
+    def apply_throttle(self, plan: IngestPlan, rows: tuple, now: float | None = None) -> list[dict]:
+        """Return the rows the entity's token bucket lets through; the last suppressed one stays pending."""
+        if now is None:
+            now = time.monotonic()
+        bucket = plan.throttle
+        return [row for row in rows if bucket.offer(row, now)]
+
+    def release_throttled(self, now: float | None = None) -> list[dict]:
+        """Return the pending rows of entities whose bucket has a token again."""
+        if now is None:
+            now = time.monotonic()
+        rows = []
+        for entity_id, bucket in self._buckets.items():
+            if bucket.pending is not None:
+                row = bucket.release(now)
+                if row is not None:
+                    rows.append(row)
+                    if self.skip_duplicates:
+                        self.record_written(self._plans.get(entity_id), row)
+        return rows
+
+    def throttle_suppressed(self) -> dict[str, int]:
+        """Return the number of suppressed rows per throttled entity."""
+        return {entity_id: bucket.suppressed for entity_id, bucket in self._buckets.items() if bucket.suppressed}
+
+    def is_duplicate(self, plan: IngestPlan, row: dict) -> bool:
+        """Return True if a state row repeats the entity's last written row within the heartbeat."""
+        last_time = plan.fingerprint_time
+        if (
+            last_time is not None
+            and hash((row["state"], row["value"], row["attributes"])) == plan.fingerprint
+            and (row["time"] - last_time).total_seconds() < self.duplicate_heartbeat
+        ):
+            self.duplicates_skipped += 1
+            return True
+        return False
+
+    def record_written(self, plan: IngestPlan | None, row: dict) -> None:
+        """Remember a state row that is written, the reference of is_duplicate."""
+        if plan is not None:
+            plan.fingerprint = hash((row["state"], row["value"], row["attributes"]))
+            plan.fingerprint_time = row["time"]
+
+    @property
+    def restarting(self) -> bool:
+        """Return True while stored states are waiting for the first row of their entity."""
+        return bool(self._restart_states)
+
+    def load_restart_states(self, rows) -> None:
+        """Load (entity_id, state, value, attributes) rows; entities already seen are skipped."""
+        for entity_id, state, value, attributes in rows:
+            if entity_id not in self._plans:
+                self._restart_states[entity_id] = (state, value, attributes)
+
+    def clear_restart_states(self) -> None:
+        """Forget the stored states that were not matched (end of the startup window)."""
+        self._restart_states.clear()
+
+    def is_restart_duplicate(self, row: dict) -> bool:
+        """Return True if the first row of an entity after a restart repeats its stored state."""
+        stored = self._restart_states.pop(row["entity_id"], None)
+        if stored is None:
+            return False
+        state, value, stored_attributes = stored
+        if state != row["state"] or value != row["value"]:
+            return False
+        # Attributes of rows in states_numeric are not stored
+        if stored_attributes is not None and json.loads(row["attributes"]) != stored_attributes:
+            return False
+        self.restart_suppressed += 1
+        return True
+
+    def apply_deadband(self, plan: IngestPlan, row: dict) -> tuple:
+        """Return the rows to write for a state row of an entity with a deadband filter."""
+        deadband = plan.deadband
+        value = row["value"]
+        if value is None:
+            # A non-numeric state ends the line: write its last point, then the state
+            held = deadband.pop_held()
+            deadband.reset()
+            if held is None:
+                return (row,)
+            self.deadband_written += 1
+            return (held, row)
+        rows = deadband.offer(row["time"], value, row)
+        self.deadband_offered += 1
+        self.deadband_written += len(rows)
+        return rows
+
+    def pop_held(self) -> list[dict]:
+        """Return the rows held back by deadband filters and throttling (on shutdown)."""
+        rows = self._held_rows(self._plans.values())
+        for bucket in self._buckets.values():
+            row = bucket.pop_pending()
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def invalidate(self, *entity_ids: str | None) -> list[dict]:
+        """Drop the plans of the given entities, or all plans.
+
+        Returns the rows their deadband filters were holding back.
+        """
+        if entity_ids:
+            plans = [self._plans.pop(entity_id) for entity_id in entity_ids if entity_id in self._plans]
+        else:
+            plans = list(self._plans.values())
+            self._plans.clear()
+        return self._held_rows(plans)
+
+    def _held_rows(self, plans) -> list[dict]:
+        rows = []
+        for plan in plans:
+            if plan.deadband is not None:
+                held = plan.deadband.pop_held()
+                if held is not None:
+                    rows.append(held)
+        self.deadband_written += len(rows)
+        return rows
@@ -0,0 +1,223 @@
+"""Online chunk-by-chunk data migrations for Scribe.
+
+Storage options such as metadata_ids or state_enums only apply to new rows;
+the history keeps its old layout. A data migration rewrites that history one
+chunk at a time, in the background, while ingest continues:
+
+* Every chunk is processed in its own transaction: decompress (if it is
+  compressed at that point; the compression policy may have run since the
+  chunks were listed), run the migration's statements, recompress what was
+  decompressed, and record the chunk in MIGRATIONS_TABLE. A restart resumes with the next unrecorded chunk.
+* Between chunks the migrator sleeps at least `pause` seconds, and at least
+  as long as the last chunk took, so it never takes more than about half of
+  the database time. It also waits while the writer is busy (a full batch
+  queued or the circuit breaker not closed).
+* Once all chunks are done, a row with chunk '*' marks the migration as
+  completed and it is skipped from then on.
+
+The statements only touch rows still in the old layout, so rows written in
+the new layout while the migration runs are left alone.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+from sqlalchemy import text
+
+_LOGGER = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "scribe_migrations"
+
+# Marker chunk of a completed migration
+COMPLETED = "*"
+
+DEFAULT_MIGRATION_PAUSE = 5  # seconds
+
+MIGRATION_METADATA_IDS = "metadata_ids"
+MIGRATION_STATE_ENUMS = "state_enums"
+MIGRATION_NAMES = [MIGRATION_METADATA_IDS, MIGRATION_STATE_ENUMS]
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class ChunkMigration:
+    """Statements applied to every chunk of some hypertables ({chunk} is the chunk name)."""
+
+    def __init__(self, name: str, tables: list[str], statements: list[str]):
+        """Initialize a migration."""
+        self.name = name
+        self.tables = tables
+        self.statements = statements
+
+
+def metadata_ids_migration(tables: list[str], entity_ids_table: str) -> ChunkMigration:
+    """Move the text entity_id of old rows to a metadata_id."""
+    return ChunkMigration(MIGRATION_METADATA_IDS, tables, [
+        f"""
+        INSERT INTO {entity_ids_table} (entity_id)
+        SELECT DISTINCT entity_id FROM {{chunk}} WHERE metadata_id IS NULL AND entity_id IS NOT NULL
+        ON CONFLICT (entity_id) DO NOTHING
+        """,
+        f"""
+        UPDATE {{chunk}} s SET metadata_id = m.metadata_id, entity_id = NULL
+        FROM {entity_ids_table} m
+        WHERE s.metadata_id IS NULL AND s.entity_id = m.entity_id
+        """,
+    ])
+
+
+def state_enums_migration(table: str, state_enums_table: str, entity_ids_table: str) -> ChunkMigration:
+    """Replace the state text of old rows by its state_idx where the domain has one."""
+    return ChunkMigration(MIGRATION_STATE_ENUMS, [table], [
+        f"""
+        UPDATE {{chunk}} s SET state_idx = e.state_idx, state = NULL
+        FROM {state_enums_table} e
+        WHERE s.state IS NOT NULL AND s.state_idx IS NULL
+        AND e.state = s.state
+        AND e.domain = split_part(COALESCE(
+            s.entity_id,
+            (SELECT m.entity_id FROM {entity_ids_table} m WHERE m.metadata_id = s.metadata_id)
+        ), '.', 1)
+        """,
+    ])
+
+
+class ChunkMigrator:
+    """Runs data migrations chunk by chunk, with checkpoints in the database."""
+
+    def __init__(
+        self,
+        engine,
+        migrations: list[ChunkMigration],
+        is_busy: Callable[[], bool] = lambda: False,
+        pause: float = DEFAULT_MIGRATION_PAUSE,
+    ):
+        """Initialize the migrator."""
+        self._engine = engine
+        self.migrations = migrations
+        self._is_busy = is_busy
+        self.pause = pause
+        self.status = {
+            migration.name: {"state": STATUS_PENDING, "done": 0, "total": 0}
+            for migration in migrations
+        }
+        self.current_chunk: str | None = None
+
+    @property
+    def progress(self) -> float | None:
+        """Return the progress over all migrations in percent (None before chunks are listed)."""
+        total = sum(status["total"] for status in self.status.values())
+        if not total:
+            if self.status and all(status["state"] == STATUS_COMPLETED for status in self.status.values()):
+                return 100.0
+            return None
+        done = sum(status["done"] for status in self.status.values())
+        return round(min(done / total, 1.0) * 100, 1)
+
+    async def run(self):
+        """Run the migrations in order; a failed migration stops the following ones."""
+        try:
+            async with self._engine.begin() as conn:
+                await conn.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                        name TEXT NOT NULL,
+                        chunk TEXT NOT NULL,
+                        migrated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        PRIMARY KEY (name, chunk)
+                    );
+                """))
+        except Exception:
+            for status in self.status.values():
+                status["state"] = STATUS_FAILED
+            _LOGGER.exception(f"Could not create {MIGRATIONS_TABLE}, migrations not run")
+            return
+        for migration in self.migrations:
+            status = self.status[migration.name]
+            try:
+                await self._run_migration(migration, status)
+            except asyncio.CancelledError:
+                status["state"] = STATUS_PENDING
+                raise
+            except Exception:
+                status["state"] = STATUS_FAILED
+                _LOGGER.exception(f"Migration {migration.name} failed at chunk {self.current_chunk}")
+                return
+            finally:
+                self.current_chunk = None
+
+    async def _run_migration(self, migration: ChunkMigration, status: dict):
+        """Migrate the chunks of a migration that are not recorded yet."""
+        async with self._engine.connect() as conn:
+            result = await conn.execute(
+                text(f"SELECT chunk FROM {MIGRATIONS_TABLE} WHERE name = :name"),
+                {"name": migration.name}
+            )
+            migrated = {chunk for (chunk,) in result}
+            if COMPLETED in migrated:
+                status["state"] = STATUS_COMPLETED
+                return
+            chunks = []
+            for table in migration.tables:
+                result = await conn.execute(
+                    text("""
+                        SELECT format('%I.%I', chunk_schema, chunk_name)
+                        FROM timescaledb_information.chunks
+                        WHERE hypertable_name = :table
+                        ORDER BY range_start
+                    """),
+                    {"table": table}
+                )
+                chunks.extend(chunk for (chunk,) in result)
+
+        status["total"] = len(chunks)
+        status["done"] = sum(1 for chunk in chunks if chunk in migrated)
+        status["state"] = STATUS_RUNNING
+        _LOGGER.info(f"Migration {migration.name}: {status['total'] - status['done']} of {status['total']} chunks to go")
+
+        for chunk in chunks:
+            if chunk in migrated:
+                continue
+            while self._is_busy():
+                await asyncio.sleep(self.pause)
+            self.current_chunk = chunk
+            started = time.monotonic()
+            await self._migrate_chunk(migration, chunk)
+            status["done"] += 1
+            elapsed = time.monotonic() - started
+            _LOGGER.debug(f"Migration {migration.name}: {chunk} done in {elapsed:.1f}s")
+            await asyncio.sleep(max(self.pause, elapsed))
+
+        async with self._engine.begin() as conn:
+            await conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (name, chunk) VALUES (:name, :chunk) ON CONFLICT DO NOTHING"),
+                {"name": migration.name, "chunk": COMPLETED}
+            )
+        status["state"] = STATUS_COMPLETED
+        _LOGGER.info(f"Migration {migration.name} completed ({status['total']} chunks)")
+
+    async def _migrate_chunk(self, migration: ChunkMigration, chunk: str):
+        """Decompress, transform, recompress and record one chunk in a single transaction."""
+        async with self._engine.begin() as conn:
+            # Returns NULL if the chunk is not compressed (now, not when it was listed)
+            result = await conn.execute(
+                text("SELECT decompress_chunk(CAST(:chunk AS regclass), if_compressed => TRUE)"),
+                {"chunk": chunk}
+            )
+            compressed = result.scalar() is not None
+            for statement in migration.statements:
+                await conn.execute(text(statement.format(chunk=chunk)))
+            if compressed:
+                await conn.execute(
+                    text("SELECT compress_chunk(CAST(:chunk AS regclass), if_not_compressed => TRUE)"),
+                    {"chunk": chunk}
+                )
+            await conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (name, chunk) VALUES (:name, :chunk) ON CONFLICT DO NOTHING"),
+                {"name": migration.name, "chunk": chunk}
+            )
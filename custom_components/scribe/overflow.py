@@ -0,0 +1,113 @@
+"""Overflow policy for the Scribe writer queue.
+
+Decides which rows give way when the in-memory queue is full:
+
+* Per-class quotas cap how many state and event rows may be queued, so a storm
+  of one class cannot push out the other.
+* Priorities are set per entity_id / event_type or per domain. Rows of the lowest
+  priority are evicted first (oldest first within a priority).
+* In sample mode, rows below the top priority are only admitted one in N while
+  the queue is full.
+
+Every row that is not written is counted by reason (see DROP_*).
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from .buffer import ColumnBuffer
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_PRIORITY = "priority"
+OVERFLOW_SAMPLE = "sample"
+OVERFLOW_POLICIES = [OVERFLOW_DROP_OLDEST, OVERFLOW_PRIORITY, OVERFLOW_SAMPLE]
+
+# Reasons a row was not written
+DROP_QUEUE_FULL = "queue_full"
+DROP_QUOTA = "quota"
+DROP_SAMPLED = "sampled"
+DROP_WRITE_FAILED = "write_failed"
+DROP_SPILL_FAILED = "spill_failed"
+DROP_REASONS = [DROP_QUEUE_FULL, DROP_QUOTA, DROP_SAMPLED, DROP_WRITE_FAILED, DROP_SPILL_FAILED]
+
+# Column identifying a row for priorities, per row type
+KEY_COLUMNS = {"state": "entity_id", "event": "event_type"}
+
+# States outrank generic events unless configured otherwise
+DEFAULT_PRIORITIES = {"state": 1, "event": 0}
+
+# Share of max_queue_size evicted at once in priority mode, so the O(n) scan
+# for the lowest priority rows is amortized over many enqueues
+EVICTION_CHUNK = 0.05
+
+
+class OverflowPolicy:
+    """Select rows to evict or skip when the writer queue is over budget."""
+
+    def __init__(
+        self,
+        mode: str = OVERFLOW_DROP_OLDEST,
+        quotas: Mapping[str, int | None] | None = None,
+        priorities: Mapping[str, int] | None = None,
+        sample_rate: float = 0.1,
+    ):
+        """Initialize the policy."""
+        self.mode = mode
+        self.quotas = dict(quotas or {})
+        self.priorities = dict(priorities or {})
+        self.sample_every = max(round(1 / sample_rate), 1) if sample_rate > 0 else 0
+        self.top_priority = max([*DEFAULT_PRIORITIES.values(), *self.priorities.values()])
+        self._cache: dict[tuple[str, str], int] = {}
+        self._sample_counters: dict[int, int] = {}
+
+    def priority(self, kind: str, key: str | None) -> int:
+        """Return the priority of a row: exact key first, then its domain, then its class."""
+        cache_key = (kind, key)
+        priority = self._cache.get(cache_key)
+        if priority is None:
+            priority = DEFAULT_PRIORITIES.get(kind, 0)
+            if key is not None:
+                if key in self.priorities:
+                    priority = self.priorities[key]
+                elif kind == "state" and key.split(".", 1)[0] in self.priorities:
+                    priority = self.priorities[key.split(".", 1)[0]]
+            if len(self._cache) > 10000:
+                self._cache.clear()
+            self._cache[cache_key] = priority
+        return priority
+
+    def over_quota(self, kind: str, queued: int) -> bool:
+        """Return True if the class already holds its quota of queued rows."""
+        quota = self.quotas.get(kind)
+        return bool(quota) and queued >= quota
+
+    def admit(self, kind: str, key: str | None) -> bool:
+        """In sample mode, decide whether a row is admitted to a full queue."""
+        if self.mode != OVERFLOW_SAMPLE:
+            return True
+        priority = self.priority(kind, key)
+        if priority >= self.top_priority:
+            return True
+        if not self.sample_every:
+            return False
+        count = self._sample_counters.get(priority, 0) + 1
+        self._sample_counters[priority] = count
+        return count % self.sample_every == 0
+
+    def select(self, buffers: Mapping[str, ColumnBuffer], count: int) -> dict[str, list[int]]:
+        """Pick `count` rows to evict, lowest priority and oldest first.
+
+        Returns the row indices to evict per buffer.
+        """
+        candidates = []
+        for kind, buffer in buffers.items():
+            for index, key in enumerate(buffer.column(KEY_COLUMNS[kind])):
+                candidates.append((self.priority(kind, key), index, kind))
+        candidates.sort()
+
+        selected: dict[str, list[int]] = {kind: [] for kind in buffers}
+        for _priority, index, kind in candidates[:count]:
+            selected[kind].append(index)
+        for indices in selected.values():
+            indices.sort()
+        return selected
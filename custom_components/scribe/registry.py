@@ -0,0 +1,77 @@
+"""Diff-based sync of the Home Assistant registries for Scribe.
+
+The users, entities, areas, devices and integrations tables mirror registries
+that rarely change, yet the whole registry is synced at every setup. Each row
+carries a row_hash (64-bit blake2b of its values), and the writer keeps the
+hashes of the rows in the database in memory (loaded once per table), so a
+sync only writes the rows whose hash changed:
+
+* A few changed rows are upserted with executemany.
+* From COPY_THRESHOLD rows on, they are copied into a temporary table and
+  merged with a single INSERT ... SELECT ... ON CONFLICT.
+* On a full sync, rows that are no longer in the registry get removed_at set
+  (they are kept for joins with the history). A row that comes back clears it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+# Changed rows from which a sync goes through COPY and a merge
+COPY_THRESHOLD = 500
+
+
+class RegistryTable:
+    """A table mirroring one registry: its key and its value columns."""
+
+    def __init__(self, name: str, key: str, values: tuple[str, ...]):
+        """Initialize a table description."""
+        self.name = name
+        self.key = key
+        self.values = values
+        self.columns = (key, *values)
+
+    def row_hash(self, row: dict[str, Any]) -> int:
+        """Return the signed 64-bit hash of a row's values (BIGINT)."""
+        encoded = json.dumps([row.get(column) for column in self.columns], default=str).encode()
+        return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "big", signed=True)
+
+    def diff(self, rows: list[dict], known: dict[str, int | None], full: bool) -> tuple[list[dict], list[str]]:
+        """Return the rows that changed (with their row_hash) and, on a full sync, the removed keys."""
+        changed = []
+        for row in rows:
+            row_hash = self.row_hash(row)
+            key = row[self.key]
+            if key not in known or known[key] != row_hash:
+                changed.append({**{column: row.get(column) for column in self.columns}, "row_hash": row_hash})
+        removed = []
+        if full:
+            present = {row[self.key] for row in rows}
+            removed = sorted(key for key in known if key not in present)
+        return changed, removed
+
+    def merge_sql(self, source: str | None = None) -> str:
+        """Return the upsert of rows from parameters, or from a `source` table."""
+        columns = (*self.columns, "row_hash")
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in (*self.values, "row_hash"))
+        if source is None:
+            rows = f"VALUES ({', '.join(':' + column for column in columns)})"
+        else:
+            rows = f"SELECT {', '.join(columns)} FROM {source}"
+        return f"""
+            INSERT INTO {self.name} ({', '.join(columns)}) {rows}
+            ON CONFLICT ({self.key}) DO UPDATE SET {updates}, removed_at = NULL
+        """
+
+
+REGISTRY_TABLES = {
+    table.name: table
+    for table in (
+        RegistryTable("users", "user_id", ("name", "is_owner", "is_active", "system_generated", "group_ids")),
+        RegistryTable("entities", "entity_id", ("unique_id", "platform", "domain", "name", "device_id", "area_id", "capabilities")),
+        RegistryTable("areas", "area_id", ("name", "picture")),
+        RegistryTable("devices", "device_id", ("name", "name_by_user", "model", "manufacturer", "sw_version", "area_id", "primary_config_entry")),
+        RegistryTable("integrations", "entry_id", ("domain", "title", "state", "source")),
+    )
+}
@@ -24,6 +24,8 @@ from .const import (
     DOMAIN, 
     CONF_ENABLE_STATS_IO,
     DEFAULT_ENABLE_STATS_IO,
+    WRITE_METHOD_INSERT,
+    WRITE_METHOD_COPY,
 )
 
 async def async_setup_entry(
@@ -40,6 +42,8 @@ async def async_setup_entry(
     writer = data["writer"]
     chunk_coordinator = data.get("chunk_coordinator")
     size_coordinator = data.get("size_coordinator")
+    ingest_plans = data.get("ingest_plans")
+    startup_complete = data.get("startup_complete")
     
     entities = []
     
@@ -51,7 +55,29 @@ async def async_setup_entry(
             ScribeEventsWrittenSensor(writer, entry),
             ScribeBufferSizeSensor(writer, entry),
             ScribeWriteDurationSensor(writer, entry),
+            ScribeInsertThroughputSensor(writer, entry),
+            ScribeCopyThroughputSensor(writer, entry),
+            ScribeIngestLagSensor(writer, entry),
+            ScribeDroppedRowsSensor(writer, entry),
         ])
+        if writer._adaptive:
+            entities.extend([
+                ScribeBatchSizeSensor(writer, entry),
+                ScribeFlushIntervalSensor(writer, entry),
+            ])
+        if writer._spill:
+            entities.extend([
+                ScribeSpillSizeSensor(writer, entry),
+                ScribeSpillReplayProgressSensor(writer, entry),
+            ])
+        if ingest_plans is not None and ingest_plans.deadband_rules:
+            entities.append(ScribeDeadbandReductionSensor(writer, entry, ingest_plans))
+        if ingest_plans is not None and ingest_plans.suppress_restart_states:
+            entities.append(ScribeRestartSuppressedSensor(writer, entry, ingest_plans))
+    
+    # Data migration progress (whenever migrations are configured)
+    if writer.migrations:
+        entities.append(ScribeMigrationProgressSensor(writer, entry))
     
     # Chunk Statistics Sensors (from chunk_coordinator)
     if chunk_coordinator:
@@ -83,7 +109,8 @@ async def async_setup_entry(
             ScribeEventsCompressionRatioSensor(size_coordinator, entry),
         ])
     
-    async_add_entities(entities, True)
+    # During a background startup the stats are refreshed once the database is ready
+    async_add_entities(entities, startup_complete is None or startup_complete.is_set())
 
 class ScribeSensor(SensorEntity):
     """Base class for Scribe sensors.
@@ -412,7 +439,7 @@ class ScribeBufferSizeSensor(ScribeSensor):
         
         No lock needed as we are running in the same thread (asyncio).
         """
-        return len(self._writer._queue)
+        return self._writer.queue_size
 
 class ScribeWriteDurationSensor(ScribeSensor):
     """Sensor for last write duration."""
@@ -431,3 +458,257 @@ class ScribeWriteDurationSensor(ScribeSensor):
     def native_value(self):
         """Return the state of the sensor."""
         return round(self._writer._last_write_duration * 1000, 2)
+
+class ScribeInsertThroughputSensor(ScribeSensor):
+    """Sensor for average INSERT write throughput."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="insert_throughput",
+            name="Insert Throughput",
+            icon="mdi:speedometer",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement="rows/s",
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        rate = self._writer.rows_per_second(WRITE_METHOD_INSERT)
+        return round(rate, 1) if rate is not None else None
+
+class ScribeCopyThroughputSensor(ScribeSensor):
+    """Sensor for average COPY write throughput."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="copy_throughput",
+            name="Copy Throughput",
+            icon="mdi:speedometer",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement="rows/s",
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        rate = self._writer.rows_per_second(WRITE_METHOD_COPY)
+        return round(rate, 1) if rate is not None else None
+
+class ScribeIngestLagSensor(ScribeSensor):
+    """Sensor for the ingest lag (event time to commit) of the last batch."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="ingest_lag",
+            name="Ingest Lag",
+            icon="mdi:timer-outline",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement="s",
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        lag = self._writer.ingest_lag
+        return round(lag, 2) if lag is not None else None
+
+class ScribeDroppedRowsSensor(ScribeSensor):
+    """Sensor for rows that were never written (evicted, sampled out or failed)."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="dropped_rows",
+            name="Dropped Rows",
+            icon="mdi:delete-sweep",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._writer._dropped_events
+
+    @property
+    def extra_state_attributes(self):
+        """Return dropped rows by reason and by row type."""
+        return {
+            **self._writer._dropped,
+            "states": self._writer._dropped_by_type["state"],
+            "events": self._writer._dropped_by_type["event"],
+        }
+
+class ScribeBatchSizeSensor(ScribeSensor):
+    """Sensor for the batch size chosen by the adaptive controller."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="batch_size",
+            name="Batch Size",
+            icon="mdi:tune-variant",
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._writer.batch_size
+
+    @property
+    def extra_state_attributes(self):
+        """Return the smoothed signals the controller works from."""
+        controller = self._writer._adaptive
+        return {
+            "arrival_rate": round(controller.arrival_rate, 1) if controller.arrival_rate is not None else None,
+            "commit_latency": round(controller.commit_latency, 3) if controller.commit_latency is not None else None,
+            "min_batch_size": controller.min_batch_size,
+            "max_batch_size": controller.max_batch_size,
+        }
+
+class ScribeFlushIntervalSensor(ScribeSensor):
+    """Sensor for the flush interval chosen by the adaptive controller."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="flush_interval",
+            name="Flush Interval",
+            icon="mdi:timer-cog-outline",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement="s",
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return round(self._writer.flush_interval, 2)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the lag target and the smoothed lag."""
+        controller = self._writer._adaptive
+        return {
+            "target_lag": controller.target_lag,
+            "lag": round(controller.lag, 2) if controller.lag is not None else None,
+            "min_flush_interval": controller.min_flush_interval,
+            "max_flush_interval": controller.max_flush_interval,
+        }
+
+class ScribeDeadbandReductionSensor(ScribeSensor):
+    """Sensor for the share of numeric values dropped by deadband compression."""
+
+    def __init__(self, writer, entry, ingest_plans):
+        self.entity_description = SensorEntityDescription(
+            key="deadband_reduction",
+            name="Deadband Reduction",
+            icon="mdi:chart-bell-curve-cumulative",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=PERCENTAGE,
+        )
+        super().__init__(writer, entry)
+        self._ingest_plans = ingest_plans
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        ratio = self._ingest_plans.deadband_ratio
+        return round(ratio * 100, 1) if ratio is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the values offered to and written by the deadband filters."""
+        return {
+            "offered": self._ingest_plans.deadband_offered,
+            "written": self._ingest_plans.deadband_written,
+        }
+
+class ScribeRestartSuppressedSensor(ScribeSensor):
+    """Sensor for startup state rows skipped because they matched the stored state."""
+
+    def __init__(self, writer, entry, ingest_plans):
+        self.entity_description = SensorEntityDescription(
+            key="restart_suppressed",
+            name="Restart Rows Suppressed",
+            icon="mdi:restart-off",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        )
+        super().__init__(writer, entry)
+        self._ingest_plans = ingest_plans
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._ingest_plans.restart_suppressed
+
+class ScribeSpillSizeSensor(ScribeSensor):
+    """Sensor for bytes currently held in the disk spill log."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="spill_size",
+            name="Spill Size",
+            icon="mdi:harddisk",
+            state_class=SensorStateClass.MEASUREMENT,
+            device_class=SensorDeviceClass.DATA_SIZE,
+            native_unit_of_measurement=UnitOfInformation.BYTES,
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._writer._spill.size_bytes
+
+    @property
+    def extra_state_attributes(self):
+        """Return spilled and dropped row counts."""
+        return {
+            "rows": self._writer._spill.rows,
+            "dropped_rows": self._writer._spill.dropped_rows,
+        }
+
+class ScribeSpillReplayProgressSensor(ScribeSensor):
+    """Sensor for the progress of the spill log replay."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="spill_replay_progress",
+            name="Spill Replay Progress",
+            icon="mdi:backup-restore",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=PERCENTAGE,
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._writer.replay_progress
+
+class ScribeMigrationProgressSensor(ScribeSensor):
+    """Sensor for the progress of the chunk-by-chunk data migrations."""
+
+    def __init__(self, writer, entry):
+        self.entity_description = SensorEntityDescription(
+            key="migration_progress",
+            name="Migration Progress",
+            icon="mdi:database-sync",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=PERCENTAGE,
+        )
+        super().__init__(writer, entry)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._writer.migration_progress
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state and chunk counts of every migration."""
+        return self._writer.migration_status
@@ -0,0 +1,65 @@
+"""Span storage of unchanged states for Scribe.
+
+With state_spans enabled, states of the span domains are stored as spans: one
+row per actual change of (state, value), with the start time of the span and
+its end (set by a database trigger when the next span of the entity starts).
+
+SpanTracker keeps the open span of every entity in memory and tells the
+writer which state_changed rows only repeat it (attribute churn, restarts) so
+they can be skipped at ingest.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+DEFAULT_SPAN_DOMAINS = [
+    "alarm_control_panel",
+    "automation",
+    "binary_sensor",
+    "climate",
+    "cover",
+    "device_tracker",
+    "fan",
+    "input_boolean",
+    "input_select",
+    "light",
+    "lock",
+    "media_player",
+    "person",
+    "script",
+    "select",
+    "sun",
+    "switch",
+    "vacuum",
+]
+
+
+class SpanTracker:
+    """Open (state, value) span per entity of the span domains."""
+
+    def __init__(self, domains: list[str] | None = None):
+        """Initialize with no open spans."""
+        self.domains = set(DEFAULT_SPAN_DOMAINS if domains is None else domains)
+        self._open: dict[str, tuple[Any, Any]] = {}
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def is_span(self, entity_id: str) -> bool:
+        """Return True if the entity's states are stored as spans."""
+        return entity_id.split(".", 1)[0] in self.domains
+
+    def load(self, rows) -> None:
+        """Restore open spans from (entity_id, state, value) rows."""
+        for entity_id, state, value in rows:
+            self._open[entity_id] = (state, value)
+
+    def changed(self, entity_id: str, state: Any, value: Any) -> bool:
+        """Record a state of a span entity; returns False if it repeats the open span."""
+        current = (state, value)
+        if self._open.get(entity_id) == current:
+            self.skipped += 1
+            return False
+        self._open[entity_id] = current
+        return True
@@ -0,0 +1,211 @@
+"""Durable on-disk spill queue for Scribe.
+
+When the database is unreachable, batches that fail to flush (and rows that overflow
+the in-memory queue) are appended to a local log so they survive long outages and
+Home Assistant restarts. The log is split into segment files; the writer replays
+closed segments in bulk once the database is reachable again.
+
+All public methods of SpillQueue do blocking file I/O and must be run in an
+executor (hass.async_add_executor_job).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from .buffer import ColumnBlock
+
+_LOGGER = logging.getLogger(__name__)
+
+# Frame header: payload length, row count, flags
+FRAME_HEADER = struct.Struct(">IIB")
+FLAG_ZLIB = 0x01
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+
+
+def _encode_default(value):
+    """Encode values json does not handle natively (timestamps)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class SpillQueue:
+    """Append-only, segment-rotated log of batches waiting to be written.
+
+    Each segment is a sequence of frames. A frame holds one column block of one
+    table, JSON-encoded and optionally zlib-compressed. A frame that was only
+    partially written (e.g. power loss) is ignored when the segment is read back.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int,
+        compression: str = COMPRESSION_ZLIB,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    ):
+        """Initialize the spill queue."""
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+
+        # Segment path -> [bytes, rows], oldest first
+        self._segments: dict[Path, list[int]] = {}
+        self._active: Path | None = None
+        self._next_seq = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        # Stats for sensors
+        self.size_bytes = 0
+        self.rows = 0
+        self.dropped_rows = 0
+
+    def load(self) -> None:
+        """Scan segments left over from a previous run (once; append loads first if needed)."""
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        for segment in sorted(self.path.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")):
+            size, rows = self._scan(segment)
+            self._segments[segment] = [size, rows]
+            self.size_bytes += size
+            self.rows += rows
+            seq = int(segment.stem[len(SEGMENT_PREFIX):])
+            self._next_seq = max(self._next_seq, seq + 1)
+        self._loaded = True
+        if self.rows:
+            _LOGGER.info(f"Found {self.rows} spilled rows ({self.size_bytes} bytes) in {len(self._segments)} segments")
+
+    def append(self, kind: str, block: ColumnBlock) -> int:
+        """Append a block to the active segment. Returns the number of bytes written."""
+        payload = json.dumps(
+            {"type": kind, "columns": block.columns, "data": block.data},
+            default=_encode_default,
+        ).encode("utf-8")
+        flags = 0
+        if self.compression == COMPRESSION_ZLIB:
+            payload = zlib.compress(payload)
+            flags |= FLAG_ZLIB
+        frame = FRAME_HEADER.pack(len(payload), len(block), flags) + payload
+
+        with self._lock:
+            # Never start a segment before the existing ones are known (seq, size and rows)
+            self._load()
+            if self._active is None or self._segments[self._active][0] + len(frame) > self.segment_bytes:
+                self._rotate()
+            with open(self._active, "ab") as file:
+                file.write(frame)
+                file.flush()
+                os.fsync(file.fileno())
+            self._segments[self._active][0] += len(frame)
+            self._segments[self._active][1] += len(block)
+            self.size_bytes += len(frame)
+            self.rows += len(block)
+            self._enforce_cap()
+        return len(frame)
+
+    def seal(self) -> list[Path]:
+        """Close the active segment and return all closed segments, oldest first."""
+        with self._lock:
+            self._active = None
+            return list(self._segments)
+
+    def segment_rows(self, segment: Path) -> int:
+        """Return the number of rows stored in a segment."""
+        with self._lock:
+            return self._segments.get(segment, [0, 0])[1]
+
+    def read_segment(self, segment: Path) -> list[tuple[str, ColumnBlock]]:
+        """Read all complete frames of a segment."""
+        try:
+            raw = segment.read_bytes()
+        except FileNotFoundError:
+            return []
+
+        blocks = []
+        offset = 0
+        while offset + FRAME_HEADER.size <= len(raw):
+            length, _rows, flags = FRAME_HEADER.unpack_from(raw, offset)
+            offset += FRAME_HEADER.size
+            if offset + length > len(raw):
+                _LOGGER.warning(f"Ignoring truncated frame at the end of {segment.name}")
+                break
+            payload = raw[offset:offset + length]
+            offset += length
+            if flags & FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            frame = json.loads(payload)
+            columns = tuple(frame["columns"])
+            data = frame["data"]
+            if "time" in columns:
+                index = columns.index("time")
+                data[index] = [datetime.fromisoformat(v) if isinstance(v, str) else v for v in data[index]]
+            blocks.append((frame["type"], ColumnBlock(columns, data)))
+        return blocks
+
+    def remove_segment(self, segment: Path) -> None:
+        """Delete a segment once its rows have been written to the database."""
+        with self._lock:
+            self._remove(segment)
+
+    def _rotate(self) -> None:
+        self._active = self.path / f"{SEGMENT_PREFIX}{self._next_seq:08d}{SEGMENT_SUFFIX}"
+        self._next_seq += 1
+        self._segments[self._active] = [0, 0]
+
+    def _remove(self, segment: Path) -> None:
+        size, rows = self._segments.pop(segment, (0, 0))
+        self.size_bytes -= size
+        self.rows -= rows
+        if segment == self._active:
+            self._active = None
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _enforce_cap(self) -> None:
+        """Drop the oldest closed segments while the log is over its byte cap."""
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._segments))
+            if oldest == self._active:
+                break
+            rows = self._segments[oldest][1]
+            self.dropped_rows += rows
+            _LOGGER.warning(f"Spill log over {self.max_bytes} bytes, dropping {rows} rows from {oldest.name}")
+            self._remove(oldest)
+
+    @staticmethod
+    def _scan(segment: Path) -> tuple[int, int]:
+        """Return (bytes, rows) of a segment by walking its frame headers."""
+        size = segment.stat().st_size
+        rows = 0
+        with open(segment, "rb") as file:
+            offset = 0
+            while offset + FRAME_HEADER.size <= size:
+                length, frame_rows, _flags = FRAME_HEADER.unpack(file.read(FRAME_HEADER.size))
+                offset += FRAME_HEADER.size + length
+                if offset > size:
+                    break
+                rows += frame_rows
+                file.seek(offset)
+        return size, rows
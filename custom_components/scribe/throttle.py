@@ -0,0 +1,88 @@
+"""Per-entity rate limiting of state rows for Scribe.
+
+Rules map entity_id glob patterns to a budget of `max_rows` rows per `window`
+seconds; the first matching pattern (in configuration order) applies. Each
+throttled entity gets a token bucket holding up to `max_rows` tokens, refilled
+at max_rows / window tokens per second, and every written row takes one.
+
+A row arriving with an empty bucket is suppressed but kept as the entity's
+pending row (replacing the previous one). Once a token is available again the
+pending row is written by the periodic release, so the last value of a burst
+is never lost; if a newer row gets the token first, it supersedes it.
+"""
+from __future__ import annotations
+
+import fnmatch
+import re
+from collections.abc import Mapping
+from typing import Any
+
+DEFAULT_WINDOW = 60
+
+# Interval of the release of pending rows, in seconds
+RELEASE_INTERVAL = 1
+
+
+def compile_rules(rules: Mapping[str, Mapping[str, Any]]) -> list[tuple[re.Pattern, Mapping[str, Any]]]:
+    """Compile glob patterns, keeping their configuration order."""
+    return [(re.compile(fnmatch.translate(pattern)), rule) for pattern, rule in rules.items()]
+
+
+def find_rule(rules: list[tuple[re.Pattern, Mapping[str, Any]]], entity_id: str) -> Mapping[str, Any] | None:
+    """Return the rule of the first pattern matching the entity."""
+    for pattern, rule in rules:
+        if pattern.match(entity_id):
+            return rule
+    return None
+
+
+class TokenBucket:
+    """Rate limit of one entity, with its last suppressed row."""
+
+    __slots__ = ("capacity", "pending", "rate", "suppressed", "tokens", "updated")
+
+    def __init__(self, max_rows: int, window: float = DEFAULT_WINDOW, now: float = 0.0):
+        """Initialize a full bucket."""
+        self.capacity = float(max_rows)
+        self.rate = max_rows / window
+        self.tokens = self.capacity
+        self.updated = now
+        self.pending: Any = None
+        self.suppressed = 0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def offer(self, row: Any, now: float) -> bool:
+        """Take a token for a row; returns False (and keeps it pending) if there is none."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.pending = None
+            return True
+        self.pending = row
+        self.suppressed += 1
+        return False
+
+    def pop_pending(self) -> Any:
+        """Return the pending row regardless of tokens (on shutdown)."""
+        row = self.pending
+        if row is not None:
+            self.pending = None
+            self.suppressed -= 1
+        return row
+
+    def release(self, now: float) -> Any:
+        """Return the pending row if a token is available for it."""
+        if self.pending is None:
+            return None
+        self._refill(now)
+        if self.tokens < 1:
+            return None
+        self.tokens -= 1
+        row = self.pending
+        self.pending = None
+        self.suppressed -= 1
+        return row
@@ -0,0 +1,674 @@
+"""Out-of-process writer for Scribe.
+
+With `worker_process: true`, the ScribeWriter runs in a child process. The Home
+Assistant side (ScribeWorkerProxy) only packs each row into a tuple in column
+order and ships pickled batches of them over a pipe. Building batches, talking to
+asyncpg and parsing results happen in the child, off the Home Assistant event loop.
+
+Protocol (pickled tuples over a multiprocessing Pipe):
+    parent -> child: ("rows", seq, rows), ("call", call_id, method, args), ("stop",)
+    child -> parent: ("ack", seq), ("stats", stats), ("result", call_id, ok, value), ("stopped",)
+
+Handoff is at-least-once: the proxy keeps every shipped batch until the child acks
+it, which happens once all of its rows are committed, spilled to disk or counted as
+dropped. If the child dies it is restarted with backoff and the unacknowledged
+batches are sent again (rows may then be written twice).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import pickle
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+
+from .breaker import STATE_CLOSED
+from .const import WRITE_METHOD_COPY, WRITE_METHOD_INSERT
+from .overflow import DROP_QUEUE_FULL, DROP_REASONS
+from .writer import EVENTS_COLUMNS, STATES_COLUMNS, ScribeWriter
+
+_LOGGER = logging.getLogger(__name__)
+
+ROW_COLUMNS = {"state": STATES_COLUMNS, "event": EVENTS_COLUMNS}
+
+SHIP_ROWS = 500  # rows per shipped batch
+SHIP_INTERVAL = 0.05  # seconds a partial batch may wait before it is shipped
+STATS_INTERVAL = 1.0  # seconds between stats/ack messages from the child
+RESTART_BACKOFF_MAX = 60.0  # seconds
+STOP_TIMEOUT = 30.0  # seconds
+
+# Writer methods the proxy may call in the child
+RPC_METHODS = {
+    "_flush",
+    "query",
+    "get_db_stats",
+    "last_states",
+    "wait_ready",
+    "write_users",
+    "write_entities",
+    "write_areas",
+    "write_devices",
+    "write_integrations",
+    "mark_registry_removed",
+}
+
+
+def _dumps(message) -> bytes:
+    return pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+
+
+# ---------------------------------------------------------------------------
+# Child process side
+# ---------------------------------------------------------------------------
+
+class _WorkerConfig:
+    """The parts of hass.config used by ScribeWriter."""
+
+    def __init__(self, config_dir: str):
+        self.config_dir = config_dir
+
+    def path(self, *parts: str) -> str:
+        return str(Path(self.config_dir, *parts))
+
+
+class WorkerHass:
+    """Stand-in for the HomeAssistant object inside the worker process.
+
+    ScribeWriter only needs the config directory and an executor.
+    """
+
+    def __init__(self, config_dir: str):
+        self.config = _WorkerConfig(config_dir)
+
+    async def async_add_executor_job(self, target, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+
+class ScribeWorkerServer:
+    """Feed rows received from the pipe to a ScribeWriter and report back."""
+
+    def __init__(self, conn, writer: ScribeWriter):
+        """Initialize the server."""
+        self._conn = conn
+        self.writer = writer
+        self._send_lock = asyncio.Lock()
+        self._received = 0
+        # (seq, rows received up to and including this batch), oldest first
+        self._marks: deque[tuple[int, int]] = deque()
+        # Writer calls in progress (the loop only keeps weak references to tasks)
+        self._calls: set[asyncio.Task] = set()
+
+    async def run(self):
+        """Start the writer and serve the pipe until told to stop or the parent goes away."""
+        await self.writer.start()
+        loop = asyncio.get_running_loop()
+        reporter = asyncio.create_task(self._report_loop())
+        try:
+            while True:
+                try:
+                    data = await loop.run_in_executor(None, self._conn.recv_bytes)
+                except (EOFError, OSError):
+                    _LOGGER.warning("Scribe worker lost its connection to Home Assistant")
+                    break
+                message = pickle.loads(data)
+                if message[0] == "stop":
+                    break
+                self.handle(message)
+        finally:
+            reporter.cancel()
+            await self.writer.stop()
+            try:
+                await self._report()
+                await self._send(("stopped",))
+            except (OSError, ValueError):
+                pass
+            self._conn.close()
+
+    def handle(self, message: tuple):
+        """Handle one message from the parent."""
+        if message[0] == "rows":
+            _, seq, rows = message
+            for kind, values in rows:
+                record = dict(zip(ROW_COLUMNS[kind], values))
+                record["type"] = kind
+                self.writer.enqueue(record)
+            self._received += len(rows)
+            self._marks.append((seq, self._received))
+        elif message[0] == "call":
+            _, call_id, method, args = message
+            task = asyncio.create_task(self._call(call_id, method, args))
+            self._calls.add(task)
+            task.add_done_callback(self._calls.discard)
+
+    async def _call(self, call_id: int, method: str, args: tuple):
+        if method not in RPC_METHODS:
+            reply = ("result", call_id, False, ValueError(f"Unknown writer method: {method}"))
+        else:
+            try:
+                result = await getattr(self.writer, method)(*args)
+                reply = ("result", call_id, True, result)
+            except Exception as e:  # noqa: BLE001 - any error is sent back to the caller
+                # Driver exceptions do not always survive pickling, only builtins are sent as-is
+                error = e if type(e).__module__ == "builtins" else RuntimeError(str(e))
+                reply = ("result", call_id, False, error)
+        try:
+            await self._send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            await self._send(("result", call_id, False, RuntimeError(f"Result of {method} could not be sent: {e}")))
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            try:
+                await self._report()
+            except (OSError, ValueError):
+                return
+
+    async def _report(self):
+        """Acknowledge settled batches and send a stats snapshot."""
+        settled = self._received - self.writer.unsettled_rows
+        acked = None
+        while self._marks and self._marks[0][1] <= settled:
+            acked = self._marks.popleft()[0]
+        if acked is not None:
+            await self._send(("ack", acked))
+        await self._send(("stats", self.stats()))
+
+    async def _send(self, message: tuple):
+        data = _dumps(message)
+        async with self._send_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._conn.send_bytes, data)
+
+    def stats(self) -> dict:
+        """Return the writer metrics used by the sensors on the Home Assistant side."""
+        writer = self.writer
+        breaker = writer._breaker
+        stats = {
+            "running": writer.running,
+            "ready": writer.ready,
+            "connected": writer._connected,
+            "last_error": writer._last_error,
+            "states_written": writer._states_written,
+            "events_written": writer._events_written,
+            "last_write_duration": writer._last_write_duration,
+            "dropped_events": writer._dropped_events,
+            "dropped": dict(writer._dropped),
+            "dropped_by_type": dict(writer._dropped_by_type),
+            "queue_size": writer.queue_size,
+            "ingest_lag": writer.ingest_lag,
+            "replay_progress": writer.replay_progress,
+            "migration_progress": writer.migration_progress,
+            "migration_status": writer.migration_status,
+            "batch_size": writer.batch_size,
+            "flush_interval": writer.flush_interval,
+            "inflight_batches": writer.inflight_batches,
+            "rows_per_second": {
+                method: writer.rows_per_second(method)
+                for method in (WRITE_METHOD_INSERT, WRITE_METHOD_COPY)
+            },
+            "breaker": {
+                "state": breaker.state,
+                "consecutive_failures": breaker.consecutive_failures,
+                "next_retry_in": breaker.retry_in(),
+            },
+            "spill": None,
+            "adaptive": None,
+        }
+        if writer._spill:
+            stats["spill"] = {
+                "size_bytes": writer._spill.size_bytes,
+                "rows": writer._spill.rows,
+                "dropped_rows": writer._spill.dropped_rows,
+            }
+        if writer._adaptive:
+            controller = writer._adaptive
+            stats["adaptive"] = {
+                name: getattr(controller, name)
+                for name in (
+                    "arrival_rate", "commit_latency", "lag", "target_lag",
+                    "min_batch_size", "max_batch_size", "min_flush_interval", "max_flush_interval",
+                )
+            }
+        return stats
+
+
+def run_worker(conn, config_dir: str, writer_kwargs: dict, log_level: int = logging.INFO):
+    """Entry point of the worker process."""
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s %(levelname)s (scribe-writer) [%(name)s] %(message)s",
+    )
+
+    async def serve():
+        writer = ScribeWriter(hass=WorkerHass(config_dir), **writer_kwargs)
+        await ScribeWorkerServer(conn, writer).run()
+
+    asyncio.run(serve())
+
+
+# ---------------------------------------------------------------------------
+# Home Assistant side
+# ---------------------------------------------------------------------------
+
+class _StatsView:
+    """Read-only attribute view over a stats dict sent by the worker."""
+
+    def __init__(self, data: dict):
+        self.__dict__.update(data)
+
+
+class _BreakerView(_StatsView):
+    """Circuit breaker state as reported by the worker."""
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == STATE_CLOSED
+
+    def retry_in(self) -> float:
+        return self.next_retry_in
+
+
+class ScribeWorkerProxy:
+    """Drop-in replacement for ScribeWriter that runs the writer in a child process.
+
+    Exposes the same methods and metrics as ScribeWriter, so the services, sensors
+    and registry sync in __init__.py work unchanged.
+    """
+
+    def __init__(self, hass, **writer_kwargs):
+        """Initialize the proxy. Takes the same arguments as ScribeWriter."""
+        self.hass = hass
+        self._writer_kwargs = writer_kwargs
+
+        # Configuration read by __init__.py
+        self.record_states = writer_kwargs.get("record_states")
+        self.record_events = writer_kwargs.get("record_events")
+        self.max_queue_size = writer_kwargs.get("max_queue_size")
+        self.enable_table_users = writer_kwargs.get("enable_table_users", True)
+        self.enable_table_entities = writer_kwargs.get("enable_table_entities", True)
+        self.enable_table_areas = writer_kwargs.get("enable_table_areas", True)
+        self.enable_table_devices = writer_kwargs.get("enable_table_devices", True)
+        self.enable_table_integrations = writer_kwargs.get("enable_table_integrations", True)
+        self.migrations = list(writer_kwargs.get("migrations") or [])
+
+        # Rows not yet shipped, and shipped batches not yet acknowledged
+        self._outbox: list[tuple[str, tuple]] = []
+        self._ship_handle = None
+        self._next_seq = 0
+        self._unacked: OrderedDict[int, tuple[bytes, int]] = OrderedDict()
+        self._unacked_rows = 0
+        self._handoff_dropped = 0
+
+        self._calls: dict[int, asyncio.Future] = {}
+        self._next_call = 0
+        # Outgoing messages, sent in order by a single sender task
+        self._sends: deque[bytes] = deque()
+        self._sender_task = None
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._readers: list[threading.Thread] = []
+        self._restart_task = None
+        self._restarts = 0
+        self._running = False
+        self._stats: dict = {}
+
+    # -- lifecycle ----------------------------------------------------------
+
+    async def start(self):
+        """Start the worker process."""
+        if self._running:
+            return
+        self._running = True
+        await self._start_worker()
+        _LOGGER.info("Scribe worker process started")
+
+    async def stop(self):
+        """Ship the remaining rows and stop the worker (its writer does a final flush)."""
+        self._running = False
+        self._ship()
+        if self._restart_task:
+            self._restart_task.cancel()
+            self._restart_task = None
+        if self._conn is None:
+            return
+        self._queue_send(_dumps(("stop",)))
+        if self._sender_task:
+            await self._sender_task
+        process = self._process
+        await self.hass.async_add_executor_job(process.join, STOP_TIMEOUT)
+        if process.is_alive():
+            _LOGGER.warning("Scribe worker did not stop in time, terminating it")
+            process.terminate()
+            await self.hass.async_add_executor_job(process.join, 5)
+        # Readers see EOF once the worker has exited
+        for reader in self._readers:
+            await self.hass.async_add_executor_job(reader.join, 5)
+        self._readers.clear()
+        self._close_conn()
+
+    async def _start_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = await self._spawn(child_conn)
+        self._conn = parent_conn
+        reader = threading.Thread(
+            target=self._read_loop, args=(parent_conn,), name="scribe-worker-reader", daemon=True
+        )
+        reader.start()
+        self._readers = [thread for thread in self._readers if thread.is_alive()] + [reader]
+
+        # Batches the previous worker did not acknowledge are sent again first, in order
+        if self._unacked:
+            self._sends.extendleft(reversed([payload for payload, _rows in self._unacked.values()]))
+            self._queue_send(None)
+            _LOGGER.info(f"Re-sent {self._unacked_rows} unacknowledged rows to the Scribe worker")
+
+    async def _spawn(self, child_conn):
+        """Start the child process."""
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(
+                child_conn,
+                self.hass.config.config_dir,
+                self._writer_kwargs,
+                logging.getLogger(__package__).getEffectiveLevel(),
+            ),
+            name="scribe-writer",
+            daemon=True,
+        )
+        await self.hass.async_add_executor_job(process.start)
+        child_conn.close()
+        return process
+
+    def _read_loop(self, conn):
+        """Read messages from the worker (runs in its own thread)."""
+        while True:
+            try:
+                data = conn.recv_bytes()
+            except (EOFError, OSError):
+                break
+            try:
+                message = pickle.loads(data)
+            except Exception:
+                _LOGGER.exception("Invalid message from the Scribe worker")
+                continue
+            self.hass.loop.call_soon_threadsafe(self._handle_message, message)
+        self.hass.loop.call_soon_threadsafe(self._worker_exited, conn)
+
+    def _handle_message(self, message: tuple):
+        kind = message[0]
+        if kind == "ack":
+            while self._unacked and next(iter(self._unacked)) <= message[1]:
+                _seq, (_payload, rows) = self._unacked.popitem(last=False)
+                self._unacked_rows -= rows
+        elif kind == "stats":
+            self._stats = message[1]
+            self._restarts = 0
+        elif kind == "result":
+            _, call_id, ok, value = message
+            future = self._calls.pop(call_id, None)
+            if future and not future.done():
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _worker_exited(self, conn):
+        if conn is not self._conn:
+            return
+        self._close_conn()
+        for future in self._calls.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Scribe worker process exited"))
+        self._calls.clear()
+        if self._running and not self._restart_task:
+            self._restart_task = asyncio.create_task(self._restart())
+
+    async def _restart(self):
+        """Restart a dead worker with exponential backoff."""
+        try:
+            delay = min(2 ** self._restarts, RESTART_BACKOFF_MAX)
+            self._restarts += 1
+            _LOGGER.warning(f"Scribe worker process exited, restarting in {delay}s")
+            await asyncio.sleep(delay)
+            if self._process is not None:
+                await self.hass.async_add_executor_job(self._process.join, 1)
+            if self._running:
+                await self._start_worker()
+        finally:
+            self._restart_task = None
+
+    def _close_conn(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # -- rows ---------------------------------------------------------------
+
+    def enqueue(self, data: dict):
+        """Queue a row for the worker. Rows are shipped in batches."""
+        kind = data["type"]
+        self._outbox.append((kind, tuple(data.get(name) for name in ROW_COLUMNS[kind])))
+        if len(self._outbox) >= SHIP_ROWS:
+            self._ship()
+        elif self._ship_handle is None:
+            self._ship_handle = self.hass.loop.call_later(SHIP_INTERVAL, self._ship)
+
+    def _ship(self):
+        """Send the outbox to the worker as one batch."""
+        if self._ship_handle is not None:
+            self._ship_handle.cancel()
+            self._ship_handle = None
+        if not self._outbox:
+            return
+        rows, self._outbox = self._outbox, []
+        seq = self._next_seq
+        self._next_seq += 1
+        payload = _dumps(("rows", seq, rows))
+        self._unacked[seq] = (payload, len(rows))
+        self._unacked_rows += len(rows)
+        self._trim_unacked()
+        self._queue_send(payload)
+
+    def _trim_unacked(self):
+        """Bound the rows kept for re-sending to max_queue_size."""
+        while self._unacked_rows > self.max_queue_size and len(self._unacked) > 1:
+            _seq, (_payload, rows) = self._unacked.popitem(last=False)
+            self._unacked_rows -= rows
+            if self._conn is None:
+                # The worker is down, these rows never reached it
+                self._handoff_dropped += rows
+
+    def _queue_send(self, payload: bytes | None):
+        """Queue a message for the worker (None only wakes the sender).
+
+        While the worker is down nothing is queued: row batches stay in
+        _unacked and are re-sent once it is restarted.
+        """
+        if self._conn is None:
+            return
+        if payload is not None:
+            self._sends.append(payload)
+        if not self._sender_task:
+            self._sender_task = asyncio.create_task(self._send_queued())
+
+    async def _send_queued(self):
+        """Send queued messages in order (pipe writes run in the executor)."""
+        try:
+            while self._sends:
+                conn = self._conn
+                if conn is None:
+                    self._sends.clear()
+                    break
+                payload = self._sends.popleft()
+                try:
+                    await self.hass.async_add_executor_job(conn.send_bytes, payload)
+                except (OSError, ValueError) as e:
+                    _LOGGER.debug(f"Failed to send to the Scribe worker: {e}")
+        finally:
+            self._sender_task = None
+
+    # -- calls --------------------------------------------------------------
+
+    async def _call(self, method: str, *args):
+        """Run a writer method in the worker and return its result."""
+        if self._conn is None:
+            raise RuntimeError("Scribe worker process is not running")
+        call_id = self._next_call
+        self._next_call += 1
+        future = asyncio.get_running_loop().create_future()
+        self._calls[call_id] = future
+        self._queue_send(_dumps(("call", call_id, method, args)))
+        return await future
+
+    async def _flush(self):
+        """Ship pending rows and flush the worker's queue."""
+        self._ship()
+        await self._call("_flush")
+
+    async def query(self, sql: str) -> list[dict]:
+        """Execute a read-only SQL query in the worker."""
+        return await self._call("query", sql)
+
+    async def get_db_stats(self, stats_type: str = "all"):
+        """Fetch database statistics from the worker."""
+        return await self._call("get_db_stats", stats_type)
+
+    async def last_states(self, entity_ids: list[str]) -> list[tuple]:
+        """Fetch the last stored states of entities from the worker."""
+        return await self._call("last_states", entity_ids)
+
+    async def wait_ready(self):
+        """Wait until the worker's writer has initialized the database."""
+        await self._call("wait_ready")
+
+    async def write_users(self, users: list[dict], full: bool = False):
+        await self._call("write_users", users, full)
+
+    async def write_entities(self, entities: list[dict], full: bool = False):
+        await self._call("write_entities", entities, full)
+
+    async def write_areas(self, areas: list[dict], full: bool = False):
+        await self._call("write_areas", areas, full)
+
+    async def write_devices(self, devices: list[dict], full: bool = False):
+        await self._call("write_devices", devices, full)
+
+    async def write_integrations(self, integrations: list[dict], full: bool = False):
+        await self._call("write_integrations", integrations, full)
+
+    async def mark_registry_removed(self, name: str, keys: list[str]):
+        await self._call("mark_registry_removed", name, keys)
+
+    # -- metrics (last snapshot sent by the worker) -------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._running and self._conn is not None and self._stats.get("running", False)
+
+    @property
+    def ready(self) -> bool:
+        return self._stats.get("ready", False)
+
+    @property
+    def _connected(self) -> bool:
+        return self._stats.get("connected", False)
+
+    @property
+    def _last_error(self):
+        if self._conn is None and self._running:
+            return "Scribe worker process is not running"
+        return self._stats.get("last_error")
+
+    @property
+    def _states_written(self) -> int:
+        return self._stats.get("states_written", 0)
+
+    @property
+    def _events_written(self) -> int:
+        return self._stats.get("events_written", 0)
+
+    @property
+    def _last_write_duration(self) -> float:
+        return self._stats.get("last_write_duration", 0.0)
+
+    @property
+    def _dropped(self) -> dict:
+        dropped = dict(self._stats.get("dropped") or dict.fromkeys(DROP_REASONS, 0))
+        dropped[DROP_QUEUE_FULL] = dropped.get(DROP_QUEUE_FULL, 0) + self._handoff_dropped
+        return dropped
+
+    @property
+    def _dropped_by_type(self) -> dict:
+        return self._stats.get("dropped_by_type") or {"state": 0, "event": 0}
+
+    @property
+    def _dropped_events(self) -> int:
+        return self._stats.get("dropped_events", 0) + self._handoff_dropped
+
+    @property
+    def queue_size(self) -> int:
+        return self._stats.get("queue_size", 0) + len(self._outbox)
+
+    @property
+    def ingest_lag(self):
+        return self._stats.get("ingest_lag")
+
+    @property
+    def replay_progress(self):
+        return self._stats.get("replay_progress")
+
+    @property
+    def migration_progress(self):
+        return self._stats.get("migration_progress")
+
+    @property
+    def migration_status(self) -> dict:
+        return self._stats.get("migration_status") or {}
+
+    @property
+    def batch_size(self) -> int:
+        return self._stats.get("batch_size", self._writer_kwargs.get("batch_size"))
+
+    @property
+    def flush_interval(self) -> float:
+        return self._stats.get("flush_interval", self._writer_kwargs.get("flush_interval"))
+
+    @property
+    def inflight_batches(self) -> int:
+        return self._stats.get("inflight_batches", 0)
+
+    def rows_per_second(self, method: str):
+        return (self._stats.get("rows_per_second") or {}).get(method)
+
+    @property
+    def _breaker(self) -> _BreakerView:
+        return _BreakerView(
+            self._stats.get("breaker")
+            or {"state": STATE_CLOSED, "consecutive_failures": 0, "next_retry_in": 0.0}
+        )
+
+    @property
+    def _spill(self):
+        if not self._writer_kwargs.get("spill_to_disk"):
+            return None
+        return _StatsView(self._stats.get("spill") or {"size_bytes": 0, "rows": 0, "dropped_rows": 0})
+
+    @property
+    def _adaptive(self):
+        if not self._writer_kwargs.get("adaptive_batching"):
+            return None
+        kwargs = self._writer_kwargs
+        return _StatsView(self._stats.get("adaptive") or {
+            "arrival_rate": None,
+            "commit_latency": None,
+            "lag": None,
+            "target_lag": kwargs.get("target_lag"),
+            "min_batch_size": kwargs.get("min_batch_size"),
+            "max_batch_size": kwargs.get("max_batch_size"),
+            "min_flush_interval": kwargs.get("min_flush_interval"),
+            "max_flush_interval": kwargs.get("max_flush_interval"),
+        })
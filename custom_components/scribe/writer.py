@@ -6,19 +6,96 @@ to minimize database connection overhead and blocking.
 """
 import logging
 import asyncio
+import hashlib
+import json
 import ssl
 import time
 from pathlib import Path
 from typing import Any, Dict
-from collections import deque
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .adaptive import AdaptiveController
+from .attributes import AttributesCache, DEFAULT_CACHE_SIZE
+from .breaker import CircuitBreaker, STATE_HALF_OPEN, STATE_OPEN
+from .buffer import ColumnBuffer, ColumnBlock
+from .enums import StateEnums
+from .spans import SpanTracker
+from .migration import (
+    ChunkMigrator,
+    DEFAULT_MIGRATION_PAUSE,
+    MIGRATION_METADATA_IDS,
+    MIGRATION_STATE_ENUMS,
+    metadata_ids_migration,
+    state_enums_migration,
+)
+from .compact import ORIGINS, ORIGIN_IDX, ULID_TEXT_FUNCTION, split_column, ulid_to_bin, uuid_hex_to_bin
+from .const import WRITE_METHOD_INSERT, WRITE_METHOD_COPY, DEFAULT_MAX_INFLIGHT_BATCHES, DEFAULT_MAX_RETRY_BACKOFF
+from .overflow import (
+    OverflowPolicy,
+    OVERFLOW_DROP_OLDEST,
+    KEY_COLUMNS,
+    EVICTION_CHUNK,
+    DROP_REASONS,
+    DROP_QUEUE_FULL,
+    DROP_QUOTA,
+    DROP_SAMPLED,
+    DROP_WRITE_FAILED,
+    DROP_SPILL_FAILED,
+)
+from .spill import SpillQueue, COMPRESSION_ZLIB
+from .registry import COPY_THRESHOLD, REGISTRY_TABLES, RegistryTable
 
 _LOGGER = logging.getLogger(__name__)
 
+# Column order used by both the INSERT and the COPY write paths
+STATES_COLUMNS = ("time", "entity_id", "state", "value", "attributes")
+EVENTS_COLUMNS = ("time", "event_type", "event_data", "origin", "context_id", "context_user_id", "context_parent_id")
+# Columns of the narrow numeric states table (before entity_id -> metadata_id)
+NUMERIC_COLUMNS = ("time", "entity_id", "value")
+# Columns of the span table, mapped from STATES_COLUMNS (time is the span start)
+SPAN_COLUMNS = ("start", "entity_id", "state", "value", "attributes")
+
+# Dictionary tables of the compact schemas (shared_attributes / metadata_ids / compact_events)
+STATE_ATTRIBUTES_TABLE = "state_attributes"
+STATE_ENUMS_TABLE = "state_enums"
+ENTITY_IDS_TABLE = "entity_ids"
+EVENT_TYPES_TABLE = "event_types"
+ROW_COUNTS_TABLE = "row_counts"
+
+# Schema registry: version and settings hash of the DDL applied by init_db
+SCHEMA_TABLE = "scribe_schema"
+SCHEMA_VERSION = 2
+# Ordered (version, method) steps, run once for every version above the stored one.
+# _create_schema (idempotent) also runs alone when only the settings changed.
+SCHEMA_MIGRATIONS = [
+    (1, "_create_schema"),
+    (2, "_add_registry_columns"),
+]
+# Counter increment, formatted with the placeholders of the driver in use
+ROW_COUNTS_UPSERT = (
+    f"INSERT INTO {ROW_COUNTS_TABLE} (table_name, row_count) VALUES ({{}}, {{}}) "
+    f"ON CONFLICT (table_name) DO UPDATE SET row_count = {ROW_COUNTS_TABLE}.row_count + EXCLUDED.row_count"
+)
+
+# Context columns of the compact events schema and how they are encoded
+CONTEXT_COLUMNS = {
+    "context_id": ulid_to_bin,
+    "context_user_id": uuid_hex_to_bin,
+    "context_parent_id": ulid_to_bin,
+}
+
+# Pooled connections kept on top of the flush slots for stats, registry sync,
+# queries and spill replay
+POOL_HEADROOM = 5
+
+# First delay before init_db is retried after a failure (doubles on every attempt)
+INIT_RETRY_DELAY = 5  # seconds
+
 
 def _create_ssl_context(ssl_root_cert=None, ssl_cert_file=None, ssl_key_file=None) -> ssl.SSLContext:
     """Create and configure SSL context in executor thread.
@@ -96,6 +173,36 @@ class ScribeWriter:
         enable_table_entities: bool = True,
         enable_table_integrations: bool = True,
         enable_table_users: bool = True,
+        write_method: str = WRITE_METHOD_INSERT,
+        spill_to_disk: bool = False,
+        spill_max_bytes: int = 512 * 1024 * 1024,
+        spill_compression: str = COMPRESSION_ZLIB,
+        max_inflight_batches: int = DEFAULT_MAX_INFLIGHT_BATCHES,
+        adaptive_batching: bool = False,
+        min_batch_size: int | None = None,
+        max_batch_size: int | None = None,
+        min_flush_interval: float | None = None,
+        max_flush_interval: float | None = None,
+        target_lag: float | None = None,
+        max_retry_backoff: float = DEFAULT_MAX_RETRY_BACKOFF,
+        overflow_policy: str = OVERFLOW_DROP_OLDEST,
+        queue_quota_states: int | None = None,
+        queue_quota_events: int | None = None,
+        priorities: dict | None = None,
+        sample_rate: float = 0.1,
+        shared_attributes: bool = False,
+        attributes_cache_size: int = DEFAULT_CACHE_SIZE,
+        metadata_ids: bool = False,
+        compact_events: bool = False,
+        numeric_table: bool = False,
+        numeric_compress_after: str | None = None,
+        state_enums: bool = False,
+        state_enum_domains: list[str] | None = None,
+        state_spans: bool = False,
+        span_domains: list[str] | None = None,
+        background_init: bool = False,
+        migrations: list[str] | None = None,
+        migration_pause: float = DEFAULT_MIGRATION_PAUSE,
         engine: Any = None
     ):
         """Initialize the writer."""
@@ -126,6 +233,8 @@ class ScribeWriter:
         self.enable_table_entities = enable_table_entities
         self.enable_table_integrations = enable_table_integrations
         self.enable_table_users = enable_table_users
+        self.write_method = write_method
+        self.max_inflight_batches = max_inflight_batches
         
         # Stats for sensors
         self._states_written = 0
@@ -134,11 +243,121 @@ class ScribeWriter:
         self._connected = False
         self._last_error = None
         self._dropped_events = 0
+        # Rows not written, by reason and by row type
+        self._dropped = dict.fromkeys(DROP_REASONS, 0)
+        self._dropped_by_type = {"state": 0, "event": 0}
+        # Cumulative [rows, seconds] per write method, used for rows/s reporting
+        self._write_stats = {
+            WRITE_METHOD_INSERT: [0, 0.0],
+            WRITE_METHOD_COPY: [0, 0.0],
+        }
+        # Set to False once we detect the driver cannot COPY (e.g. not asyncpg)
+        self._copy_available = True
         
-        # Queue
-        self._queue: deque = deque(maxlen=max_queue_size)
-        self._queue_lock = asyncio.Lock()
+        # Queue: one column-oriented staging buffer per table, keyed by row type
+        self._buffers: dict[str, ColumnBuffer] = {
+            "state": ColumnBuffer(STATES_COLUMNS),
+            "event": ColumnBuffer(EVENTS_COLUMNS),
+        }
         self._flush_pending = False  # Prevent multiple flush tasks
+        self._overflow = OverflowPolicy(
+            mode=overflow_policy,
+            quotas={"state": queue_quota_states, "event": queue_quota_events},
+            priorities=priorities,
+            sample_rate=sample_rate,
+        )
+        
+        # Flush scheduler: at most max_inflight_batches batches are written at once,
+        # each on its own pooled connection. Batches get a sequence number when they
+        # are cut from the queue and commit strictly in that order.
+        self._flush_slots = asyncio.Semaphore(max_inflight_batches)
+        self._next_batch_seq = 0
+        self._commit_seq = 0
+        self._commit_turn = asyncio.Condition()
+        self._inflight_batches = 0
+        self._inflight_rows = 0
+        
+        # Circuit breaker: stops write attempts while the database is down and
+        # spaces out reconnection probes with exponential backoff
+        self._breaker = CircuitBreaker(max_backoff=max_retry_backoff)
+        self._drain_task = None
+        
+        # Adaptive batching: batch_size and flush_interval are retuned at runtime
+        self._enqueued_rows = 0
+        self._last_ingest_lag = None
+        self._adaptive = None
+        if adaptive_batching:
+            self._adaptive = AdaptiveController(
+                min_batch_size=min_batch_size or batch_size,
+                max_batch_size=max_batch_size or batch_size,
+                min_flush_interval=min_flush_interval or flush_interval,
+                max_flush_interval=max_flush_interval or flush_interval,
+                target_lag=target_lag or flush_interval * 2,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+            )
+            self.batch_size = self._adaptive.batch_size
+            self.flush_interval = self._adaptive.flush_interval
+        
+        # Disk spill: failed and overflowing batches are appended to a local log
+        self._spill = None
+        if spill_to_disk:
+            self._spill = SpillQueue(
+                Path(hass.config.path("scribe_spill")),
+                max_bytes=spill_max_bytes,
+                compression=spill_compression,
+            )
+        self._spill_pending: list[tuple[str, ColumnBlock]] = []
+        self._spill_task = None
+        self._spilling_rows = 0
+        self._replay_task = None
+        self._replay_total = 0
+        self._replay_done = 0
+        
+        # Shared attributes: states reference deduplicated documents by id
+        self.shared_attributes = shared_attributes
+        self._attributes = AttributesCache(attributes_cache_size) if shared_attributes else None
+        
+        # Metadata ids: states reference entity_ids by a small integer key (entity_id -> metadata_id)
+        self.metadata_ids = metadata_ids
+        self._metadata_ids: dict[str, int] | None = {} if metadata_ids else None
+        
+        # Compact events: event_type_id dictionary, binary contexts, origin index
+        self.compact_events = compact_events
+        self._event_type_ids: dict[str, int] | None = {} if compact_events else None
+        
+        # Numeric table: numeric states go to a narrow (time, entity, value) hypertable
+        self.numeric_table = numeric_table
+        self.table_name_numeric = f"{table_name_states}_numeric"
+        self.numeric_compress_after = numeric_compress_after or compress_after
+        
+        # State enums: binary/enumerated states are stored as a SMALLINT state_idx
+        self.state_enums = state_enums
+        self._state_enums = StateEnums(state_enum_domains) if state_enums else None
+        self._state_enums_lock = asyncio.Lock()
+        
+        # State spans: states of the span domains are written only when they change
+        self.state_spans = state_spans
+        self.table_name_spans = f"{table_name_states}_spans"
+        self._spans = SpanTracker(span_domains) if state_spans else None
+        
+        # Background init: rows are queued while the schema is set up, flushes wait for it
+        self.background_init = background_init
+        self._ready = asyncio.Event()
+        self._init_task = None
+        self._catch_up_task = None
+        
+        # Registry sync: row_hash of the rows in each registry table, loaded on first sync
+        self._registry_hashes: dict[str, dict[str, int | None]] = {}
+        
+        # Data migrations of the history, run chunk by chunk once the writer is ready
+        self.migrations = list(migrations or [])
+        self.migration_pause = migration_pause
+        self._migrator: ChunkMigrator | None = None
+        self._migration_task = None
+        
+        # Row counters: rows written per table, kept in ROW_COUNTS_TABLE by each batch
+        self._row_counts_ready = False
         
         self._engine = engine
         self._task = None
@@ -152,6 +371,14 @@ class ScribeWriter:
         _LOGGER.debug("Starting ScribeWriter...")
         self._running = True
         
+        # Pick up batches spilled to disk by a previous run, before anything can spill
+        # again (an outage at startup must not wait for the database init)
+        if self._spill:
+            try:
+                await self.hass.async_add_executor_job(self._spill.load)
+            except Exception:
+                _LOGGER.exception("Failed to load spill log")
+        
         # Create Engine
         if not self._engine:
             try:
@@ -193,8 +420,9 @@ class ScribeWriter:
                 # Create engine
                 self._engine = create_async_engine(
                     self.db_url,
-                    pool_size=10,
+                    pool_size=self.max_inflight_batches + POOL_HEADROOM,
                     max_overflow=20,
+                    pool_pre_ping=True,
                     echo=False,
                     connect_args=connect_args
                 )
@@ -205,31 +433,144 @@ class ScribeWriter:
                 _LOGGER.error(f"Failed to create engine: {e}", exc_info=True)
                 return
 
+        if self.background_init:
+            # Rows are accepted right away; the loop flushes them once init is done
+            self._init_task = asyncio.create_task(self._initialize())
+        elif not await self._initialize(retry=False):
+            # Keep rows queued and retry the schema setup in the background
+            self._init_task = asyncio.create_task(self._initialize())
+        
+        # Start Loop
+        self._task = asyncio.create_task(self._run())
+        _LOGGER.info("ScribeWriter started successfully")
+
+    async def _initialize(self, retry: bool = True) -> bool:
+        """Set up the schema, load counters and the spill log, then mark the writer ready.
+        
+        The writer only becomes ready once init_db succeeded. With retry, a failed
+        init_db is retried with a doubling delay (up to the breaker's max backoff)
+        while rows stay queued or spill to disk; without it, False is returned.
+        """
         # Initialize DB
         _LOGGER.debug("Starting database initialization...")
-        await self.init_db()
+        delay = INIT_RETRY_DELAY
+        while not await self.init_db():
+            if not retry:
+                return False
+            _LOGGER.warning(f"Database initialization failed, retrying in {delay}s ({self.queue_size} rows queued)")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._breaker.max_backoff)
         _LOGGER.debug("Database initialization completed")
         
         # Fetch initial counts
         await self._get_initial_counts()
         
-        # Start Loop
-        self._task = asyncio.create_task(self._run())
-        _LOGGER.info("ScribeWriter started successfully")
+        # Replay batches spilled by a previous run or during init
+        if self._spill and self._connected:
+            self._schedule_replay()
+        
+        self._ready.set()
+        if self._connected:
+            self._start_migrations()
+        if self.queue_size >= self.batch_size and not self._flush_pending:
+            # Flush what was queued during init instead of waiting for the next interval
+            self._flush_pending = True
+            self._catch_up_task = asyncio.create_task(self._flush())
+        return True
+
+    @property
+    def ready(self) -> bool:
+        """Return True once database initialization has finished."""
+        return self._ready.is_set()
+
+    @property
+    def _initializing(self) -> bool:
+        """Return True while rows are held back until the schema is set up."""
+        return self._init_task is not None and not self._ready.is_set()
+
+    async def wait_ready(self):
+        """Wait until database initialization has finished."""
+        await self._ready.wait()
+
+    @property
+    def has_states_view(self) -> bool:
+        """Return True if states rows are spread over tables that states_view puts back together."""
+        return self.shared_attributes or self.metadata_ids or self.numeric_table or self.state_enums or self.state_spans
+
+    async def last_states(self, entity_ids: list[str]) -> list[tuple]:
+        """Return the last stored (entity_id, state, value, attributes) of the given entities.
+
+        One index lookup per entity (LATERAL ... ORDER BY time DESC LIMIT 1),
+        bounded to the last chunk_interval so old chunks are not scanned.
+        """
+        if not self._engine or not entity_ids:
+            return []
+        source = f"{self.table_name_states}_view" if self.has_states_view else self.table_name_states
+        async with self._engine.connect() as conn:
+            result = await conn.execute(
+                text(f"""
+                    SELECT e.entity_id, s.state, s.value, s.attributes
+                    FROM unnest(CAST(:entity_ids AS TEXT[])) AS e(entity_id)
+                    CROSS JOIN LATERAL (
+                        SELECT state, value, attributes FROM {source}
+                        WHERE entity_id = e.entity_id AND time > now() - INTERVAL '{self.chunk_interval}'
+                        ORDER BY time DESC LIMIT 1
+                    ) s;
+                """),
+                {"entity_ids": list(entity_ids)},
+            )
+            rows = []
+            for entity_id, state, value, attributes in result:
+                if isinstance(attributes, str):
+                    attributes = json.loads(attributes)
+                rows.append((entity_id, state, value, attributes))
+            return rows
 
     async def _get_initial_counts(self):
-        """Fetch initial row counts from database."""
+        """Load the row counters, seeding missing ones from approximate_row_count().
+        
+        Counting the hypertables would scan (and decompress) every chunk, so the
+        counters are kept in ROW_COUNTS_TABLE by the batches themselves. A table
+        without a counter (first start with it) gets the TimescaleDB estimate.
+        """
+        if not self._row_counts_ready:
+            return
         _LOGGER.debug("Fetching initial row counts...")
+        counted = {}
+        if self.record_states:
+            tables = [self.table_name_states]
+            if self.numeric_table:
+                tables.append(self.table_name_numeric)
+            if self.state_spans:
+                tables.append(self.table_name_spans)
+            counted[self.table_name_states] = tables
+        if self.record_events:
+            counted[self.table_name_events] = [self.table_name_events]
         try:
-            async with self._engine.connect() as conn:
-                if self.record_states:
-                    res = await conn.execute(text(f"SELECT count(*) FROM {self.table_name_states}"))
-                    self._states_written = res.scalar() or 0
-                
-                if self.record_events:
-                    res = await conn.execute(text(f"SELECT count(*) FROM {self.table_name_events}"))
-                    self._events_written = res.scalar() or 0
-                    
+            async with self._engine.begin() as conn:
+                result = await conn.execute(text(f"SELECT table_name, row_count FROM {ROW_COUNTS_TABLE}"))
+                # Iterate the rows: dict(result) would use Result.keys(), the column names
+                counts = dict(iter(result))
+                for table_name, tables in counted.items():
+                    if table_name in counts:
+                        continue
+                    res = await conn.execute(
+                        text("""
+                            SELECT COALESCE(SUM(GREATEST(approximate_row_count(CAST(t AS regclass)), 0)), 0)
+                            FROM unnest(CAST(:tables AS TEXT[])) AS t
+                        """),
+                        {"tables": tables}
+                    )
+                    counts[table_name] = int(res.scalar() or 0)
+                    await conn.execute(
+                        text(f"INSERT INTO {ROW_COUNTS_TABLE} (table_name, row_count) VALUES (:table_name, :row_count) ON CONFLICT DO NOTHING"),
+                        {"table_name": table_name, "row_count": counts[table_name]}
+                    )
+                    _LOGGER.info(f"Seeded row counter of {table_name} with an estimate of {counts[table_name]} rows")
+            
+            # Rows of batches committed before the counters were loaded (background init)
+            self._states_written += counts.get(self.table_name_states, 0)
+            self._events_written += counts.get(self.table_name_events, 0)
             _LOGGER.debug(f"Initial counts: states={self._states_written}, events={self._events_written}")
         except Exception as e:
             _LOGGER.warning(f"Failed to fetch initial counts: {e}")
@@ -240,6 +581,12 @@ class ScribeWriter:
         """Stop the writer task."""
         _LOGGER.debug("Stopping ScribeWriter...")
         self._running = False
+        if self._init_task and not self._init_task.done():
+            self._init_task.cancel()
+            try:
+                await self._init_task
+            except asyncio.CancelledError:
+                pass
         if self._task:
             self._task.cancel()
             try:
@@ -249,6 +596,32 @@ class ScribeWriter:
         
         # Final flush
         await self._flush()
+        if self._drain_task:
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+        
+        # Database still down: keep what is left on disk for the next start
+        if self.queue_size and self._spill:
+            await self._spill_blocks([(kind, buffer.take()) for kind, buffer in self._buffers.items()])
+        
+        # Make sure overflowing rows reach the spill log, stop any replay in progress
+        if self._spill_task:
+            await self._spill_task
+        if self._replay_task:
+            self._replay_task.cancel()
+            try:
+                await self._replay_task
+            except asyncio.CancelledError:
+                pass
+        if self._migration_task:
+            self._migration_task.cancel()
+            try:
+                await self._migration_task
+            except asyncio.CancelledError:
+                pass
         
         if self._engine:
             await self._engine.dispose()
@@ -259,7 +632,9 @@ class ScribeWriter:
         _LOGGER.debug("ScribeWriter loop started")
         while self._running:
             try:
-                await asyncio.sleep(self.flush_interval)
+                # While the breaker is open, sleep until the next probe is due
+                await asyncio.sleep(self._breaker.retry_in() or self.flush_interval)
+                self._retune()
                 await self._flush()
             except asyncio.CancelledError:
                 break
@@ -270,55 +645,399 @@ class ScribeWriter:
         """Add data to the queue.
         
         This is called from the main loop, so it shouldn't block.
-        We use deque with maxlen, so old items are automatically dropped if full.
+        The row is unpacked into the column buffer of its table; the dict itself
+        is not kept. If the queue is full, rows are evicted according to the
+        overflow policy (by default the oldest rows of the largest buffer).
         """
-        self._queue.append(data)
+        kind = data["type"]
+        policy = self._overflow
+        buffer = self._buffers[kind]
+        
+        # Span entities: a state that repeats the open span is not a new row
+        if (
+            kind == "state"
+            and self._spans is not None
+            and self._spans.is_span(data["entity_id"])
+            and not self._spans.changed(data["entity_id"], data.get("state"), data.get("value"))
+        ):
+            return
+        
+        if policy.over_quota(kind, len(buffer)):
+            self._evict(len(buffer) - policy.quotas[kind] + 1, [kind], DROP_QUOTA)
         
-        # Trigger flush if batch size reached (but only if no flush is already pending)
-        if len(self._queue) >= self.batch_size and not self._flush_pending:
+        if policy.mode == OVERFLOW_DROP_OLDEST:
+            if self.queue_size >= self.max_queue_size:
+                self._trim_queue(self.max_queue_size - 1)
+            buffer.append_row(data)
+        else:
+            if self.queue_size >= self.max_queue_size and not policy.admit(kind, data.get(KEY_COLUMNS[kind])):
+                self._count_dropped(DROP_SAMPLED, kind, 1)
+                return
+            # Append first so the new row competes with the queued ones on priority
+            buffer.append_row(data)
+            self._trim_queue(self.max_queue_size)
+        self._enqueued_rows += 1
+        
+        # Trigger flush if batch size reached (but only if no flush is already pending).
+        # While all flush slots are busy the pending flush waits for one, so rows keep
+        # accumulating here (bounded by max_queue_size) instead of spawning more tasks.
+        # During init the rows stay queued; _initialize flushes them once it is done.
+        if (
+            self.queue_size >= self.batch_size
+            and not self._flush_pending
+            and self._breaker.is_closed
+            and not self._initializing
+        ):
             self._flush_pending = True
-            _LOGGER.debug(f"Batch size reached ({len(self._queue)} >= {self.batch_size}), triggering flush")
+            _LOGGER.debug(f"Batch size reached ({self.queue_size} >= {self.batch_size}), triggering flush")
             asyncio.create_task(self._flush())
 
+    def _trim_queue(self, limit: int) -> None:
+        """Evict rows until the queue fits in limit."""
+        if self.queue_size > limit:
+            self._evict(self.queue_size - limit, list(self._buffers), DROP_QUEUE_FULL)
+
+    def _evict(self, count: int, kinds: list[str], reason: str) -> None:
+        """Evict `count` rows from the buffers of the given row types.
+        
+        drop_oldest evicts the oldest rows of the largest buffer. The priority
+        and sample policies evict the lowest priority rows first, a chunk at a
+        time. With the disk spill enabled, evicted rows are handed to the spill
+        log instead of being dropped.
+        """
+        buffers = {kind: self._buffers[kind] for kind in kinds}
+        evicted: list[tuple[str, ColumnBlock]] = []
+        
+        if self._overflow.mode == OVERFLOW_DROP_OLDEST:
+            while count > 0 and any(buffers.values()):
+                kind, largest = max(buffers.items(), key=lambda item: len(item[1]))
+                n = min(count, len(largest))
+                if self._spill:
+                    evicted.append((kind, largest.take(n)))
+                else:
+                    largest.popleft(n)
+                    self._count_dropped(reason, kind, n)
+                count -= n
+        else:
+            chunk = max(count, int(self.max_queue_size * EVICTION_CHUNK))
+            selected = self._overflow.select(buffers, chunk)
+            for kind, indices in selected.items():
+                if indices:
+                    block = buffers[kind].extract(indices)
+                    if self._spill:
+                        evicted.append((kind, block))
+                    else:
+                        self._count_dropped(reason, kind, len(block))
+        
+        if evicted:
+            self._spill_pending.extend(evicted)
+            if not self._spill_task:
+                self._spill_task = asyncio.create_task(self._spill_overflow())
+
+    def _count_dropped(self, reason: str, kind: str, count: int) -> None:
+        """Count rows that will never be written."""
+        self._dropped_events += count
+        self._dropped[reason] += count
+        self._dropped_by_type[kind] += count
+
+    async def _spill_overflow(self):
+        """Write rows evicted from the in-memory queue to the spill log."""
+        try:
+            while self._spill_pending:
+                pending, self._spill_pending = self._spill_pending, []
+                self._spilling_rows = sum(len(block) for _, block in pending)
+                await self._spill_blocks(pending)
+        finally:
+            self._spilling_rows = 0
+            self._spill_task = None
+
+    async def _spill_blocks(self, blocks: list[tuple[str, ColumnBlock]]):
+        """Append blocks to the spill log (file I/O runs in the executor)."""
+        for kind, block in blocks:
+            if not block:
+                continue
+            try:
+                await self.hass.async_add_executor_job(self._spill.append, kind, block)
+            except Exception:
+                self._count_dropped(DROP_SPILL_FAILED, kind, len(block))
+                _LOGGER.exception(f"Failed to spill {len(block)} rows to disk")
+
+    def _schedule_replay(self):
+        """Start replaying the spill log in the background if it holds rows."""
+        if self._spill and self._spill.rows and not self._replay_task:
+            self._replay_task = asyncio.create_task(self._replay_spill())
+
+    async def _replay_spill(self):
+        """Write spilled segments back to the database, oldest first.
+        
+        Each segment is written in bulk (one write per table) and deleted once
+        committed. Replay stops at the first failure; the remaining segments are
+        kept for the next attempt.
+        """
+        try:
+            segments = await self.hass.async_add_executor_job(self._spill.seal)
+            self._replay_total = self._spill.rows
+            self._replay_done = 0
+            _LOGGER.info(f"Replaying {self._replay_total} spilled rows from {len(segments)} segments")
+            
+            for segment in segments:
+                rows = self._spill.segment_rows(segment)
+                frames = await self.hass.async_add_executor_job(self._spill.read_segment, segment)
+                states_block = ColumnBlock.merge(STATES_COLUMNS, [b for k, b in frames if k == "state"])
+                events_block = ColumnBlock.merge(EVENTS_COLUMNS, [b for k, b in frames if k == "event"])
+                if states_block or events_block:
+                    await self._write_blocks(states_block, events_block)
+                await self.hass.async_add_executor_job(self._spill.remove_segment, segment)
+                self._replay_done += rows
+            
+            _LOGGER.info(f"Spill replay completed ({self._replay_done} rows)")
+        except Exception as e:
+            _LOGGER.warning(f"Spill replay interrupted: {e}", exc_info=True)
+        finally:
+            self._replay_task = None
+
+    @property
+    def replay_progress(self) -> float | None:
+        """Return the progress of the current/last spill replay in percent."""
+        if not self._replay_total:
+            return None
+        return round(min(self._replay_done / self._replay_total, 1.0) * 100, 1)
+
+    def _start_migrations(self):
+        """Start the configured data migrations whose storage option is enabled."""
+        migrations = []
+        for name in self.migrations:
+            if name == MIGRATION_METADATA_IDS and self.record_states and self.metadata_ids:
+                tables = [self.table_name_states]
+                if self.numeric_table:
+                    tables.append(self.table_name_numeric)
+                migrations.append(metadata_ids_migration(tables, ENTITY_IDS_TABLE))
+            elif name == MIGRATION_STATE_ENUMS and self.record_states and self.state_enums:
+                migrations.append(state_enums_migration(self.table_name_states, STATE_ENUMS_TABLE, ENTITY_IDS_TABLE))
+            else:
+                _LOGGER.warning(f"Migration {name} skipped: its storage option is not enabled")
+        if not migrations or self._migration_task:
+            return
+        self._migrator = ChunkMigrator(self._engine, migrations, self._migration_busy, self.migration_pause)
+        self._migration_task = asyncio.create_task(self._migrator.run())
+
+    def _migration_busy(self) -> bool:
+        """Return True while ingest needs the database more than the migration."""
+        return self.queue_size >= self.batch_size or not self._breaker.is_closed
+
+    @property
+    def migration_progress(self) -> float | None:
+        """Return the progress of the data migrations in percent."""
+        if not self._migrator:
+            return None
+        return self._migrator.progress
+
+    @property
+    def migration_status(self) -> dict:
+        """Return the state and chunk counts of every data migration."""
+        if not self._migrator:
+            return {}
+        return {name: dict(status) for name, status in self._migrator.status.items()}
+
+    @property
+    def queue_size(self) -> int:
+        """Return the number of rows waiting to be written."""
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    @property
+    def unsettled_rows(self) -> int:
+        """Return the number of accepted rows not yet committed, spilled to disk or dropped."""
+        spill_pending = sum(len(block) for _, block in self._spill_pending)
+        return self.queue_size + self._inflight_rows + self._spilling_rows + spill_pending
+
     async def init_db(self):
-        """Initialize database tables."""
+        """Initialize database tables.
+        
+        The DDL only runs when the version or the settings hash recorded in
+        SCHEMA_TABLE differ from this writer's; otherwise startup is a lookup
+        plus loading the dictionary tables into memory.
+        """
         _LOGGER.debug("Initializing database...")
         if not self._engine:
-            return
+            return False
 
         try:
-            # Create tables
-            async with self._engine.begin() as conn:
-                if self.record_states:
-                    await self._init_states_table(conn)
-                if self.record_events:
-                    await self._init_events_table(conn)
-                
-                # Always init users table
-                if self.enable_table_users:
-                    await self._init_users_table(conn)
-                if self.enable_table_entities:
-                    await self._init_entities_table(conn)
-                if self.enable_table_areas:
-                    await self._init_areas_table(conn)
-                if self.enable_table_devices:
-                    await self._init_devices_table(conn)
-                if self.enable_table_integrations:
-                    await self._init_integrations_table(conn)
-
-            # Hypertable & Compression (each operation in its own transaction)
-            if self.record_states:
-                await self._init_hypertable(self.table_name_states, "entity_id")
+            version, settings_hash = await self._schema_state()
+            expected_hash = self._settings_hash()
+            if version > SCHEMA_VERSION:
+                _LOGGER.warning(f"Database schema version {version} is newer than this Scribe ({SCHEMA_VERSION})")
+            steps = [name for step_version, name in SCHEMA_MIGRATIONS if step_version > version]
+            if settings_hash != expected_hash and "_create_schema" not in steps:
+                steps.insert(0, "_create_schema")
             
-            if self.record_events:
-                await self._init_hypertable(self.table_name_events, "event_type")
+            if steps:
+                _LOGGER.info(f"Updating database schema (version {version} -> {SCHEMA_VERSION}): {', '.join(steps)}")
+                complete = True
+                for name in steps:
+                    if await getattr(self, name)() is False:
+                        complete = False
+                if complete:
+                    await self._record_schema(expected_hash)
+                else:
+                    _LOGGER.warning("Database schema is incomplete, it will be updated again at the next start")
+            else:
+                _LOGGER.debug(f"Database schema version {version} is up to date")
+            
+            async with self._engine.begin() as conn:
+                await self._load_mappings(conn)
                     
-            _LOGGER.info("Database initialized successfully")
-            self._connected = True
-
         except Exception as e:
             _LOGGER.error(f"Error initializing database: {e}")
             self._connected = False
+            return False
+
+        _LOGGER.info("Database initialized successfully")
+        self._connected = True
+        return True
+
+    def _settings_hash(self) -> str:
+        """Return a hash of the settings that shape the schema."""
+        settings = {
+            "tables": [self.table_name_states, self.table_name_events],
+            "record": [self.record_states, self.record_events],
+            "chunk_interval": self.chunk_interval,
+            "compress_after": [self.compress_after, self.numeric_compress_after],
+            "shared_attributes": self.shared_attributes,
+            "metadata_ids": self.metadata_ids,
+            "compact_events": self.compact_events,
+            "numeric_table": self.numeric_table,
+            "state_enums": self._state_enums.seed_rows() if self.state_enums else None,
+            "state_spans": self.state_spans,
+            "tables_enabled": [
+                self.enable_table_users,
+                self.enable_table_entities,
+                self.enable_table_areas,
+                self.enable_table_devices,
+                self.enable_table_integrations,
+            ],
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+
+    @property
+    def _schema_name(self) -> str:
+        """Return the key of this writer's row in SCHEMA_TABLE."""
+        return f"{self.table_name_states},{self.table_name_events}"
+
+    async def _schema_state(self) -> tuple[int, str | None]:
+        """Return the recorded (version, settings hash), or (0, None) before the first run."""
+        try:
+            async with self._engine.connect() as conn:
+                result = await conn.execute(
+                    text(f"SELECT version, settings_hash FROM {SCHEMA_TABLE} WHERE name = :name"),
+                    {"name": self._schema_name}
+                )
+                row = result.first()
+                if row is not None:
+                    return int(row[0]), row[1]
+        except Exception as e:
+            _LOGGER.debug(f"No schema version recorded: {e}", exc_info=True)
+        return 0, None
+
+    async def _record_schema(self, settings_hash: str):
+        """Record the applied schema version and settings hash."""
+        async with self._engine.begin() as conn:
+            await conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    settings_hash TEXT NOT NULL,
+                    last_updated TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+            """))
+            await conn.execute(
+                text(f"""
+                    INSERT INTO {SCHEMA_TABLE} (name, version, settings_hash) VALUES (:name, :version, :settings_hash)
+                    ON CONFLICT (name) DO UPDATE SET
+                        version = GREATEST({SCHEMA_TABLE}.version, EXCLUDED.version),
+                        settings_hash = EXCLUDED.settings_hash,
+                        last_updated = NOW()
+                """),
+                {"name": self._schema_name, "version": SCHEMA_VERSION, "settings_hash": settings_hash}
+            )
+
+    async def _load_mappings(self, conn):
+        """Load the dictionary tables and open spans into memory."""
+        self._row_counts_ready = self.record_states or self.record_events
+        if self.record_states and self.metadata_ids:
+            result = await conn.execute(text(f"SELECT metadata_id, entity_id FROM {ENTITY_IDS_TABLE}"))
+            self._metadata_ids = {entity_id: metadata_id for metadata_id, entity_id in result}
+            _LOGGER.debug(f"Loaded {len(self._metadata_ids)} metadata ids")
+        if self.record_states and self.state_enums:
+            result = await conn.execute(text(f"SELECT domain, state, state_idx FROM {STATE_ENUMS_TABLE}"))
+            self._state_enums.load(result)
+        if self.record_states and self.state_spans:
+            result = await conn.execute(text(f"""
+                SELECT DISTINCT ON (entity_id) entity_id, state, value
+                FROM {self.table_name_spans} WHERE "end" IS NULL ORDER BY entity_id, start DESC;
+            """))
+            self._spans.load(result)
+            _LOGGER.debug(f"Loaded {len(self._spans)} open spans")
+        if self.record_events and self.compact_events:
+            result = await conn.execute(text(f"SELECT event_type_id, event_type FROM {EVENT_TYPES_TABLE}"))
+            self._event_type_ids = {event_type: event_type_id for event_type_id, event_type in result}
+            _LOGGER.debug(f"Loaded {len(self._event_type_ids)} event type ids")
+
+    async def _create_schema(self) -> bool:
+        """Create the tables, views and hypertables (idempotent DDL).
+        
+        Returns False if a hypertable could not be created, so the schema is
+        not recorded and the DDL runs again at the next start.
+        """
+        # Create tables
+        async with self._engine.begin() as conn:
+            if self.record_states or self.record_events:
+                await self._init_row_counts_table(conn)
+            if self.record_states:
+                await self._init_states_table(conn)
+                if self.shared_attributes:
+                    await self._init_state_attributes_table(conn)
+                if self.metadata_ids:
+                    await self._init_entity_ids_table(conn)
+                if self.numeric_table:
+                    await self._init_numeric_table(conn)
+                if self.state_enums:
+                    await self._init_state_enums_table(conn)
+                if self.state_spans:
+                    await self._init_spans_table(conn)
+                if self.has_states_view:
+                    await self._init_states_view(conn)
+            if self.record_events:
+                await self._init_events_table(conn)
+                if self.compact_events:
+                    await self._init_compact_events(conn)
+            
+            # Always init users table
+            if self.enable_table_users:
+                await self._init_users_table(conn)
+            if self.enable_table_entities:
+                await self._init_entities_table(conn)
+            if self.enable_table_areas:
+                await self._init_areas_table(conn)
+            if self.enable_table_devices:
+                await self._init_devices_table(conn)
+            if self.enable_table_integrations:
+                await self._init_integrations_table(conn)
+
+        # Hypertable & Compression (each operation in its own transaction)
+        hypertables = []
+        if self.record_states:
+            # New rows of the compact schema have no entity_id, segment them by metadata_id
+            segment_by = "entity_id, metadata_id" if self.metadata_ids else "entity_id"
+            hypertables.append(await self._init_hypertable(self.table_name_states, segment_by))
+            if self.numeric_table:
+                hypertables.append(await self._init_hypertable(self.table_name_numeric, segment_by, self.numeric_compress_after))
+            if self.state_spans:
+                hypertables.append(await self._init_hypertable(self.table_name_spans, "entity_id", time_column="start"))
+        
+        if self.record_events:
+            segment_by = "event_type, event_type_id" if self.compact_events else "event_type"
+            hypertables.append(await self._init_hypertable(self.table_name_events, segment_by))
+        return all(hypertables)
 
     async def _init_states_table(self, conn):
         """Initialize states table."""
@@ -337,6 +1056,220 @@ class ScribeWriter:
             ON {self.table_name_states} (entity_id, time DESC);
         """))
 
+    async def _init_state_attributes_table(self, conn):
+        """Initialize the shared attributes table and the states view that joins it."""
+        _LOGGER.debug(f"Creating table {STATE_ATTRIBUTES_TABLE} if not exists")
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_ATTRIBUTES_TABLE} (
+                attributes_id BIGINT PRIMARY KEY,
+                shared_attrs JSONB NOT NULL
+            );
+        """))
+        await conn.execute(text(f"""
+            ALTER TABLE {self.table_name_states} ADD COLUMN IF NOT EXISTS attributes_id BIGINT;
+        """))
+
+    async def _init_entity_ids_table(self, conn):
+        """Initialize the entity_ids dictionary."""
+        _LOGGER.debug(f"Creating table {ENTITY_IDS_TABLE} if not exists")
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {ENTITY_IDS_TABLE} (
+                metadata_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                entity_id TEXT NOT NULL UNIQUE
+            );
+        """))
+        await conn.execute(text(f"""
+            ALTER TABLE {self.table_name_states} ADD COLUMN IF NOT EXISTS metadata_id INTEGER;
+        """))
+        await conn.execute(text(f"""
+            ALTER TABLE {self.table_name_states} ALTER COLUMN entity_id DROP NOT NULL;
+        """))
+        await conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {self.table_name_states}_metadata_time_idx
+            ON {self.table_name_states} (metadata_id, time DESC);
+        """))
+
+    async def _init_compact_events(self, conn):
+        """Initialize the event_types dictionary, the compact events columns and events_view."""
+        _LOGGER.debug(f"Creating table {EVENT_TYPES_TABLE} if not exists")
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {EVENT_TYPES_TABLE} (
+                event_type_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                event_type TEXT NOT NULL UNIQUE
+            );
+        """))
+        await conn.execute(text(f"""
+            ALTER TABLE {self.table_name_events}
+                ADD COLUMN IF NOT EXISTS event_type_id INTEGER,
+                ADD COLUMN IF NOT EXISTS origin_idx SMALLINT,
+                ADD COLUMN IF NOT EXISTS context_id_bin BYTEA,
+                ADD COLUMN IF NOT EXISTS context_user_id_bin BYTEA,
+                ADD COLUMN IF NOT EXISTS context_parent_id_bin BYTEA;
+        """))
+        await conn.execute(text(f"""
+            ALTER TABLE {self.table_name_events} ALTER COLUMN event_type DROP NOT NULL;
+        """))
+        await conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {self.table_name_events}_type_id_time_idx
+            ON {self.table_name_events} (event_type_id, time DESC);
+        """))
+        await conn.execute(text(ULID_TEXT_FUNCTION))
+        
+        # Same shape as the events table; rows written before the switch keep their text columns
+        origin = " ".join(f"WHEN {idx} THEN '{name}'" for idx, name in enumerate(ORIGINS))
+        columns = f"""
+                e.event_data,
+                COALESCE(e.origin, CASE e.origin_idx {origin} END) AS origin,
+                COALESCE(e.context_id, scribe_ulid_text(e.context_id_bin)) AS context_id,
+                COALESCE(e.context_user_id, encode(e.context_user_id_bin, 'hex')) AS context_user_id,
+                COALESCE(e.context_parent_id, scribe_ulid_text(e.context_parent_id_bin)) AS context_parent_id"""
+        await conn.execute(text(f"""
+            CREATE OR REPLACE VIEW {self.table_name_events}_view AS
+            SELECT e.time, t.event_type, {columns}
+            FROM {self.table_name_events} e
+            JOIN {EVENT_TYPES_TABLE} t ON t.event_type_id = e.event_type_id
+            UNION ALL
+            SELECT e.time, e.event_type, {columns}
+            FROM {self.table_name_events} e
+            WHERE e.event_type_id IS NULL;
+        """))
+
+    async def _init_numeric_table(self, conn):
+        """Initialize the narrow numeric states table."""
+        _LOGGER.debug(f"Creating table {self.table_name_numeric} if not exists")
+        # entity_id or metadata_id is set depending on metadata_ids; the unused one stays NULL
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name_numeric} (
+                time TIMESTAMPTZ NOT NULL,
+                entity_id TEXT,
+                metadata_id INTEGER,
+                value DOUBLE PRECISION NOT NULL
+            );
+        """))
+        key = "metadata" if self.metadata_ids else "entity"
+        await conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {self.table_name_numeric}_{key}_time_idx
+            ON {self.table_name_numeric} ({key}_id, time DESC);
+        """))
+
+    async def _init_state_enums_table(self, conn):
+        """Initialize the per-domain state mappings, seeded with the built-in ones."""
+        _LOGGER.debug(f"Creating table {STATE_ENUMS_TABLE} if not exists")
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_ENUMS_TABLE} (
+                domain TEXT NOT NULL,
+                state TEXT NOT NULL,
+                state_idx SMALLINT NOT NULL,
+                PRIMARY KEY (domain, state),
+                UNIQUE (domain, state_idx)
+            );
+        """))
+        await conn.execute(text(f"""
+            ALTER TABLE {self.table_name_states} ADD COLUMN IF NOT EXISTS state_idx SMALLINT;
+        """))
+        # Mappings already in the database win over the built-in ones
+        await conn.execute(
+            text(f"INSERT INTO {STATE_ENUMS_TABLE} (domain, state, state_idx) VALUES (:domain, :state, :state_idx) ON CONFLICT DO NOTHING"),
+            self._state_enums.seed_rows()
+        )
+
+    async def _init_spans_table(self, conn):
+        """Initialize the span table and its trigger."""
+        table = self.table_name_spans
+        _LOGGER.debug(f"Creating table {table} if not exists")
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                start TIMESTAMPTZ NOT NULL,
+                "end" TIMESTAMPTZ,
+                entity_id TEXT NOT NULL,
+                state TEXT,
+                value DOUBLE PRECISION,
+                attributes JSONB
+            );
+        """))
+        await conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {table}_entity_start_idx ON {table} (entity_id, start DESC);
+        """))
+        await conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {table}_open_idx ON {table} (entity_id) WHERE "end" IS NULL;
+        """))
+        # A new span closes the open span of its entity. If that fails (e.g. the open
+        # span sits in a compressed chunk), "end" stays NULL and the next start is the end.
+        await conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {table}_close() RETURNS TRIGGER AS $$
+            BEGIN
+                BEGIN
+                    UPDATE {table} SET "end" = NEW.start
+                    WHERE entity_id = NEW.entity_id AND "end" IS NULL AND start < NEW.start;
+                EXCEPTION WHEN OTHERS THEN
+                    RAISE WARNING 'Could not close span of %: %', NEW.entity_id, SQLERRM;
+                END;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        await conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_close ON {table};"))
+        await conn.execute(text(f"""
+            CREATE TRIGGER {table}_close BEFORE INSERT ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_close();
+        """))
+
+    async def _init_states_view(self, conn):
+        """Create states_view, which exposes the original states columns.
+        
+        Rows written before the compact schema was enabled keep their inline
+        entity_id / attributes, and numeric rows may live in the numeric table.
+        Span rows appear once, at the start of the span. The view is a UNION
+        ALL of all of them so that a filter on entity_id can still use the
+        (entity_id, time) and (metadata_id, time) indexes.
+        """
+        state, attributes, join = "s.state", "s.attributes", ""
+        if self.shared_attributes:
+            attributes = "COALESCE(s.attributes, a.shared_attrs)"
+            join += f" LEFT JOIN {STATE_ATTRIBUTES_TABLE} a ON a.attributes_id = s.attributes_id"
+        if self.state_enums:
+            state = "COALESCE(s.state, e.state)"
+            join += f" LEFT JOIN {STATE_ENUMS_TABLE} e ON e.domain = split_part({{entity}}, '.', 1) AND e.state_idx = s.state_idx"
+        
+        # (table, state, attributes, join) per table holding states rows
+        sources = [(self.table_name_states, state, attributes, join)]
+        if self.numeric_table:
+            sources.append((self.table_name_numeric, "NULL::TEXT", "NULL::JSONB", ""))
+        
+        selects = []
+        if self.state_spans:
+            # One point-in-time row per span, at its start
+            selects.append(f"""
+                SELECT s.start AS time, s.entity_id, s.state, s.value, s.attributes
+                FROM {self.table_name_spans} s""")
+        for table, state, attributes, join in sources:
+            if self.metadata_ids:
+                selects.append(f"""
+                    SELECT s.time, m.entity_id, {state} AS state, s.value, {attributes} AS attributes
+                    FROM {table} s
+                    JOIN {ENTITY_IDS_TABLE} m ON m.metadata_id = s.metadata_id
+                    {join.format(entity="m.entity_id")}""")
+                condition = "WHERE s.metadata_id IS NULL"
+            else:
+                condition = ""
+            selects.append(f"""
+                SELECT s.time, s.entity_id, {state} AS state, s.value, {attributes} AS attributes
+                FROM {table} s
+                {join.format(entity="s.entity_id")}
+                {condition}""")
+        select = "\n                UNION ALL".join(selects)
+        await conn.execute(text(f"CREATE OR REPLACE VIEW {self.table_name_states}_view AS {select};"))
+
+    async def _init_row_counts_table(self, conn):
+        """Initialize the table of rows written per table."""
+        _LOGGER.debug(f"Creating table {ROW_COUNTS_TABLE} if not exists")
+        await conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {ROW_COUNTS_TABLE} (
+                table_name TEXT PRIMARY KEY,
+                row_count BIGINT NOT NULL
+            );
+        """))
+
     async def _init_events_table(self, conn):
         """Initialize events table."""
         _LOGGER.debug(f"Creating table {self.table_name_events} if not exists")
@@ -356,6 +1289,98 @@ class ScribeWriter:
             ON {self.table_name_events} (event_type, time DESC);
         """))
 
+    async def _init_registry_columns(self, conn, table: str):
+        """Add the sync columns (content hash, removal time) to a registry table."""
+        await conn.execute(text(f"""
+            ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS row_hash BIGINT,
+                ADD COLUMN IF NOT EXISTS removed_at TIMESTAMPTZ;
+        """))
+
+    async def _add_registry_columns(self):
+        """Schema version 2: sync columns on the registry tables of existing installs."""
+        enabled = {
+            "users": self.enable_table_users,
+            "entities": self.enable_table_entities,
+            "areas": self.enable_table_areas,
+            "devices": self.enable_table_devices,
+            "integrations": self.enable_table_integrations,
+        }
+        async with self._engine.begin() as conn:
+            for table, enable in enabled.items():
+                if enable:
+                    await self._init_registry_columns(conn, table)
+
+    async def _registry_known(self, table: RegistryTable) -> dict[str, int | None]:
+        """Return the row hashes of the rows of a registry table (not removed), loading them once."""
+        known = self._registry_hashes.get(table.name)
+        if known is None:
+            async with self._engine.connect() as conn:
+                result = await conn.execute(text(f"SELECT {table.key}, row_hash FROM {table.name} WHERE removed_at IS NULL"))
+                known = dict(iter(result))
+            self._registry_hashes[table.name] = known
+        return known
+
+    async def _sync_registry(self, name: str, rows: list[dict], full: bool = False):
+        """Write the rows of a registry table that changed; a full sync also marks missing rows removed."""
+        table = REGISTRY_TABLES[name]
+        known = await self._registry_known(table)
+        changed, removed = table.diff(rows, known, full)
+        if not changed and not removed:
+            _LOGGER.debug(f"{name}: {len(rows)} rows unchanged")
+            return
+        
+        _LOGGER.debug(f"{name}: writing {len(changed)} changed rows, {len(removed)} removed")
+        merged = len(changed) >= COPY_THRESHOLD and await self._merge_registry_copy(table, changed)
+        async with self._engine.begin() as conn:
+            if changed and not merged:
+                await conn.execute(text(table.merge_sql()), changed)
+            if removed:
+                await conn.execute(
+                    text(f"UPDATE {table.name} SET removed_at = NOW() WHERE {table.key} = ANY(:keys) AND removed_at IS NULL"),
+                    {"keys": removed}
+                )
+        known.update((row[table.key], row["row_hash"]) for row in changed)
+        for key in removed:
+            known.pop(key, None)
+
+    async def _merge_registry_copy(self, table: RegistryTable, rows: list[dict]) -> bool:
+        """COPY rows into a temporary table and merge them; returns False if COPY is not available."""
+        columns = (*table.columns, "row_hash")
+        source = f"scribe_sync_{table.name}"
+        async with self._engine.connect() as conn:
+            raw_conn = await conn.get_raw_connection()
+            driver_conn = getattr(raw_conn, "driver_connection", None)
+            if driver_conn is None or not hasattr(driver_conn, "copy_records_to_table"):
+                return False
+            async with driver_conn.transaction():
+                await driver_conn.execute(
+                    f"CREATE TEMP TABLE {source} (LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await driver_conn.copy_records_to_table(
+                    source, records=[tuple(row[column] for column in columns) for row in rows], columns=columns
+                )
+                await driver_conn.execute(table.merge_sql(source))
+        return True
+
+    async def mark_registry_removed(self, name: str, keys: list[str]):
+        """Mark rows of a registry table as removed (registry remove events)."""
+        if not self._engine or not keys:
+            return
+        table = REGISTRY_TABLES[name]
+        try:
+            async with self._engine.begin() as conn:
+                await conn.execute(
+                    text(f"UPDATE {table.name} SET removed_at = NOW() WHERE {table.key} = ANY(:keys) AND removed_at IS NULL"),
+                    {"keys": list(keys)}
+                )
+            known = self._registry_hashes.get(name)
+            if known is not None:
+                for key in keys:
+                    known.pop(key, None)
+        except Exception:
+            _LOGGER.exception(f"Error marking {name} removed")
+
     async def _init_users_table(self, conn):
         """Initialize users table."""
         _LOGGER.debug("Creating table users if not exists")
@@ -369,29 +1394,17 @@ class ScribeWriter:
                 group_ids JSONB
             );
         """))
+        await self._init_registry_columns(conn, "users")
 
-    async def write_users(self, users: list[dict]):
-        """Write users to the database (upsert)."""
+    async def write_users(self, users: list[dict], full: bool = False):
+        """Write the users that changed (full: the whole registry, missing users are marked removed)."""
         if not self._engine or not users:
             return
 
         _LOGGER.debug(f"Writing {len(users)} users to database...")
         try:
-            async with self._engine.begin() as conn:
-                # Upsert users
-                # We use ON CONFLICT DO UPDATE to update existing users
-                stmt = text("""
-                    INSERT INTO users (user_id, name, is_owner, is_active, system_generated, group_ids)
-                    VALUES (:user_id, :name, :is_owner, :is_active, :system_generated, :group_ids)
-                    ON CONFLICT (user_id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        is_owner = EXCLUDED.is_owner,
-                        is_active = EXCLUDED.is_active,
-                        system_generated = EXCLUDED.system_generated,
-                        group_ids = EXCLUDED.group_ids;
-                """)
-                await conn.execute(stmt, users)
-                _LOGGER.debug("Users written successfully")
+            await self._sync_registry("users", users, full)
+            _LOGGER.debug("Users written successfully")
         except Exception as e:
             _LOGGER.error(f"Error writing users: {e}")
 
@@ -410,30 +1423,17 @@ class ScribeWriter:
                 capabilities JSONB
             );
         """))
+        await self._init_registry_columns(conn, "entities")
 
-    async def write_entities(self, entities: list[dict]):
-        """Write entities to the database (upsert)."""
+    async def write_entities(self, entities: list[dict], full: bool = False):
+        """Write the entities that changed (full: the whole registry, missing entities are marked removed)."""
         if not self._engine or not entities:
             return
 
         _LOGGER.debug(f"Writing {len(entities)} entities to database...")
         try:
-            async with self._engine.begin() as conn:
-                # Upsert entities
-                stmt = text("""
-                    INSERT INTO entities (entity_id, unique_id, platform, domain, name, device_id, area_id, capabilities)
-                    VALUES (:entity_id, :unique_id, :platform, :domain, :name, :device_id, :area_id, :capabilities)
-                    ON CONFLICT (entity_id) DO UPDATE SET
-                        unique_id = EXCLUDED.unique_id,
-                        platform = EXCLUDED.platform,
-                        domain = EXCLUDED.domain,
-                        name = EXCLUDED.name,
-                        device_id = EXCLUDED.device_id,
-                        area_id = EXCLUDED.area_id,
-                        capabilities = EXCLUDED.capabilities;
-                """)
-                await conn.execute(stmt, entities)
-                _LOGGER.debug("Entities written successfully")
+            await self._sync_registry("entities", entities, full)
+            _LOGGER.debug("Entities written successfully")
         except Exception as e:
             _LOGGER.error(f"Error writing entities: {e}")
 
@@ -447,24 +1447,17 @@ class ScribeWriter:
                 picture TEXT
             );
         """))
+        await self._init_registry_columns(conn, "areas")
 
-    async def write_areas(self, areas: list[dict]):
-        """Write areas to the database (upsert)."""
+    async def write_areas(self, areas: list[dict], full: bool = False):
+        """Write the areas that changed (full: the whole registry, missing areas are marked removed)."""
         if not self._engine or not areas:
             return
 
         _LOGGER.debug(f"Writing {len(areas)} areas to database...")
         try:
-            async with self._engine.begin() as conn:
-                stmt = text("""
-                    INSERT INTO areas (area_id, name, picture)
-                    VALUES (:area_id, :name, :picture)
-                    ON CONFLICT (area_id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        picture = EXCLUDED.picture;
-                """)
-                await conn.execute(stmt, areas)
-                _LOGGER.debug("Areas written successfully")
+            await self._sync_registry("areas", areas, full)
+            _LOGGER.debug("Areas written successfully")
         except Exception as e:
             _LOGGER.error(f"Error writing areas: {e}")
 
@@ -483,9 +1476,10 @@ class ScribeWriter:
                 primary_config_entry TEXT
             );
         """))
+        await self._init_registry_columns(conn, "devices")
 
-    async def write_devices(self, devices: list[dict]):
-        """Write devices to the database (upsert)."""
+    async def write_devices(self, devices: list[dict], full: bool = False):
+        """Write the devices that changed (full: the whole registry, missing devices are marked removed)."""
         if not self._engine or not devices:
             return
 
@@ -499,21 +1493,8 @@ class ScribeWriter:
                    device[field] = str(device[field])
 
         try:
-            async with self._engine.begin() as conn:
-                stmt = text("""
-                    INSERT INTO devices (device_id, name, name_by_user, model, manufacturer, sw_version, area_id, primary_config_entry)
-                    VALUES (:device_id, :name, :name_by_user, :model, :manufacturer, :sw_version, :area_id, :primary_config_entry)
-                    ON CONFLICT (device_id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        name_by_user = EXCLUDED.name_by_user,
-                        model = EXCLUDED.model,
-                        manufacturer = EXCLUDED.manufacturer,
-                        sw_version = EXCLUDED.sw_version,
-                        area_id = EXCLUDED.area_id,
-                        primary_config_entry = EXCLUDED.primary_config_entry;
-                """)
-                await conn.execute(stmt, devices)
-                _LOGGER.debug("Devices written successfully")
+            await self._sync_registry("devices", devices, full)
+            _LOGGER.debug("Devices written successfully")
         except Exception as e:
             _LOGGER.error(f"Error writing devices: {e}")
 
@@ -529,43 +1510,37 @@ class ScribeWriter:
                 source TEXT
             );
         """))
+        await self._init_registry_columns(conn, "integrations")
 
-    async def write_integrations(self, integrations: list[dict]):
-        """Write integrations to the database (upsert)."""
+    async def write_integrations(self, integrations: list[dict], full: bool = False):
+        """Write the integrations that changed (full: all config entries, missing ones are marked removed)."""
         if not self._engine or not integrations:
             return
 
         _LOGGER.debug(f"Writing {len(integrations)} integrations to database...")
         try:
-            async with self._engine.begin() as conn:
-                stmt = text("""
-                    INSERT INTO integrations (entry_id, domain, title, state, source)
-                    VALUES (:entry_id, :domain, :title, :state, :source)
-                    ON CONFLICT (entry_id) DO UPDATE SET
-                        domain = EXCLUDED.domain,
-                        title = EXCLUDED.title,
-                        state = EXCLUDED.state,
-                        source = EXCLUDED.source;
-                """)
-                await conn.execute(stmt, integrations)
-                _LOGGER.debug("Integrations written successfully")
+            await self._sync_registry("integrations", integrations, full)
+            _LOGGER.debug("Integrations written successfully")
         except Exception as e:
             _LOGGER.error(f"Error writing integrations: {e}")
 
-    async def _init_hypertable(self, table_name, segment_by):
+    async def _init_hypertable(self, table_name, segment_by, compress_after=None, time_column="time") -> bool:
         """Initialize hypertable and compression.
         
         Each operation is done in its own transaction to avoid
         'transaction aborted' errors when one operation fails.
+        Returns False if the table could not be converted to a hypertable.
         """
+        compress_after = compress_after or self.compress_after
         
         # Convert to hypertable
         try:
             _LOGGER.debug(f"Converting {table_name} to hypertable...")
             async with self._engine.begin() as op_conn:
-                await op_conn.execute(text(f"SELECT create_hypertable('{table_name}', 'time', chunk_time_interval => INTERVAL '{self.chunk_interval}', if_not_exists => TRUE);"))
+                await op_conn.execute(text(f"SELECT create_hypertable('{table_name}', '{time_column}', chunk_time_interval => INTERVAL '{self.chunk_interval}', if_not_exists => TRUE);"))
         except Exception as e:
             _LOGGER.warning(f"Hypertable creation failed (might not be TimescaleDB or already exists): {e}")
+            return False
 
         # Enable compression
         try:
@@ -575,7 +1550,7 @@ class ScribeWriter:
                     ALTER TABLE {table_name} SET (
                         timescaledb.compress,
                         timescaledb.compress_segmentby = '{segment_by}',
-                        timescaledb.compress_orderby = 'time DESC'
+                        timescaledb.compress_orderby = '{time_column} DESC'
                     );
                 """))
         except Exception as e:
@@ -585,73 +1560,404 @@ class ScribeWriter:
         try:
             _LOGGER.debug(f"Adding compression policy for {table_name}...")
             async with self._engine.begin() as op_conn:
-                await op_conn.execute(text(f"SELECT add_compression_policy('{table_name}', INTERVAL '{self.compress_after}', if_not_exists => TRUE);"))
+                await op_conn.execute(text(f"SELECT add_compression_policy('{table_name}', INTERVAL '{compress_after}', if_not_exists => TRUE);"))
         except Exception as e:
             _LOGGER.debug(f"Compression policy failed: {e}")
+        return True
 
     async def _flush(self):
-        """Flush the queue to the database."""
-        self._flush_pending = False  # Reset flag immediately
+        """Flush the queue to the database.
         
-        if not self._queue:
+        The rows queued when the flush starts are cut into batches of batch_size.
+        Each batch waits for a free flush slot (backpressure), is written on its own
+        connection, and commits after every batch cut before it. Returns once all
+        of its batches are done.
+        """
+        if self._initializing:
+            # Schema not set up yet: rows stay queued
+            self._flush_pending = False
             return
-
-        # Swap queue - drain the deque
-        batch = list(self._queue)
-        self._queue.clear()
-        
-        start_time = time.time()
+        batches = []
+        remaining = self.queue_size
+        try:
+            while remaining > 0 and self.queue_size:
+                if not self._breaker.allow_request():
+                    # Only drop while the breaker is open, not while a probe is in flight
+                    if not self.buffer_on_failure and self._breaker.state == STATE_OPEN:
+                        self._drop_queue()
+                    break
+                probing = self._breaker.state == STATE_HALF_OPEN
+                if probing:
+                    await self._reset_pool()
+                await self._flush_slots.acquire()
+                states_block, events_block = self._take_batch()
+                batch_len = len(states_block) + len(events_block)
+                if not batch_len:
+                    self._flush_slots.release()
+                    break
+                remaining -= batch_len
+                seq = self._next_batch_seq
+                self._next_batch_seq += 1
+                batches.append(asyncio.create_task(self._flush_batch(seq, states_block, events_block)))
+                if probing:
+                    # One probe batch; the rest is drained once it closes the breaker
+                    break
+        finally:
+            self._flush_pending = False  # Allow the next trigger once this flush is dispatched
         
+        if batches:
+            await asyncio.gather(*batches)
+
+    def _take_batch(self) -> tuple[ColumnBlock, ColumnBlock]:
+        """Cut the next batch (at most batch_size rows, states first) from the queue."""
+        states_block = self._buffers["state"].take(self.batch_size)
+        events_block = self._buffers["event"].take(max(self.batch_size - len(states_block), 0))
+        return states_block, events_block
+
+    async def _flush_batch(self, seq: int, states_block: ColumnBlock, events_block: ColumnBlock):
+        """Write one batch in a flush slot."""
+        batch_len = len(states_block) + len(events_block)
+        self._inflight_batches += 1
+        self._inflight_rows += batch_len
         try:
-            states_data = [x for x in batch if x['type'] == 'state']
-            events_data = [x for x in batch if x['type'] == 'event']
-            
-            async with self._engine.begin() as conn:
-                if states_data:
-                    await conn.execute(
-                        text(f"INSERT INTO {self.table_name_states} (time, entity_id, state, value, attributes) VALUES (:time, :entity_id, :state, :value, :attributes)"),
-                        states_data
-                    )
-                if events_data:
-                    await conn.execute(
-                        text(f"INSERT INTO {self.table_name_events} (time, event_type, event_data, origin, context_id, context_user_id, context_parent_id) VALUES (:time, :event_type, :event_data, :origin, :context_id, :context_user_id, :context_parent_id)"),
-                        events_data
-                    )
-            
-            duration = time.time() - start_time
-            self._states_written += len(states_data)
-            self._events_written += len(events_data)
-            self._last_write_duration = duration
+            await self._write_blocks(states_block, events_block, seq)
             self._connected = True
             self._last_error = None
+            if self._breaker.record_success():
+                _LOGGER.info(f"Database connection recovered, draining {self.queue_size} queued rows")
+                self._schedule_drain()
+            
+            # Database is reachable: drain anything spilled during an outage
+            self._schedule_replay()
 
-        except Exception as e:
-            _LOGGER.error(f"Error flushing batch: {e}", exc_info=True)
+        except Exception as e:  # noqa: BLE001 - _log_write_error logs the traceback (rate-limited)
+            self._breaker.record_failure()
+            self._log_write_error(e)
             self._connected = False
             self._last_error = str(e)
             
-            if self.buffer_on_failure:
-                _LOGGER.warning(f"Buffering {len(batch)} items due to failure. Current queue size: {len(self._queue)}")
-                # Prepend back to queue
-                # We want to keep [OldBatch] + [NewQueue], but capped at max_queue_size.
-                # Since we want to drop OLDEST items if full, we want the TAIL of this combined list.
-                # deque(..., maxlen=N) keeps the tail (newest items).
-                # So we reconstruct the deque with the combined list.
-                self._queue = deque(batch + list(self._queue), maxlen=self.max_queue_size)
+            if self.buffer_on_failure and self._spill:
+                _LOGGER.warning(f"Spilling {batch_len} items to disk due to failure")
+                await self._spill_blocks([("state", states_block), ("event", events_block)])
+            elif self.buffer_on_failure:
+                _LOGGER.warning(f"Buffering {batch_len} items due to failure. Current queue size: {self.queue_size}")
+                # Put the blocks back in front of anything enqueued meanwhile,
+                # then drop the oldest rows if we went over max_queue_size.
+                self._buffers["state"].prepend(states_block)
+                self._buffers["event"].prepend(events_block)
+                self._trim_queue(self.max_queue_size)
                 
-                # Calculate dropped
-                # current_len = len(self._queue)
-                # total_len = len(batch) + len(self._queue) - len(batch) # wait, this is just len(batch) + old_len
-                # Actually, we can't easily know how many were dropped by deque without checking lengths before/after
-                # But we know we added len(batch).
-                # If we were full, we dropped some.
-                
-                # Let's just log the current state
-                if len(self._queue) == self.max_queue_size:
-                     _LOGGER.warning(f"Buffer full! Queue size: {len(self._queue)}")
+                if self.queue_size == self.max_queue_size:
+                     _LOGGER.warning(f"Buffer full! Queue size: {self.queue_size}")
             else:
-                self._dropped_events += len(batch)
-                _LOGGER.warning(f"Dropped {len(batch)} items (buffering disabled)")
+                self._count_dropped(DROP_WRITE_FAILED, "state", len(states_block))
+                self._count_dropped(DROP_WRITE_FAILED, "event", len(events_block))
+                _LOGGER.warning(f"Dropped {batch_len} items (buffering disabled)")
+        finally:
+            # A failed batch still has to hand over its commit turn
+            await self._wait_commit_turn(seq)
+            async with self._commit_turn:
+                self._commit_seq = seq + 1
+                self._commit_turn.notify_all()
+            self._inflight_batches -= 1
+            self._inflight_rows -= batch_len
+            self._flush_slots.release()
+
+    def _log_write_error(self, error: Exception):
+        """Log a failed batch: a full traceback once per outage, then periodic summaries."""
+        breaker = self._breaker
+        if breaker.consecutive_failures == 1:
+            breaker.should_log()
+            _LOGGER.error(f"Error flushing batch: {error}", exc_info=error)
+        elif breaker.should_log():
+            _LOGGER.error(
+                f"Error flushing batch: {error} ({breaker.consecutive_failures} consecutive failures, "
+                f"{breaker.suppressed_errors} not logged, next retry in {breaker.retry_in():.0f}s)"
+            )
+            breaker.suppressed_errors = 0
+        else:
+            _LOGGER.debug(f"Error flushing batch: {error}")
+
+    def _drop_queue(self):
+        """Drop everything queued (circuit open and buffering disabled)."""
+        dropped = self.queue_size
+        for kind, buffer in self._buffers.items():
+            self._count_dropped(DROP_WRITE_FAILED, kind, len(buffer.take()))
+        _LOGGER.debug(f"Dropped {dropped} items (database unavailable, buffering disabled)")
+
+    async def _reset_pool(self):
+        """Discard pooled connections before probing a database that was down."""
+        try:
+            await self._engine.dispose()
+        except Exception as e:
+            _LOGGER.debug(f"Failed to dispose connection pool: {e}", exc_info=True)
+
+    def _schedule_drain(self):
+        """Flush the backlog back to back after a recovery instead of waiting for the timer."""
+        if not self._drain_task:
+            self._drain_task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        """Flush until the queue is empty or the breaker opens again."""
+        try:
+            while self.queue_size and self._breaker.is_closed:
+                await self._flush()
+        finally:
+            self._drain_task = None
+
+    @property
+    def circuit_state(self) -> str:
+        """Return the circuit breaker state (closed, open or half_open)."""
+        return self._breaker.state
+
+    async def _wait_commit_turn(self, seq: int | None):
+        """Wait until every batch cut before `seq` has committed (or failed)."""
+        if seq is None:
+            return
+        async with self._commit_turn:
+            await self._commit_turn.wait_for(lambda: self._commit_seq >= seq)
+
+    def _retune(self):
+        """Let the adaptive controller pick the batch size and flush interval."""
+        if not self._adaptive:
+            return
+        self._adaptive.update(self._enqueued_rows, self.queue_size)
+        self.batch_size = self._adaptive.batch_size
+        self.flush_interval = self._adaptive.flush_interval
+
+    @property
+    def ingest_lag(self) -> float | None:
+        """Return the ingest lag (event time to commit) of the last batch in seconds."""
+        return self._last_ingest_lag
+
+    @property
+    def inflight_batches(self) -> int:
+        """Return the number of batches currently being written."""
+        return self._inflight_batches
+
+    async def _write_blocks(self, states_block: ColumnBlock, events_block: ColumnBlock, seq: int | None = None):
+        """Write column blocks with the configured write method and update stats.
+        
+        With a batch sequence number, the transaction only commits once the
+        previous batches have committed, which keeps rows ordered per table.
+        """
+        start_time = time.time()
+        
+        tables = await self._prepare_tables(states_block, events_block)
+        counts = self._row_counts(states_block, events_block)
+        if self.write_method == WRITE_METHOD_COPY and self._copy_available:
+            method = await self._write_copy(tables, seq, counts)
+        else:
+            method = await self._write_insert(tables, seq, counts)
+        
+        duration = time.time() - start_time
+        rows = len(states_block) + len(events_block)
+        self._states_written += len(states_block)
+        self._events_written += len(events_block)
+        self._last_write_duration = duration
+        self._write_stats[method][0] += rows
+        self._write_stats[method][1] += duration
+        
+        # Ingest lag of live batches (replayed spill batches are old by definition)
+        if seq is not None:
+            self._last_ingest_lag = self._batch_lag(states_block, events_block)
+            if self._adaptive:
+                self._adaptive.record_commit(rows, duration, self._last_ingest_lag)
+
+    async def _prepare_tables(self, states_block: ColumnBlock, events_block: ColumnBlock) -> list[tuple[str, ColumnBlock]]:
+        """Return the blocks to write per table, converted to the configured schema."""
+        tables = []
+        if states_block and self._spans is not None:
+            is_span = self._spans.is_span
+            spans = [i for i, entity_id in enumerate(states_block.column("entity_id")) if is_span(entity_id)]
+            spans_block, states_block = self._split_block(states_block, spans, STATES_COLUMNS)
+            tables.append((self.table_name_spans, ColumnBlock(SPAN_COLUMNS, spans_block.data)))
+        if states_block and self.numeric_table:
+            numeric = [i for i, value in enumerate(states_block.column("value")) if value is not None]
+            numeric_block, states_block = self._split_block(states_block, numeric, NUMERIC_COLUMNS)
+            if numeric_block and self._metadata_ids is not None:
+                columns = dict(zip(numeric_block.columns, numeric_block.data))
+                columns["metadata_id"] = await self._dictionary_ids(
+                    ENTITY_IDS_TABLE, "metadata_id", "entity_id", columns.pop("entity_id"), self._metadata_ids
+                )
+                numeric_block = ColumnBlock(tuple(columns), list(columns.values()))
+            tables.append((self.table_name_numeric, numeric_block))
+        if states_block and (self._attributes is not None or self._metadata_ids is not None or self._state_enums is not None):
+            states_block = await self._prepare_states(states_block)
+        if events_block and self._event_type_ids is not None:
+            events_block = await self._prepare_events(events_block)
+        tables.append((self.table_name_states, states_block))
+        tables.append((self.table_name_events, events_block))
+        return tables
+
+    @staticmethod
+    def _split_block(block: ColumnBlock, selected: list[int], columns: tuple[str, ...]) -> tuple[ColumnBlock, ColumnBlock]:
+        """Split a block into the selected rows (only `columns`) and the other rows."""
+        if not selected:
+            return ColumnBlock(columns, [[] for _ in columns]), block
+        if len(selected) == len(block):
+            other = []
+        else:
+            selected_set = set(selected)
+            other = [i for i in range(len(block)) if i not in selected_set]
+        selected_block = ColumnBlock(columns, [[block.column(name)[i] for i in selected] for name in columns])
+        other_block = ColumnBlock(block.columns, [[column[i] for i in other] for column in block.data])
+        return selected_block, other_block
+
+    async def _prepare_states(self, states_block: ColumnBlock) -> ColumnBlock:
+        """Convert a states block to the compact schema (state_idx / attributes_id / metadata_id columns).
+        
+        New dictionary entries are inserted first, each in its own short
+        transaction: this keeps row locks on the dictionary tables out of the
+        ordered batch transactions (which could otherwise wait on each other),
+        and an entry left behind by a failed batch is simply reused later.
+        """
+        columns = dict(zip(states_block.columns, states_block.data))
+        if self._state_enums is not None:
+            columns["state_idx"], columns["state"] = await self._state_indices(columns["entity_id"], columns["state"])
+        if self._attributes is not None:
+            columns["attributes_id"] = await self._attributes_ids(columns.pop("attributes"))
+        if self._metadata_ids is not None:
+            columns["metadata_id"] = await self._dictionary_ids(
+                ENTITY_IDS_TABLE, "metadata_id", "entity_id", columns.pop("entity_id"), self._metadata_ids
+            )
+        return ColumnBlock(tuple(columns), list(columns.values()))
+
+    async def _prepare_events(self, events_block: ColumnBlock) -> ColumnBlock:
+        """Convert an events block to the compact events schema."""
+        columns = dict(zip(events_block.columns, events_block.data))
+        columns["event_type_id"] = await self._dictionary_ids(
+            EVENT_TYPES_TABLE, "event_type_id", "event_type", columns.pop("event_type"), self._event_type_ids
+        )
+        origins = columns.pop("origin")
+        columns["origin_idx"] = [ORIGIN_IDX.get(origin) for origin in origins]
+        columns["origin"] = [None if origin in ORIGIN_IDX else origin for origin in origins]
+        for name, encode in CONTEXT_COLUMNS.items():
+            columns[f"{name}_bin"], columns[name] = split_column(columns[name], encode)
+        return ColumnBlock(tuple(columns), list(columns.values()))
+
+    async def _state_indices(self, entity_ids: list[str], states: list[str | None]) -> tuple[list, list]:
+        """Return the state_idx of each state and the state text kept for the others."""
+        enums = self._state_enums
+        indices, leftovers, missing = enums.encode(entity_ids, states)
+        if not missing:
+            return indices, leftovers
+        async with self._state_enums_lock:
+            rows = enums.allocate(missing)
+            if rows:
+                async with self._engine.begin() as conn:
+                    # Indices taken meanwhile (another writer) are skipped, and reloaded below
+                    await conn.execute(
+                        text(f"INSERT INTO {STATE_ENUMS_TABLE} (domain, state, state_idx) VALUES (:domain, :state, :state_idx) ON CONFLICT DO NOTHING"),
+                        rows
+                    )
+                    result = await conn.execute(
+                        text(f"SELECT domain, state, state_idx FROM {STATE_ENUMS_TABLE} WHERE domain = ANY(:domains)"),
+                        {"domains": list({row["domain"] for row in rows})}
+                    )
+                    enums.load(result)
+        indices, leftovers, _missing = enums.encode(entity_ids, states)
+        return indices, leftovers
+
+    async def _attributes_ids(self, blobs: list[str | None]) -> list[int | None]:
+        """Return the shared attributes ids of encoded attributes, storing new documents."""
+        ids, new = self._attributes.resolve(blobs)
+        if new:
+            async with self._engine.begin() as conn:
+                await conn.execute(
+                    text(f"INSERT INTO {STATE_ATTRIBUTES_TABLE} (attributes_id, shared_attrs) VALUES (:attributes_id, :shared_attrs) ON CONFLICT (attributes_id) DO NOTHING"),
+                    [{"attributes_id": blob_id, "shared_attrs": blob} for blob_id, blob in new.items()]
+                )
+            self._attributes.add(new)
+        return ids
+
+    async def _dictionary_ids(self, table: str, id_column: str, key_column: str, keys: list[str], known: dict[str, int]) -> list[int]:
+        """Return the dictionary ids of keys (entity ids, event types), registering unknown keys."""
+        missing = list({key for key in keys if key not in known})
+        if missing:
+            async with self._engine.begin() as conn:
+                await conn.execute(
+                    text(f"INSERT INTO {table} ({key_column}) VALUES (:key) ON CONFLICT ({key_column}) DO NOTHING"),
+                    [{"key": key} for key in missing]
+                )
+                result = await conn.execute(
+                    text(f"SELECT {id_column}, {key_column} FROM {table} WHERE {key_column} = ANY(:keys)"),
+                    {"keys": missing}
+                )
+                known.update({key: key_id for key_id, key in result})
+        return [known[key] for key in keys]
+
+    @staticmethod
+    def _batch_lag(states_block: ColumnBlock, events_block: ColumnBlock) -> float | None:
+        """Return the age in seconds of the oldest row of a batch, now that it is committed."""
+        oldest = [
+            block.column("time")[0]
+            for block in (states_block, events_block)
+            if block and block.column("time")[0] is not None
+        ]
+        if not oldest:
+            return None
+        return (dt_util.utcnow() - min(oldest)).total_seconds()
+
+    def _row_counts(self, states_block: ColumnBlock, events_block: ColumnBlock) -> list[dict]:
+        """Return the counter increments of a batch."""
+        if not self._row_counts_ready:
+            return []
+        counts = []
+        if states_block:
+            counts.append({"table_name": self.table_name_states, "row_count": len(states_block)})
+        if events_block:
+            counts.append({"table_name": self.table_name_events, "row_count": len(events_block)})
+        return counts
+
+    async def _write_insert(self, tables: list[tuple[str, ColumnBlock]], seq: int | None = None, counts: list[dict] | None = None) -> str:
+        """Write a batch using parameterised INSERT statements (executemany)."""
+        async with self._engine.begin() as conn:
+            for table, block in tables:
+                if block:
+                    await conn.execute(self._insert_statement(table, block.columns), block.records())
+            await self._wait_commit_turn(seq)
+            # After the commit turn: concurrent batches would otherwise lock the counter rows out of order
+            if counts:
+                await conn.execute(text(ROW_COUNTS_UPSERT.format(":table_name", ":row_count")), counts)
+        return WRITE_METHOD_INSERT
+
+    @staticmethod
+    def _insert_statement(table: str, columns: tuple[str, ...]):
+        """Build the INSERT statement for a block's columns."""
+        return text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})")
+
+    async def _write_copy(self, tables: list[tuple[str, ColumnBlock]], seq: int | None = None, counts: list[dict] | None = None) -> str:
+        """Write a batch with PostgreSQL COPY ... FROM STDIN.
+        
+        Uses the asyncpg connection underneath the SQLAlchemy engine, which streams
+        all rows in a single protocol round trip instead of one INSERT per row.
+        All tables are written in one asyncpg transaction so a batch is still atomic.
+        Falls back to the INSERT path if the driver does not support COPY.
+        """
+        async with self._engine.connect() as conn:
+            raw_conn = await conn.get_raw_connection()
+            driver_conn = getattr(raw_conn, "driver_connection", None)
+            if driver_conn is None or not hasattr(driver_conn, "copy_records_to_table"):
+                _LOGGER.warning("COPY is not supported by the database driver, falling back to INSERT")
+                self._copy_available = False
+                return await self._write_insert(tables, seq, counts)
+
+            async with driver_conn.transaction():
+                for table, block in tables:
+                    if block:
+                        await driver_conn.copy_records_to_table(table, records=block.rows(), columns=block.columns)
+                await self._wait_commit_turn(seq)
+                if counts:
+                    await driver_conn.executemany(ROW_COUNTS_UPSERT.format("$1", "$2"), [(c["table_name"], c["row_count"]) for c in counts])
+        return WRITE_METHOD_COPY
+
+    def rows_per_second(self, method: str) -> float | None:
+        """Return the average write throughput (rows/s) of a write method."""
+        rows, seconds = self._write_stats[method]
+        if not rows or not seconds:
+            return None
+        return rows / seconds
 
     async def query(self, sql: str) -> list[dict]:
         """Execute a read-only SQL query."""
@@ -0,0 +1,54 @@
+"""Test the Scribe adaptive batching controller."""
+from custom_components.scribe.adaptive import AdaptiveController
+
+
+def _controller(**kwargs):
+    params = {
+        "min_batch_size": 100,
+        "max_batch_size": 5000,
+        "min_flush_interval": 1,
+        "max_flush_interval": 30,
+        "target_lag": 10,
+        "batch_size": 500,
+        "flush_interval": 5,
+    }
+    params.update(kwargs)
+    return AdaptiveController(**params)
+
+def test_adaptive_waits_for_samples():
+    """Test nothing is retuned before the first commit and rate sample."""
+    controller = _controller()
+    controller.update(0, 0, now=0)
+    controller.update(100, 0, now=1)
+    assert (controller.batch_size, controller.flush_interval) == (500, 5)
+
+def test_adaptive_burst_flushes_faster_with_bigger_batches():
+    """Test a lag over target halves the interval and grows the batch."""
+    controller = _controller()
+    controller.update(0, 0, now=0)
+    controller.record_commit(500, 0.2, lag=25)
+    controller.update(3000, 2500, now=1)
+
+    assert controller.flush_interval == 2.5
+    # 3000 rows/s over 2.5 s, capped at max_batch_size
+    assert controller.batch_size == 5000
+
+def test_adaptive_idle_relaxes_to_bounds():
+    """Test a low lag at idle stretches the interval up to its maximum."""
+    controller = _controller()
+    controller.update(0, 0, now=0)
+    for tick in range(1, 30):
+        controller.record_commit(1, 0.01, lag=1)
+        controller.update(tick, 0, now=tick * 5)
+
+    assert controller.flush_interval == 30
+    assert controller.batch_size == 100
+
+def test_adaptive_slow_commits_shrink_batches():
+    """Test a commit latency over half the lag budget halves the batch size."""
+    controller = _controller(batch_size=4000)
+    controller.update(0, 0, now=0)
+    controller.record_commit(4000, 8, lag=9)
+    controller.update(4000, 4000, now=1)
+
+    assert controller.batch_size == 2000
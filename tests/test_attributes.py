@@ -0,0 +1,36 @@
+"""Test Scribe shared attributes ids and cache."""
+from custom_components.scribe.attributes import AttributesCache, attributes_id
+from custom_components.scribe.encoding import encode_json
+
+
+def test_attributes_id_is_stable_signed_64bit():
+    """Test ids depend only on the document and fit a BIGINT."""
+    assert attributes_id('{"a": 1}') == attributes_id('{"a": 1}')
+    assert attributes_id('{"a": 1}') != attributes_id('{"a": 2}')
+    ids = [attributes_id(f'{{"n": {i}}}') for i in range(1000)]
+    assert all(-2**63 <= i < 2**63 for i in ids)
+    assert len(set(ids)) == 1000
+
+def test_attributes_id_ignores_key_order():
+    """Test the same attributes in a different key order map to one id."""
+    first = {"unit_of_measurement": "W", "device_class": "power", "nested": {"b": 1, "a": 2}}
+    second = {"nested": {"a": 2, "b": 1}, "device_class": "power", "unit_of_measurement": "W"}
+    assert encode_json(first) != encode_json(second)
+    assert attributes_id(encode_json(first, sort_keys=True)) == attributes_id(encode_json(second, sort_keys=True))
+
+def test_attributes_cache_resolve_and_evict():
+    """Test unknown documents are reported once stored documents are cached (LRU)."""
+    cache = AttributesCache(size=2)
+    ids, new = cache.resolve(["a", None, "a", "b"])
+    assert ids == [attributes_id("a"), None, attributes_id("a"), attributes_id("b")]
+    assert new == {attributes_id("a"): "a", attributes_id("b"): "b"}
+
+    # Nothing is cached until the documents are stored
+    assert len(cache) == 0
+    cache.add(new)
+    assert cache.resolve(["a", "b"])[1] == {}
+
+    # "a" was used last, so adding "c" evicts "b"
+    cache.resolve(["a"])
+    cache.add({attributes_id("c"): "c"})
+    assert cache.resolve(["a", "b", "c"])[1] == {attributes_id("b"): "b"}
@@ -0,0 +1,60 @@
+"""Test the Scribe writer circuit breaker."""
+from unittest.mock import patch
+
+from custom_components.scribe.breaker import (
+    LOG_INTERVAL,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+)
+
+
+def test_breaker_opens_after_threshold():
+    """Test the breaker opens after consecutive failures and blocks writes."""
+    breaker = CircuitBreaker(failure_threshold=3, base_backoff=10)
+    for _ in range(2):
+        breaker.record_failure(now=0)
+        assert breaker.allow_request(now=0)
+
+    breaker.record_failure(now=0)
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request(now=1)
+    assert 5 <= breaker.retry_in(now=0) <= 10
+
+def test_breaker_half_open_single_probe():
+    """Test only one probe goes through once the backoff has elapsed."""
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=10)
+    breaker.record_failure(now=0)
+
+    assert breaker.allow_request(now=11)
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request(now=11)
+
+    assert breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request(now=11)
+    assert not breaker.record_success()
+
+def test_breaker_backoff_grows_and_caps():
+    """Test the backoff doubles on every failed probe up to the maximum."""
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=1, max_backoff=8)
+    delays = []
+    now = 0
+    with patch("custom_components.scribe.breaker.random.uniform", return_value=1.0):
+        for _ in range(6):
+            breaker.record_failure(now=now)
+            delays.append(breaker.retry_in(now=now))
+            now = breaker.retry_at
+            assert breaker.allow_request(now=now)
+
+    assert delays == [1, 2, 4, 8, 8, 8]
+
+def test_breaker_rate_limits_logs():
+    """Test repeated errors are only logged once per interval."""
+    breaker = CircuitBreaker()
+    assert breaker.should_log(now=0)
+    assert not breaker.should_log(now=1)
+    assert not breaker.should_log(now=2)
+    assert breaker.suppressed_errors == 2
+    assert breaker.should_log(now=LOG_INTERVAL)
@@ -0,0 +1,29 @@
+"""Test the compact events schema encodings."""
+from homeassistant.core import EventOrigin
+from homeassistant.util.ulid import ulid_now, ulid_to_bytes
+
+from custom_components.scribe.compact import (
+    ORIGINS,
+    split_column,
+    ulid_to_bin,
+    uuid_hex_to_bin,
+)
+
+
+def test_origins_match_event_origin():
+    """Test every Home Assistant event origin has an index."""
+    assert set(ORIGINS) == {str(origin) for origin in EventOrigin}
+
+def test_ulid_and_uuid_encoding():
+    """Test only values that round-trip are encoded."""
+    ulid = ulid_now()
+    assert ulid_to_bin(ulid) == ulid_to_bytes(ulid)
+    assert ulid_to_bin(ulid.lower()) is None
+    assert ulid_to_bin("Z" * 26) is None
+    assert ulid_to_bin("short") is None
+
+    assert uuid_hex_to_bin("0123456789abcdef0123456789abcdef") == bytes(range(0x01, 0x100, 0x22)) * 2
+    assert uuid_hex_to_bin("0123456789ABCDEF0123456789ABCDEF") is None
+    assert uuid_hex_to_bin("x" * 32) is None
+
+    assert split_column([ulid, None, "custom"], ulid_to_bin) == ([ulid_to_bytes(ulid), None, None], [None, None, "custom"])
@@ -0,0 +1,41 @@
+"""Test Scribe deadband compression of numeric states."""
+from datetime import UTC, datetime, timedelta
+
+from custom_components.scribe.deadband import DeadbandFilter, find_rule
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+def _run(deadband, values, step=1):
+    """Offer values one `step` seconds apart; return the indices written."""
+    written = []
+    for i, value in enumerate(values):
+        written.extend(deadband.offer(START + timedelta(seconds=i * step), value, i))
+    return written
+
+def test_deadband_rule_precedence():
+    """Test entity rules win over device class rules, which win over domain rules."""
+    rules = {"sensor": {"mode": "absolute"}, "device_class:power": {"mode": "percent"}, "sensor.meter": {"mode": "swinging_door"}}
+    assert find_rule(rules, "sensor.meter", "power")["mode"] == "swinging_door"
+    assert find_rule(rules, "sensor.other", "power")["mode"] == "percent"
+    assert find_rule(rules, "sensor.other", None)["mode"] == "absolute"
+    assert find_rule(rules, "light.a", None) is None
+
+def test_deadband_absolute_and_percent():
+    """Test values inside the band are dropped and max_gap forces a point."""
+    assert _run(DeadbandFilter("absolute", 0.5), [10, 10.2, 10.4, 10.6, 10.7, 9.9]) == [0, 3, 5]
+    assert _run(DeadbandFilter("percent", 10), [100, 105, 111, 115, 130]) == [0, 2, 4]
+    assert _run(DeadbandFilter("absolute", 1, max_gap=3), [5, 5, 5, 5, 5, 5, 5]) == [0, 3, 6]
+
+def test_deadband_swinging_door():
+    """Test a ramp and a flat run are written as their end points."""
+    deadband = DeadbandFilter("swinging_door", 0.1, max_gap=3600)
+    # Ramp up (0..5), then flat (5): the corner at index 5 is written when the slope changes
+    values = [0, 1, 2, 3, 4, 5, 5, 5, 5, 5]
+    assert _run(deadband, values) == [0, 5]
+    # The end of the flat run is held back until it is popped
+    assert deadband.pop_held() == 9
+    assert deadband.pop_held() is None
+
+    # Noise inside the corridor is dropped, a step writes both corners
+    deadband = DeadbandFilter("swinging_door", 0.5, max_gap=3600)
+    assert _run(deadband, [10, 10.2, 9.9, 10.1, 20, 20.1]) == [0, 3, 4]
@@ -0,0 +1,79 @@
+"""Test Scribe JSON encoding of attributes and event data."""
+import json
+import os
+import time
+from datetime import UTC, datetime
+from enum import Enum
+
+import pytest
+
+from custom_components.scribe.encoding import encode_json
+
+# Timing comparisons are flaky on loaded CI runners: opt in with SCRIBE_BENCHMARK=1
+BENCHMARK = os.getenv("SCRIBE_BENCHMARK")
+
+ATTRIBUTES = {
+    "unit_of_measurement": "W",
+    "device_class": "power",
+    "state_class": "measurement",
+    "friendly_name": "Living Room Power Meter",
+    "icon": "mdi:flash",
+    "voltage": 231.4,
+    "current": 1.27,
+    "last_reset": None,
+    "options": ["low", "medium", "high"],
+    "supported_features": 4,
+}
+
+
+class _Color(Enum):
+    RED = "red"
+
+
+class _Opaque:
+    def __str__(self):
+        return "opaque"
+
+
+def test_encode_json_matches_stdlib():
+    """Test the fast encoder produces the same document as json.dumps."""
+    assert json.loads(encode_json(ATTRIBUTES)) == ATTRIBUTES
+    assert isinstance(encode_json(ATTRIBUTES), str)
+
+
+def test_encode_json_exotic_types():
+    """Test types orjson does not handle natively fall back instead of failing."""
+    encoded = json.loads(encode_json({
+        "when": datetime(2024, 1, 1, tzinfo=UTC),
+        "modes": {"heat"},
+        "color": _Color.RED,
+        "object": _Opaque(),
+        1: "non string key",
+    }))
+    assert encoded["when"] == "2024-01-01T00:00:00+00:00"
+    assert encoded["modes"] == ["heat"]
+    assert encoded["color"] == "red"
+    assert encoded["object"] == "opaque"
+    assert encoded["1"] == "non string key"
+
+    # Integers wider than 64 bits are rejected by orjson
+    assert json.loads(encode_json({"big": 2**70})) == {"big": 2**70}
+
+
+def _per_event_cost(encode, payload, rounds=5, count=2000):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(count):
+            encode(payload)
+        elapsed = (time.perf_counter() - start) / count
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@pytest.mark.skipif(not BENCHMARK, reason="Benchmarks not enabled (SCRIBE_BENCHMARK)")
+def test_encode_json_benchmark():
+    """Micro-benchmark: per-event encode cost of the stdlib vs the fast encoder."""
+    stdlib = _per_event_cost(lambda data: json.dumps(data, default=str), ATTRIBUTES)
+    fast = _per_event_cost(encode_json, ATTRIBUTES)
+    assert fast < stdlib, f"json.dumps: {stdlib * 1e6:.2f} us/event, encode_json: {fast * 1e6:.2f} us/event"
@@ -0,0 +1,34 @@
+"""Test Scribe typed state encoding."""
+from custom_components.scribe.enums import MAX_STATES_PER_DOMAIN, StateEnums
+
+
+def test_state_enums_builtin_and_special_states():
+    """Test binary domains use fixed indices and other domains keep their text."""
+    enums = StateEnums(domains=[])
+    indices, leftovers, missing = enums.encode(
+        ["light.a", "binary_sensor.door", "person.me", "light.a", "sensor.mode", "light.a"],
+        ["on", "off", "home", "unavailable", "eco", "strobe"],
+    )
+    assert indices == [1, 0, 1, -2, None, None]
+    assert leftovers == [None, None, None, None, "eco", "strobe"]
+    assert missing == set()
+
+def test_state_enums_dynamic_domains():
+    """Test dynamic domains report new states and allocate indices after the existing ones."""
+    enums = StateEnums(domains=["climate"])
+    indices, leftovers, missing = enums.encode(["climate.a", "climate.a", "climate.b"], ["heat", "off", "heat"])
+    assert indices == [None, None, None]
+    assert leftovers == ["heat", "off", "heat"]
+    assert missing == {("climate", "heat"), ("climate", "off")}
+
+    rows = enums.allocate(missing)
+    assert rows == [
+        {"domain": "climate", "state": "heat", "state_idx": 1},
+        {"domain": "climate", "state": "off", "state_idx": 2},
+    ]
+    enums.load([(row["domain"], row["state"], row["state_idx"]) for row in rows])
+    assert enums.encode(["climate.a"], ["off"]) == ([2], [None], set())
+
+    # A full domain keeps its text and allocates nothing more
+    enums.load([("climate", f"mode{i}", i) for i in range(3, MAX_STATES_PER_DOMAIN)])
+    assert enums.allocate({("climate", "boost")}) == []
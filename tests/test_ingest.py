@@ -0,0 +1,114 @@
+"""Test Scribe per-entity ingest plans."""
+from custom_components.scribe.ingest import IngestPlanCache
+
+
+def test_ingest_plan_cache_filter():
+    """Test the entity filter runs once per entity until the plan is invalidated."""
+    calls = []
+    def entity_filter(entity_id):
+        calls.append(entity_id)
+        return not entity_id.startswith("sensor.")
+
+    plans = IngestPlanCache(entity_filter, set())
+    assert plans.get("light.a").include
+    assert not plans.get("sensor.b").include
+    assert plans.get("light.a").include
+    assert calls == ["light.a", "sensor.b"]
+
+    plans.invalidate("light.a", None)
+    plans.get("light.a")
+    assert calls == ["light.a", "sensor.b", "light.a"]
+    plans.invalidate()
+    assert len(plans) == 0
+
+def test_ingest_plan_states_and_attributes():
+    """Test state parsing matches float() and excluded attributes are dropped."""
+    plan = IngestPlanCache(lambda entity_id: True, {"entity_picture"}).get("sensor.a")
+    for state in ("on", "42", "not_home", "nan", "inf", "-1.5", " 7", "unavailable", "", "Infinity", "1_000"):
+        try:
+            expected = (None, float(state))
+        except ValueError:
+            expected = (state, None)
+        result = plan.parse_state(state)
+        assert result == expected or (state == "nan" and result[1] != result[1])
+
+    attributes = {"unit_of_measurement": "W"}
+    assert plan.filter_attributes(attributes) is attributes
+    assert plan.filter_attributes({"entity_picture": "/x.png", "icon": "mdi:x"}) == {"icon": "mdi:x"}
+
+def test_ingest_plan_deadband():
+    """Test deadband rules are resolved per entity and held points are written before text states."""
+    from datetime import timedelta
+
+    from homeassistant.util import dt as dt_util
+
+    rules = {"device_class:power": {"mode": "swinging_door", "threshold": 1.0, "max_gap": 3600}}
+    plans = IngestPlanCache(lambda entity_id: True, set(), rules)
+    assert plans.get("sensor.temp", {"device_class": "temperature"}).deadband is None
+    plan = plans.get("sensor.meter", {"device_class": "power"})
+
+    start = dt_util.utcnow()
+    rows = [{"time": start + timedelta(seconds=i), "value": 100.0, "state": None} for i in range(5)]
+    written = [row for row in rows for row in plans.apply_deadband(plan, row)]
+    assert written == [rows[0]]
+    assert plans.deadband_ratio == 0.8
+
+    unavailable = {"time": start + timedelta(seconds=5), "value": None, "state": "unavailable"}
+    assert plans.apply_deadband(plan, unavailable) == (rows[4], unavailable)
+    assert plans.pop_held() == []
+
+def test_ingest_plan_duplicates():
+    """Test identical rows are skipped until the heartbeat and any change is written."""
+    from datetime import timedelta
+
+    from homeassistant.util import dt as dt_util
+
+    plans = IngestPlanCache(lambda entity_id: True, set(), skip_duplicates=True, duplicate_heartbeat=60)
+    plan = plans.get("binary_sensor.door")
+    start = dt_util.utcnow()
+    def row(seconds, state="off", attributes="{}"):
+        return {"time": start + timedelta(seconds=seconds), "state": state, "value": None, "attributes": attributes}
+
+    def written(candidate):
+        if plans.is_duplicate(plan, candidate):
+            return False
+        plans.record_written(plan, candidate)
+        return True
+
+    assert written(row(0))
+    assert not written(row(10))
+    assert written(row(20, attributes='{"icon": "mdi:door"}'))
+    assert written(row(30))
+    assert not written(row(89))
+    # Heartbeat: a row 60 seconds after the last written one
+    assert written(row(90))
+    assert plans.duplicates_skipped == 2
+    # A row that was not written is not a reference
+    assert not plans.is_duplicate(plan, row(95, state="on"))
+    assert not plans.is_duplicate(plan, row(96, state="on"))
+
+def test_ingest_plan_restart_states():
+    """Test the first row after a restart is skipped only if it matches the stored state."""
+    plans = IngestPlanCache(lambda entity_id: True, set(), suppress_restart_states=True)
+    plans.get("light.seen")
+    plans.load_restart_states([
+        ("light.a", "on", None, {"brightness": 255}),
+        ("light.b", "on", None, {"brightness": 255}),
+        ("sensor.power", None, 12.5, None),
+        ("light.seen", "on", None, {}),
+    ])
+    assert plans.restarting
+
+    def row(entity_id, state, value, attributes):
+        return {"entity_id": entity_id, "state": state, "value": value, "attributes": attributes}
+
+    assert plans.is_restart_duplicate(row("light.a", "on", None, '{"brightness":255}'))
+    # Only the first row of an entity is compared
+    assert not plans.is_restart_duplicate(row("light.a", "on", None, '{"brightness":255}'))
+    assert not plans.is_restart_duplicate(row("light.b", "on", None, '{"brightness":128}'))
+    # Attributes of numeric table rows are not stored
+    assert plans.is_restart_duplicate(row("sensor.power", None, 12.5, '{"unit_of_measurement":"W"}'))
+    # Entities that already had a row when the states were loaded
+    assert not plans.is_restart_duplicate(row("light.seen", "on", None, "{}"))
+    assert plans.restart_suppressed == 2
+    assert not plans.restarting
@@ -15,6 +15,7 @@ def mock_writer():
     writer.write_areas = AsyncMock()
     writer.write_devices = AsyncMock()
     writer.write_integrations = AsyncMock()
+    writer.mark_registry_removed = AsyncMock()
     return writer
 
 @pytest.fixture
@@ -230,3 +231,14 @@ async def test_realtime_metadata_sync(hass: HomeAssistant, mock_writer, mock_reg
         args = mock_writer.write_users.call_args[0][0]
         assert args[0]["user_id"] == "user_new"
         assert args[0]["name"] == "New User"
+
+        # Test Removals
+        hass.bus.async_fire("entity_registry_updated", {"action": "remove", "entity_id": "light.new"})
+        hass.bus.async_fire("device_registry_updated", {"action": "remove", "device_id": "device_new"})
+        hass.bus.async_fire("user_removed", {"user_id": "user_new"})
+        await hass.async_block_till_done()
+
+        removed = [call.args for call in mock_writer.mark_registry_removed.call_args_list]
+        assert ("entities", ["light.new"]) in removed
+        assert ("devices", ["device_new"]) in removed
+        assert ("users", ["user_new"]) in removed
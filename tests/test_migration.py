@@ -0,0 +1,130 @@
+"""Test the chunk-by-chunk data migrations."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.scribe.migration import (
+    COMPLETED,
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    ChunkMigrator,
+    metadata_ids_migration,
+    state_enums_migration,
+)
+
+
+def _fake_db(mock_db_connection, migrated=(), chunks=(), compressed=(), fail_on=None):
+    """Answer the migrator's queries; returns the list of executed (sql, params)."""
+    executed = []
+
+    async def execute_side_effect(statement, params=None, *args, **kwargs):
+        sql = str(statement)
+        executed.append((sql, params))
+        if fail_on and fail_on in sql:
+            raise ConnectionError
+        result = MagicMock()
+        if "SELECT chunk FROM scribe_migrations" in sql:
+            result.__iter__.return_value = iter([(chunk,) for chunk in migrated])
+        elif "timescaledb_information.chunks" in sql:
+            result.__iter__.return_value = iter([(chunk,) for chunk in chunks])
+        elif "decompress_chunk" in sql:
+            result.scalar.return_value = params["chunk"] if params["chunk"] in compressed else None
+        return result
+
+    mock_db_connection.execute.side_effect = execute_side_effect
+    return executed
+
+
+@pytest.mark.asyncio
+async def test_migration_chunks(mock_engine, mock_db_connection):
+    """Test chunks are migrated one by one, compressed ones are recompressed, done ones skipped."""
+    chunks = [
+        "_timescaledb_internal._hyper_1_1_chunk",
+        "_timescaledb_internal._hyper_1_2_chunk",
+        "_timescaledb_internal._hyper_1_3_chunk",
+    ]
+    executed = _fake_db(mock_db_connection, migrated=[chunks[0]], chunks=chunks, compressed=[chunks[1]])
+    migrator = ChunkMigrator(mock_engine, [metadata_ids_migration(["states"], "entity_ids")], pause=0)
+    assert migrator.progress is None
+
+    await migrator.run()
+
+    sqls = [sql for sql, _ in executed]
+    assert any("CREATE TABLE IF NOT EXISTS scribe_migrations" in sql for sql in sqls)
+    assert not any("_hyper_1_1_chunk" in sql for sql in sqls)
+    updates = [sql for sql in sqls if sql.strip().startswith("UPDATE")]
+    assert len(updates) == 2
+    assert "UPDATE _timescaledb_internal._hyper_1_2_chunk s SET metadata_id" in updates[0]
+
+    # Every chunk to migrate is decompressed if needed, only the compressed one is recompressed
+    decompressed = [params["chunk"] for sql, params in executed if "decompress_chunk" in sql]
+    compressed = [params["chunk"] for sql, params in executed if "SELECT compress_chunk" in sql]
+    assert decompressed == [chunks[1], chunks[2]]
+    assert compressed == [chunks[1]]
+
+    # Every chunk is checkpointed, then the migration is marked completed
+    checkpoints = [params["chunk"] for sql, params in executed if "INSERT INTO scribe_migrations" in sql]
+    assert checkpoints == [chunks[1], chunks[2], COMPLETED]
+    assert migrator.status["metadata_ids"] == {"state": STATUS_COMPLETED, "done": 3, "total": 3}
+    assert migrator.progress == 100.0
+
+
+@pytest.mark.asyncio
+async def test_migration_completed_is_skipped(mock_engine, mock_db_connection):
+    """Test a completed migration does not list or touch chunks."""
+    executed = _fake_db(mock_db_connection, migrated=[COMPLETED])
+    migrator = ChunkMigrator(mock_engine, [state_enums_migration("states", "state_enums", "entity_ids")], pause=0)
+
+    await migrator.run()
+
+    assert not any("timescaledb_information.chunks" in sql for sql, _ in executed)
+    assert migrator.status["state_enums"]["state"] == STATUS_COMPLETED
+    assert migrator.progress == 100.0
+
+
+@pytest.mark.asyncio
+async def test_migration_failure_stops(mock_engine, mock_db_connection):
+    """Test a failed chunk stops the migrations without marking them completed."""
+    chunks = ["_timescaledb_internal._hyper_1_1_chunk"]
+    executed = _fake_db(mock_db_connection, chunks=chunks, fail_on="UPDATE")
+    migrator = ChunkMigrator(
+        mock_engine,
+        [
+            state_enums_migration("states", "state_enums", "entity_ids"),
+            metadata_ids_migration(["states"], "entity_ids"),
+        ],
+        pause=0,
+    )
+
+    await migrator.run()
+
+    assert migrator.status["state_enums"]["state"] == STATUS_FAILED
+    assert migrator.status["metadata_ids"]["done"] == 0
+    assert not any("INSERT INTO scribe_migrations" in sql for sql, _ in executed)
+    assert not any("INSERT INTO entity_ids" in sql for sql, _ in executed)
+
+
+@pytest.mark.asyncio
+async def test_migration_waits_while_busy(mock_engine, mock_db_connection):
+    """Test a chunk is not migrated while the writer is busy."""
+    chunks = ["_timescaledb_internal._hyper_1_1_chunk"]
+    executed = _fake_db(mock_db_connection, chunks=chunks)
+    busy = iter([True, True, False])
+    migrator = ChunkMigrator(mock_engine, [metadata_ids_migration(["states"], "entity_ids")], lambda: next(busy), pause=0)
+
+    await migrator.run()
+
+    assert migrator.status["metadata_ids"]["done"] == 1
+    assert any(sql.strip().startswith("UPDATE") for sql, _ in executed)
+
+
+@pytest.mark.asyncio
+async def test_migration_bootstrap_failure(mock_engine, mock_db_connection):
+    """Test a failure creating the checkpoint table marks the migrations failed."""
+    executed = _fake_db(mock_db_connection, fail_on="CREATE TABLE IF NOT EXISTS scribe_migrations")
+    migrator = ChunkMigrator(mock_engine, [metadata_ids_migration(["states"], "entity_ids")], pause=0)
+
+    await migrator.run()
+
+    assert migrator.status["metadata_ids"]["state"] == STATUS_FAILED
+    assert len(executed) == 1
@@ -0,0 +1,51 @@
+"""Test the Scribe queue overflow policy."""
+from custom_components.scribe.buffer import ColumnBuffer
+from custom_components.scribe.overflow import (
+    OVERFLOW_PRIORITY,
+    OVERFLOW_SAMPLE,
+    OverflowPolicy,
+)
+from custom_components.scribe.writer import EVENTS_COLUMNS, STATES_COLUMNS
+
+
+def test_overflow_priority_lookup():
+    """Test priorities resolve by entity, then domain, then row type."""
+    policy = OverflowPolicy(OVERFLOW_PRIORITY, priorities={"sensor": 3, "sensor.noisy": 0, "call_service": 2})
+
+    assert policy.priority("state", "sensor.power") == 3
+    assert policy.priority("state", "sensor.noisy") == 0
+    assert policy.priority("state", "light.kitchen") == 1
+    assert policy.priority("event", "call_service") == 2
+    assert policy.priority("event", "zha_event") == 0
+
+def test_overflow_select_lowest_priority_first():
+    """Test eviction picks the lowest priority rows, oldest first."""
+    policy = OverflowPolicy(OVERFLOW_PRIORITY, priorities={"sensor.noisy": 0})
+    buffers = {"state": ColumnBuffer(STATES_COLUMNS), "event": ColumnBuffer(EVENTS_COLUMNS)}
+    buffers["state"].append_row({"entity_id": "sensor.a"})
+    buffers["state"].append_row({"entity_id": "sensor.noisy"})
+    buffers["event"].append_row({"event_type": "e1"})
+    buffers["state"].append_row({"entity_id": "sensor.noisy"})
+
+    selected = policy.select(buffers, 2)
+    assert selected == {"state": [1], "event": [0]}
+
+    block = buffers["state"].extract(selected["state"])
+    assert block.column("entity_id") == ["sensor.noisy"]
+    assert buffers["state"].column("entity_id") == ["sensor.a", "sensor.noisy"]
+
+def test_overflow_sampling():
+    """Test rows below the top priority are admitted one in N."""
+    policy = OverflowPolicy(OVERFLOW_SAMPLE, sample_rate=0.25)
+
+    admitted = [policy.admit("event", "zha_event") for _ in range(8)]
+    assert admitted.count(True) == 2
+    assert all(policy.admit("state", "sensor.a") for _ in range(8))
+
+def test_overflow_quota():
+    """Test per-class quotas."""
+    policy = OverflowPolicy(quotas={"state": None, "event": 2})
+
+    assert not policy.over_quota("state", 1000)
+    assert not policy.over_quota("event", 1)
+    assert policy.over_quota("event", 2)
@@ -0,0 +1,38 @@
+"""Test the diff-based registry sync."""
+from custom_components.scribe.registry import REGISTRY_TABLES
+
+AREAS = REGISTRY_TABLES["areas"]
+
+
+def test_registry_row_hash():
+    """Test the hash covers the synced columns only."""
+    row = {"area_id": "kitchen", "name": "Kitchen", "picture": None}
+    assert AREAS.row_hash(row) == AREAS.row_hash({**row, "extra": 1})
+    assert AREAS.row_hash(row) != AREAS.row_hash({**row, "name": "Cuisine"})
+    assert -2**63 <= AREAS.row_hash(row) < 2**63
+
+
+def test_registry_diff():
+    """Test only new and changed rows are returned, and removed keys on a full sync."""
+    kitchen = {"area_id": "kitchen", "name": "Kitchen", "picture": None}
+    garage = {"area_id": "garage", "name": "Garage", "picture": None}
+    known = {"kitchen": AREAS.row_hash(kitchen), "garage": None, "attic": 1}
+
+    changed, removed = AREAS.diff([kitchen, garage], known, full=False)
+    # garage has no hash yet (written before the sync columns existed)
+    assert changed == [{**garage, "row_hash": AREAS.row_hash(garage)}]
+    assert removed == []
+
+    changed, removed = AREAS.diff([kitchen], known, full=True)
+    assert changed == []
+    assert removed == ["attic", "garage"]
+
+
+def test_registry_merge_sql():
+    """Test the upsert from parameters and from a staging table."""
+    sql = AREAS.merge_sql()
+    assert "INSERT INTO areas (area_id, name, picture, row_hash) VALUES (:area_id, :name, :picture, :row_hash)" in sql
+    assert "ON CONFLICT (area_id) DO UPDATE SET name = EXCLUDED.name, picture = EXCLUDED.picture, row_hash = EXCLUDED.row_hash, removed_at = NULL" in sql
+
+    sql = AREAS.merge_sql("scribe_sync_areas")
+    assert "SELECT area_id, name, picture, row_hash FROM scribe_sync_areas" in sql
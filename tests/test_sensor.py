@@ -27,7 +27,7 @@ async def test_writer_sensors():
     writer.running = True
     writer._states_written = 10
     writer._events_written = 20
-    writer._queue = [1, 2, 3]
+    writer.queue_size = 3
     writer._last_write_duration = 0.5
     
     entry = MagicMock()
@@ -145,5 +145,5 @@ async def test_async_setup_entry_statistics(hass):
     async_add_entities.assert_called_once()
     entities = async_add_entities.call_args[0][0]
     
-    # 4 IO sensors + 6 Chunk sensors + 6 Size sensors + 2 Ratio sensors = 18
-    assert len(entities) == 18
+    # 12 IO sensors (incl. spill and adaptive) + migration progress + 6 Chunk sensors + 6 Size sensors + 2 Ratio sensors = 27
+    assert len(entities) == 27
@@ -0,0 +1,23 @@
+"""Test Scribe span tracking."""
+from custom_components.scribe.spans import SpanTracker
+
+
+def test_span_tracker_domains():
+    """Test only entities of the span domains are stored as spans."""
+    spans = SpanTracker(domains=["binary_sensor", "light"])
+    assert spans.is_span("binary_sensor.door")
+    assert spans.is_span("light.kitchen")
+    assert not spans.is_span("sensor.power")
+
+def test_span_tracker_changes():
+    """Test repeated states are skipped and open spans survive a restart."""
+    spans = SpanTracker()
+    spans.load([("light.kitchen", "on", None)])
+    assert len(spans) == 1
+
+    assert not spans.changed("light.kitchen", "on", None)
+    assert spans.changed("light.kitchen", "off", None)
+    assert not spans.changed("light.kitchen", "off", None)
+    assert spans.changed("light.kitchen", "on", None)
+    assert spans.changed("binary_sensor.door", "on", None)
+    assert spans.skipped == 2
@@ -0,0 +1,100 @@
+"""Test the Scribe disk spill queue."""
+from datetime import UTC, datetime
+
+from custom_components.scribe.buffer import ColumnBlock
+from custom_components.scribe.spill import FRAME_HEADER, SpillQueue
+
+COLUMNS = ("time", "entity_id", "state", "value", "attributes")
+
+def _block(count, start=0):
+    now = datetime(2025, 1, 1, tzinfo=UTC)
+    return ColumnBlock(COLUMNS, [
+        [now] * count,
+        [f"sensor.{i}" for i in range(start, start + count)],
+        [None] * count,
+        [float(i) for i in range(start, start + count)],
+        ["{}"] * count,
+    ])
+
+def test_spill_append_and_read(tmp_path):
+    """Test a spilled block round trips, including timestamps."""
+    spill = SpillQueue(tmp_path, max_bytes=1024 * 1024)
+    spill.load()
+    spill.append("state", _block(3))
+    assert spill.rows == 3
+    assert spill.size_bytes > 0
+
+    segments = spill.seal()
+    assert len(segments) == 1
+    frames = spill.read_segment(segments[0])
+    assert len(frames) == 1
+    kind, block = frames[0]
+    assert kind == "state"
+    assert block.column("entity_id") == ["sensor.0", "sensor.1", "sensor.2"]
+    assert block.column("time")[0] == datetime(2025, 1, 1, tzinfo=UTC)
+
+    spill.remove_segment(segments[0])
+    assert spill.rows == 0
+    assert spill.size_bytes == 0
+    assert not list(tmp_path.iterdir())
+
+def test_spill_uncompressed(tmp_path):
+    """Test spilling without compression."""
+    spill = SpillQueue(tmp_path, max_bytes=1024 * 1024, compression="none")
+    spill.load()
+    spill.append("state", _block(2))
+    segment = spill.seal()[0]
+    assert b"sensor.1" in segment.read_bytes()
+    assert spill.read_segment(segment)[0][1].column("value") == [0.0, 1.0]
+
+def test_spill_rotation_and_cap(tmp_path):
+    """Test segments rotate and the oldest are dropped over the byte cap."""
+    spill = SpillQueue(tmp_path, max_bytes=2000, compression="none", segment_bytes=500)
+    spill.load()
+    for i in range(10):
+        spill.append("state", _block(5, start=i * 5))
+
+    assert spill.size_bytes <= 2000
+    assert spill.dropped_rows > 0
+    assert spill.rows + spill.dropped_rows == 50
+    assert len(spill.seal()) > 1
+
+def test_spill_load_existing_and_truncated(tmp_path):
+    """Test segments from a previous run are picked up and a torn frame is ignored."""
+    spill = SpillQueue(tmp_path, max_bytes=1024 * 1024)
+    spill.load()
+    spill.append("state", _block(2))
+    segment = spill.seal()[0]
+    # Simulate a crash in the middle of writing a second frame
+    with open(segment, "ab") as file:
+        file.write(FRAME_HEADER.pack(1000, 5, 0) + b"partial")
+
+    reloaded = SpillQueue(tmp_path, max_bytes=1024 * 1024)
+    reloaded.load()
+    assert reloaded.rows == 2
+    frames = reloaded.read_segment(reloaded.seal()[0])
+    assert len(frames) == 1
+
+    # New writes go to a new segment
+    reloaded.append("state", _block(1))
+    assert len(reloaded.seal()) == 2
+
+def test_spill_append_before_load(tmp_path):
+    """Test appending before load creates the directory and counts old segments once."""
+    fresh = SpillQueue(tmp_path / "fresh", max_bytes=1024 * 1024)
+    fresh.append("state", _block(1))
+    assert fresh.rows == 1
+
+    old = SpillQueue(tmp_path / "spill", max_bytes=1024 * 1024)
+    old.append("state", _block(2))
+    old_segment = old.seal()[0]
+    old_size = old.size_bytes
+
+    spill = SpillQueue(tmp_path / "spill", max_bytes=1024 * 1024)
+    spill.append("state", _block(3))
+    spill.load()
+    assert spill.rows == 5
+    segments = spill.seal()
+    assert segments[0] == old_segment
+    assert len(segments) == 2
+    assert spill.size_bytes == old_size + segments[1].stat().st_size
@@ -1,11 +1,14 @@
 """Test state optimization logic."""
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import EVENT_STATE_CHANGED
-from custom_components.scribe.const import DOMAIN, CONF_DB_URL
 from homeassistant.core import State
 
+from custom_components.scribe.const import CONF_DB_URL, DOMAIN
+
+
 @pytest.fixture
 def mock_config_entry():
     """Mock ConfigEntry."""
@@ -78,3 +81,201 @@ async def test_state_optimization(hass, mock_config_entry):
         call_arg = mock_writer.enqueue.call_args[0][0]
         assert call_arg["value"] == 42.0
         assert call_arg["state"] is None
+
+@pytest.mark.asyncio
+async def test_duplicate_states_skipped(hass, mock_config_entry):
+    """Test a state change of an excluded attribute only does not write a row."""
+    from custom_components.scribe import async_setup_entry
+
+    hass.data[DOMAIN] = {"yaml_config": {"skip_duplicates": True, "exclude_attributes": ["rssi"]}}
+    with patch("custom_components.scribe.ScribeWriter") as mock_writer_cls:
+        mock_writer = mock_writer_cls.return_value
+        mock_writer.start = AsyncMock()
+        mock_writer.stop = AsyncMock()
+        mock_writer.enqueue = MagicMock()
+
+        await async_setup_entry(hass, mock_config_entry)
+
+        for rssi, state in ((-60, "on"), (-61, "on"), (-62, "off")):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, {
+                "entity_id": "binary_sensor.motion",
+                "new_state": State("binary_sensor.motion", state, {"rssi": rssi}),
+            })
+        await hass.async_block_till_done()
+
+        states = [c.args[0]["state"] for c in mock_writer.enqueue.call_args_list]
+        assert states == ["on", "off"]
+
+@pytest.mark.asyncio
+async def test_duplicate_states_with_deadband(hass, mock_config_entry):
+    """Test a row held back by the deadband is not the reference for duplicates."""
+    from datetime import timedelta
+
+    from homeassistant.util import dt as dt_util
+
+    from custom_components.scribe import async_setup_entry
+
+    hass.data[DOMAIN] = {"yaml_config": {
+        "skip_duplicates": True,
+        "deadband": {"sensor.power": {"mode": "absolute", "threshold": 5, "max_gap": 60}},
+    }}
+    with patch("custom_components.scribe.ScribeWriter") as mock_writer_cls:
+        mock_writer = mock_writer_cls.return_value
+        mock_writer.start = AsyncMock()
+        mock_writer.stop = AsyncMock()
+        mock_writer.enqueue = MagicMock()
+
+        await async_setup_entry(hass, mock_config_entry)
+
+        start = dt_util.utcnow()
+        # 102 is within the deadband at 10s, and written at 70s once max_gap has passed
+        for seconds, state in ((0, "100"), (10, "102"), (70, "102")):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, {
+                "entity_id": "sensor.power",
+                "new_state": State("sensor.power", state, last_updated=start + timedelta(seconds=seconds)),
+            })
+        await hass.async_block_till_done()
+
+        values = [c.args[0]["value"] for c in mock_writer.enqueue.call_args_list]
+        assert values == [100.0, 102.0]
+        ingest_plans = hass.data[DOMAIN][mock_config_entry.entry_id]["ingest_plans"]
+        assert ingest_plans.duplicates_skipped == 0
+
+@pytest.mark.asyncio
+async def test_restart_states_suppressed(hass, mock_config_entry):
+    """Test startup rows identical to the last stored state are not written."""
+    from custom_components.scribe import async_setup_entry
+
+    hass.data[DOMAIN] = {"yaml_config": {"suppress_restart_states": True}}
+    with patch("custom_components.scribe.ScribeWriter") as mock_writer_cls:
+        mock_writer = mock_writer_cls.return_value
+        mock_writer.start = AsyncMock()
+        mock_writer.stop = AsyncMock()
+        mock_writer.enqueue = MagicMock()
+        mock_writer.last_states = AsyncMock(return_value=[
+            ("switch.a", "on", None, {}),
+            ("switch.b", "on", None, {}),
+        ])
+        hass.states.async_set("switch.a", "on")
+        hass.states.async_set("switch.b", "on")
+
+        await async_setup_entry(hass, mock_config_entry)
+        await hass.async_block_till_done()
+        assert mock_writer.last_states.call_args.args[0] == ["switch.a", "switch.b"]
+
+        for entity_id, state in (("switch.a", "on"), ("switch.b", "off"), ("switch.a", "on")):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, {
+                "entity_id": entity_id,
+                "new_state": State(entity_id, state),
+            })
+        await hass.async_block_till_done()
+
+        written = [(c.args[0]["entity_id"], c.args[0]["state"]) for c in mock_writer.enqueue.call_args_list]
+        assert written == [("switch.b", "off"), ("switch.a", "on")]
+
+        # The entry is a mock: run the unload callbacks (startup window timer)
+        for unload in mock_config_entry.async_on_unload.call_args_list:
+            unload.args[0]()
+
+@pytest.mark.asyncio
+async def test_restart_states_cancelled_on_unload(hass, mock_config_entry):
+    """Test loading the last stored states is cancelled when the entry unloads."""
+    import asyncio
+
+    from custom_components.scribe import async_setup_entry
+
+    cancelled = asyncio.Event()
+
+    async def slow_last_states(entity_ids):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    hass.data[DOMAIN] = {"yaml_config": {"suppress_restart_states": True}}
+    with patch("custom_components.scribe.ScribeWriter") as mock_writer_cls:
+        mock_writer = mock_writer_cls.return_value
+        mock_writer.start = AsyncMock()
+        mock_writer.stop = AsyncMock()
+        mock_writer.last_states = AsyncMock(side_effect=slow_last_states)
+
+        await async_setup_entry(hass, mock_config_entry)
+        await asyncio.sleep(0)
+        assert mock_writer.last_states.called
+
+        for unload in mock_config_entry.async_on_unload.call_args_list:
+            unload.args[0]()
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+@pytest.mark.asyncio
+async def test_held_rows_written_on_stop(hass, mock_config_entry):
+    """Test the point held by a deadband filter is queued before the writer stops on shutdown."""
+    from datetime import timedelta
+
+    from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+    from homeassistant.util import dt as dt_util
+
+    from custom_components.scribe import async_setup_entry
+
+    hass.data[DOMAIN] = {"yaml_config": {
+        "deadband": {"sensor.power": {"mode": "swinging_door", "threshold": 1}},
+    }}
+    with patch("custom_components.scribe.ScribeWriter") as mock_writer_cls:
+        mock_writer = mock_writer_cls.return_value
+        mock_writer.start = AsyncMock()
+        mock_writer.enqueue = MagicMock()
+        calls = []
+        mock_writer.enqueue.side_effect = lambda row: calls.append(("enqueue", row["value"]))
+        mock_writer.stop = AsyncMock(side_effect=lambda: calls.append(("stop", None)))
+
+        await async_setup_entry(hass, mock_config_entry)
+
+        start = dt_util.utcnow()
+        for seconds, state in ((0, "100"), (10, "100.5")):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, {
+                "entity_id": "sensor.power",
+                "new_state": State("sensor.power", state, last_updated=start + timedelta(seconds=seconds)),
+            })
+        await hass.async_block_till_done()
+        assert calls == [("enqueue", 100.0)]
+
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        await hass.async_block_till_done()
+        assert calls == [("enqueue", 100.0), ("enqueue", 100.5), ("stop", None)]
+
+@pytest.mark.asyncio
+async def test_throttled_rows_written_on_stop(hass, mock_config_entry):
+    """Test the last suppressed row of a throttled entity is queued before the writer stops on shutdown."""
+    from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+    from custom_components.scribe import async_setup_entry
+
+    hass.data[DOMAIN] = {"yaml_config": {
+        "throttle": {"sensor.noisy*": {"max_rows": 1, "window": 3600}},
+    }}
+    with patch("custom_components.scribe.ScribeWriter") as mock_writer_cls:
+        mock_writer = mock_writer_cls.return_value
+        mock_writer.start = AsyncMock()
+        mock_writer.enqueue = MagicMock()
+        calls = []
+        mock_writer.enqueue.side_effect = lambda row: calls.append(("enqueue", row["value"]))
+        mock_writer.stop = AsyncMock(side_effect=lambda: calls.append(("stop", None)))
+
+        await async_setup_entry(hass, mock_config_entry)
+
+        for state in ("1", "2", "3"):
+            hass.bus.async_fire(EVENT_STATE_CHANGED, {
+                "entity_id": "sensor.noisy_power",
+                "new_state": State("sensor.noisy_power", state),
+            })
+        await hass.async_block_till_done()
+        assert calls == [("enqueue", 1.0)]
+
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        await hass.async_block_till_done()
+        assert calls == [("enqueue", 1.0), ("enqueue", 3.0), ("stop", None)]
+
+        # The entry is a mock: run the unload callbacks (release timer)
+        for unload in mock_config_entry.async_on_unload.call_args_list:
+            unload.args[0]()
@@ -0,0 +1,32 @@
+"""Test Scribe per-entity throttling."""
+from custom_components.scribe.throttle import TokenBucket, compile_rules, find_rule
+
+
+def test_throttle_rules_first_match():
+    """Test the first matching glob pattern applies."""
+    rules = compile_rules({"sensor.esp_*": {"max_rows": 1}, "sensor.*": {"max_rows": 10}})
+    assert find_rule(rules, "sensor.esp_power")["max_rows"] == 1
+    assert find_rule(rules, "sensor.temp")["max_rows"] == 10
+    assert find_rule(rules, "light.kitchen") is None
+
+def test_token_bucket_keeps_last_value():
+    """Test a burst is limited and its last row is released once the window refills."""
+    bucket = TokenBucket(max_rows=2, window=10, now=0.0)
+    written = [row for row in range(5) if bucket.offer(row, now=0.0)]
+    assert written == [0, 1]
+    assert bucket.suppressed == 3
+
+    # No token yet: the last suppressed row stays pending
+    assert bucket.release(now=1.0) is None
+    assert bucket.pending == 4
+
+    # One token refills every 5 seconds
+    assert bucket.release(now=5.0) == 4
+    assert bucket.pending is None
+    assert bucket.suppressed == 2
+
+    # A newer row with budget supersedes the pending one
+    bucket.offer(5, now=5.0)
+    assert bucket.offer(6, now=10.0)
+    assert bucket.pending is None
+    assert bucket.pop_pending() is None